@@ -1,3 +1,13 @@
+// Subprotocol the server selects; a resume token is offered alongside it as
+// `resume.<token>`, so it travels in the handshake header instead of the URL.
+const CLIENT_PROTOCOL = 'ces.v1';
+const RESUME_PROTOCOL_PREFIX = 'resume.';
+// Closes that end the session for good: a normal close and an administrator's termination.
+const FINAL_CLOSE_CODES = new Set([1000, 1008]);
+const MAX_RESUME_ATTEMPTS = 5;
+const RESUME_BACKOFF_MS = 500;
+const RESUME_BACKOFF_MAX_MS = 8000;
+
 export class GeminiAPI {
     constructor(endpoint = null) {
         // If no endpoint is provided, try to construct it from the current URL
@@ -15,7 +25,7 @@ export class GeminiAPI {
 
     connect() {
         console.log('Initializing GeminiAPI with endpoint:', this.endpoint);
-        this.ws = new WebSocket(this.endpoint);
+        this.ws = new WebSocket(this.endpoint, this.protocols());
         this.onReady = () => {};
         this.onConfig = () => {};
         this.onAudioData = () => {};
@@ -37,6 +47,41 @@ export class GeminiAPI {
         this.logMessage = () => {};
     }
 
+    // Subprotocols to offer, carrying the resume token from the last `config`
+    // message so a dropped connection re-attaches to the same server session.
+    protocols() {
+        if (!this.resumeToken) {
+            return [CLIENT_PROTOCOL];
+        }
+        return [CLIENT_PROTOCOL, RESUME_PROTOCOL_PREFIX + this.resumeToken];
+    }
+
+    // Re-open the WebSocket, keeping the registered callbacks.
+    reconnect() {
+        console.log('Reconnecting to endpoint:', this.endpoint, 'resume:', !!this.resumeToken);
+        this.ws = new WebSocket(this.endpoint, this.protocols());
+        this.setupWebSocket();
+    }
+
+    // After an unexpected close, try to resume the session with exponential backoff,
+    // within the server's resume grace window. Returns false once that is over.
+    scheduleResume() {
+        const graceMs = ((this.clientConfig && this.clientConfig.resume_grace_s) || 0) * 1000;
+        const attempts = this.resumeAttempts || 0;
+        if (attempts === 0) {
+            this.resumeDeadline = Date.now() + graceMs;
+        }
+        const delay = Math.min(RESUME_BACKOFF_MS * 2 ** attempts, RESUME_BACKOFF_MAX_MS);
+        if (attempts >= MAX_RESUME_ATTEMPTS || Date.now() + delay > this.resumeDeadline) {
+            this.resumeAttempts = 0;
+            return false;
+        }
+        this.resumeAttempts = attempts + 1;
+        console.log(`Connection lost; resuming in ${delay}ms (attempt ${this.resumeAttempts})`);
+        setTimeout(() => this.reconnect(), delay);
+        return true;
+    }
+
     setupWebSocket() {
         this.ws.onopen = () => {
             console.log('WebSocket connection is opening...');
@@ -65,10 +110,23 @@ export class GeminiAPI {
                 if (response.type === 'config') {
                     console.log('Received config from server:', response.data);
                     this.clientConfig = response.data;
+                    this.resumeAttempts = 0;
+                    if (response.data && response.data.resume_token) {
+                        this.resumeToken = response.data.resume_token;
+                    }
                     this.onConfig(response.data);
                     return;
                 }
 
+                if (response.type === 'reconnect') {
+                    // Server is draining: reconnect once it closes us. Our session ends with
+                    // the instance, so start a new one rather than resuming.
+                    console.log('Server asked us to reconnect:', response.data);
+                    this.resumeToken = null;
+                    this.reconnectAfterMs = (response.data && response.data.retry_after_ms) || 0;
+                    return;
+                }
+
                 if (response.ready) {
                     console.log('Received ready signal from server');
                     this.onReady();
@@ -109,6 +167,9 @@ export class GeminiAPI {
 
         this.ws.onerror = (error) => {
             console.error('WebSocket Error:', error);
+            if (this.resumeAttempts) {
+                return; // A failed resume attempt; onclose retries or gives up
+            }
             this.onError({
                 message: 'Connection error occurred',
                 action: 'Please check your internet connection and try again',
@@ -116,12 +177,26 @@ export class GeminiAPI {
             });
         };
 
+        const ws = this.ws;
         this.ws.onclose = (event) => {
             console.log('WebSocket connection closed:', {
                 code: event.code,
                 reason: event.reason,
                 wasClean: event.wasClean
             });
+            if (ws !== this.ws) {
+                return; // A connection we already replaced
+            }
+            if (this.reconnectAfterMs !== undefined) {
+                // Server-initiated drain: reconnect instead of surfacing an error.
+                const delay = this.reconnectAfterMs;
+                this.reconnectAfterMs = undefined;
+                setTimeout(() => this.reconnect(), delay);
+                return;
+            }
+            if (this.resumeToken && !FINAL_CLOSE_CODES.has(event.code) && this.scheduleResume()) {
+                return; // Dropped connection: the server keeps the session for a while
+            }
             this.onClose(); // <-- ENSURE THIS CALL IS MADE
             
             // Only show error if it wasn't a clean close
@@ -0,0 +1,216 @@
+"""
+Checks that slow web tools do not block the event loop for other sessions.
+
+Runs simulated audio streams (one send every --frame-ms, like the outbound audio
+flush) while the optus_modem custom_web_search and web_content_summarizer tools
+call a local stub that answers after --server-delay-ms. It reports how late the
+stream sends were and the loop's worst stall, for two implementations:
+
+    blocking   the former synchronous requests.post calls, run on the loop as ADK
+               runs a sync tool
+    async      the real async tools on the pooled HTTP client
+
+The stub does not check tokens, so get_id_token is replaced with a constant; the
+real one is run in a worker thread by the tools either way.
+
+Run from ces/backend/server:
+
+    python -m bench.blocking_tools --check   # exit 1 if the async tools stall the loop
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import requests
+from aiohttp import web
+
+from bench.loadgen import percentiles
+from core.agents.optus_modem import tools as optus_tools
+from core.http_client import HTTP_CLIENT
+from core.logger import logger
+
+CHECK_MAX_STALL_MS = 50
+
+
+class StubServer:
+    """The search and summarizer services, on their own thread and loop so a blocked caller can still be answered."""
+
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="stub-server", daemon=True)
+
+    def start(self) -> int:
+        self._thread.start()
+        self._ready.wait()
+        return self.port
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        runner = self._loop.run_until_complete(self._start())
+        self.port = runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    async def _start(self) -> web.AppRunner:
+        async def search(request: web.Request) -> web.Response:
+            await asyncio.sleep(self.delay_s)
+            return web.json_response({"results": [{"title": "stub", "link": "http://localhost/"}]})
+
+        async def summarize(request: web.Request) -> web.Response:
+            await asyncio.sleep(self.delay_s)
+            return web.json_response({"summary": "stub summary"})
+
+        app = web.Application()
+        app.router.add_post("/search", search)
+        app.router.add_post("/summarize", summarize)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        return runner
+
+
+def blocking_search(search_query: str) -> Dict[str, Any]:
+    """The former custom_web_search request path: synchronous requests.post."""
+    response = requests.post(
+        optus_tools.CUSTOM_SEARCH_CLOUD_RUN_URL,
+        json={"search_terms": search_query, "num_results": 3, "simplified_response": True},
+        timeout=15,
+    )
+    response.raise_for_status()
+    return {"search_results": response.json().get("results", [])}
+
+
+def blocking_summarize(url: str) -> Dict[str, Any]:
+    response = requests.post(optus_tools.WEB_SUMMARIZER_CLOUD_RUN_URL, json={"url": url}, timeout=30)
+    response.raise_for_status()
+    return {"summary": response.json().get("summary")}
+
+
+async def call_tools(mode: str, calls: int) -> List[Dict[str, Any]]:
+    """One session's tool calls, in sequence as a model would make them."""
+    results = []
+    for i in range(calls):
+        if mode == "blocking":
+            # A sync tool runs directly on the loop inside the ADK's tool dispatch
+            result = blocking_search(f"query {i}") if i % 2 == 0 else blocking_summarize("http://localhost/")
+        elif i % 2 == 0:
+            result = await optus_tools.custom_web_search(f"query {i}", None)
+        else:
+            result = await optus_tools.web_content_summarizer("http://localhost/", None)
+        results.append(result)
+        await asyncio.sleep(0)
+    return results
+
+
+async def stream(frame_s: float, stop: asyncio.Event, lateness_ms: List[float]) -> None:
+    """Sends a frame every frame_s on a fixed clock, recording how late each send was."""
+    due = time.perf_counter() + frame_s
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        lateness_ms.append((time.perf_counter() - due) * 1000)
+        due += frame_s
+
+
+async def measure(mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    stop = asyncio.Event()
+    lateness_ms: List[float] = []
+    streams = [
+        asyncio.create_task(stream(args.frame_ms / 1000, stop, lateness_ms)) for _ in range(args.streams)
+    ]
+    await asyncio.sleep(args.frame_ms / 1000 * 2)
+    started = time.perf_counter()
+    tool_sessions = await asyncio.gather(*(call_tools(mode, args.calls) for _ in range(args.tool_sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*streams)
+    results = [result for session in tool_sessions for result in session]
+    return {
+        "tool_calls": len(results),
+        "tool_errors": sum(1 for result in results if result.get("error")),
+        "tools_elapsed_s": round(elapsed, 2),
+        "frame_lateness_ms": percentiles(lateness_ms),
+        "max_stall_ms": round(max(lateness_ms, default=0.0), 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubServer(args.server_delay_ms / 1000)
+    port = stub.start()
+    optus_tools.CUSTOM_SEARCH_CLOUD_RUN_URL = f"http://localhost:{port}/search"
+    optus_tools.WEB_SUMMARIZER_CLOUD_RUN_URL = f"http://localhost:{port}/summarize"
+    optus_tools.get_id_token = lambda audience: "bench-token"
+    results = {}
+    try:
+        for mode in args.modes:
+            results[mode] = await measure(mode, args)
+    finally:
+        await HTTP_CLIENT.close()
+        stub.stop()
+    return {
+        "streams": args.streams,
+        "frame_ms": args.frame_ms,
+        "tool_sessions": args.tool_sessions,
+        "server_delay_ms": args.server_delay_ms,
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['streams']} streams at {report['frame_ms']}ms, {report['tool_sessions']} sessions calling "
+        f"tools, stub delay {report['server_delay_ms']}ms"
+    )
+    print(f"  {'tools':<9} {'calls':>6} {'errors':>7} {'elapsed s':>10} {'late p50':>9} {'late p99':>9} {'max stall':>10}")
+    for mode, row in report["results"].items():
+        late = row["frame_lateness_ms"]
+        print(
+            f"  {mode:<9} {row['tool_calls']:>6} {row['tool_errors']:>7} {row['tools_elapsed_s']:>10} "
+            f"{late['p50']:>9} {late['p99']:>9} {row['max_stall_ms']:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--modes", nargs="+", choices=("blocking", "async"), default=["blocking", "async"])
+    parser.add_argument("--streams", type=int, default=20, help="Simulated audio streams")
+    parser.add_argument("--frame-ms", type=float, default=40, help="Interval between stream sends")
+    parser.add_argument("--tool-sessions", type=int, default=2, help="Sessions calling the slow tools")
+    parser.add_argument("--calls", type=int, default=4, help="Tool calls per tool session")
+    parser.add_argument("--server-delay-ms", type=float, default=500, help="Stub response time")
+    parser.add_argument("--check", action="store_true", help=f"Exit 1 if async tools stall the loop over {CHECK_MAX_STALL_MS}ms")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().handlers = [logging.NullHandler()]
+    logger.setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    result = report["results"].get("async")
+    if args.check and result and (result["max_stall_ms"] > CHECK_MAX_STALL_MS or result["tool_errors"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark: per-event logging cost, pydantic model_dump vs EventInspector.
+
+Replays a synthetic turn (PCM audio chunks, partial transcription text, a tool call
+and result, final text, turn_complete) through the previous model_dump-based
+SessionState.log_event_output and through EventInspector, with log output discarded.
+
+Run from ces/backend/server:
+
+    python -m bench.event_inspection [--turns 2000] [--json]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from google.adk.events import Event
+from google.genai import types
+
+from core.event_inspector import EventInspector
+from core.logger import logger
+
+
+def synthetic_turn(audio_chunks: int = 40, text_chunks: int = 20):
+    """Events of one model turn, in the order the Live API streams them."""
+    events = []
+    pcm = b"\x00\x01" * 2400  # 100ms of 24kHz 16-bit audio
+    for i in range(audio_chunks):
+        events.append(
+            Event(
+                author="assistant",
+                partial=True,
+                content=types.Content(
+                    role="model",
+                    parts=[types.Part(inline_data=types.Blob(mime_type="audio/pcm", data=pcm))],
+                ),
+            )
+        )
+        if i < text_chunks:
+            events.append(
+                Event(
+                    author="assistant",
+                    partial=True,
+                    content=types.Content(role="model", parts=[types.Part(text=f"word{i} ")]),
+                )
+            )
+    events.append(
+        Event(
+            author="assistant",
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(name="get_weather", args={"city": "Sydney"}))],
+            ),
+        )
+    )
+    events.append(
+        Event(
+            author="assistant",
+            content=types.Content(
+                role="user",
+                parts=[
+                    types.Part(
+                        function_response=types.FunctionResponse(
+                            name="get_weather", response={"temperature": 21, "conditions": "sunny"}
+                        )
+                    )
+                ],
+            ),
+        )
+    )
+    events.append(
+        Event(
+            author="assistant",
+            content=types.Content(
+                role="model", parts=[types.Part(text=" ".join(f"word{i}" for i in range(text_chunks)))]
+            ),
+        )
+    )
+    events.append(Event(author="assistant", turn_complete=True))
+    return events
+
+
+def model_dump_log_event_output(event: Event):
+    """The previous SessionState.log_event_output, kept here as the baseline."""
+    try:
+        res = event.content.model_dump(exclude_none=True).get("parts", None)
+    except Exception as e:
+        logger.debug(f"e:{e}\nevent:{event}")
+        return None
+    if not res:
+        return None
+    for part in res:
+        if part.get("text", None):
+            if event.content.role == "model" and not event.partial:
+                logger.info(f"{event.author}: {part['text']}")
+            elif event.content.role == "user":
+                logger.info(f"USER QUERY: {part['text']}")
+        if part.get("function_call", None):
+            logger.info(f"TOOL CALL: {part['function_call']}")
+        if part.get("function_response", None):
+            logger.info(f"TOOL RESULT: {part['function_response']}")
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    # Discard output: this measures event handling, not log I/O
+    logging.getLogger().handlers = [logging.NullHandler()]
+    logger.setLevel(logging.DEBUG)  # The inspector logs at DEBUG only
+
+    events = synthetic_turn()
+    inspector = EventInspector("bench")
+    cases = {
+        "model_dump": model_dump_log_event_output,
+        "event_inspector": inspector.inspect,
+    }
+    report = {}
+    for name, inspect in cases.items():
+        started = time.perf_counter()
+        for _ in range(args.turns):
+            for event in events:
+                inspect(event)
+        elapsed = time.perf_counter() - started
+        total = args.turns * len(events)
+        report[name] = {
+            "total_s": round(elapsed, 4),
+            "us_per_event": round(elapsed / total * 1e6, 3),
+        }
+
+    if args.json:
+        print(json.dumps({"turns": args.turns, "events_per_turn": len(events), "results": report}, indent=2))
+        return
+    print(f"{args.turns} turns x {len(events)} events, CPU per event:")
+    for name, row in report.items():
+        print(f"  {name:<16} {row['us_per_event']:>8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Micro-benchmarks for the server hot paths, with a stored baseline and regression thresholds.
+
+Cases:
+    send_buffered_audio      one 300ms outbound audio flush (base64 + JSON + send)
+    client_audio_parse       one inbound audio message through handle_client_messages
+    catalog_search_<n>       search_live_optus_catalog over an n-product catalog
+    prompt_compile           re-running the module-level assembly of every agent prompts.py
+    prompt_inject_<app>      ADK state injection of an agent's global + main instruction
+    session_create           SessionState.create (session service, runner; no Live connection)
+
+Each case runs --repeat times and reports the best cost per operation, as timeit does:
+the fastest run is the one least disturbed by other load on the machine. Results are
+compared against a baseline JSON; a case regresses when it is slower than its
+baseline by more than its threshold (--threshold, or the per-case override in
+THRESHOLDS for the noisier cases). Baselines are machine specific: record one on
+the machine that runs the comparison.
+
+Run from ces/backend/server:
+
+    python -m bench.hotpaths                      # compare against bench/baselines/hotpaths.json
+    python -m bench.hotpaths --save-baseline      # record a new baseline
+    python -m bench.hotpaths --output hotpaths.json --check   # JSON report, exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import WSMessage, WSMsgType
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.utils.instructions_utils import inject_session_state
+
+from bench.loadgen import pcm_chunk
+from core.agents.generic.context import GenericContext
+from core.agents.generic.generic_assist import create_generic_agent
+from core.agents.optus_modem import tools as optus_tools
+from core.agents.optus_modem.context import (
+    PRODUCT_CATALOG_FILE,
+    OptusModemContext,
+    load_catalog_data,
+)
+from core.agents.optus_modem.optus_modem_assist import create_optus_modem_agent
+from core.logger import logger
+from core.session_context import SessionContext
+from core.session_state import SessionState
+from core.websocket_handler import (
+    SERVER_BUFFER_MAX_SIZE_BYTES,
+    handle_client_messages,
+    send_buffered_audio,
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hotpaths.json")
+DEFAULT_THRESHOLD = 0.25
+# Cases dominated by allocation and ADK internals vary more run to run
+THRESHOLDS = {"session_create": 0.5, "prompt_compile": 0.5, "prompt_inject_generic": 0.4, "prompt_inject_optus_modem": 0.4}
+
+CATALOG_SIZES = (49, 500, 5000)
+SEARCH_TERMS = (
+    "samsung galaxy s25 256gb",
+    "google pixel 9 pro obsidian",
+    "motorola moto g",
+    "oppo find x8 blue",
+)
+PROMPT_MODULES = ("core.agents.generic.prompts", "core.agents.optus_modem.prompts")
+
+# A case is called with the number of operations to run and returns its elapsed seconds
+Case = Callable[[int], Awaitable[float]]
+
+
+# --- Fakes ---
+
+
+class SinkWebSocket(dict):
+    """Stands in for web.WebSocketResponse: discards what is sent, replays what is queued."""
+
+    closed = False
+
+    def __init__(self, messages: Optional[List[WSMessage]] = None):
+        super().__init__()
+        self.messages = messages or []
+        self.sent_bytes = 0
+
+    async def send_str(self, data: str) -> None:
+        self.sent_bytes += len(data)
+
+    async def close(self, **_) -> None:
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for msg in self.messages:
+            yield msg
+
+
+# --- Cases ---
+
+
+async def bench_send_buffered_audio(ops: int) -> float:
+    websocket = SinkWebSocket()
+    chunk = os.urandom(SERVER_BUFFER_MAX_SIZE_BYTES)
+    buffer = bytearray()
+    last_send = 0.0
+    started = time.perf_counter()
+    for _ in range(ops):
+        buffer += chunk
+        last_send = await send_buffered_audio(websocket, buffer, last_send)
+    return time.perf_counter() - started
+
+
+def client_audio_parse_case(agent) -> Case:
+    session = SessionState(agent, user_id="bench")
+    audio = json.dumps({"type": "audio", "data": pcm_chunk(6000, 0)})
+
+    async def run(ops: int) -> float:
+        session.live_request_queue = LiveRequestQueue()  # Drop what earlier runs queued
+        websocket = SinkWebSocket([WSMessage(WSMsgType.TEXT, audio, None)] * ops)
+        started = time.perf_counter()
+        await handle_client_messages(websocket, session)
+        return time.perf_counter() - started
+
+    return run
+
+
+def catalog_search_case(catalog: List[Dict[str, Any]], size: int) -> Case:
+    products = [dict(catalog[i % len(catalog)]) for i in range(size)]
+    for i, product in enumerate(products[len(catalog):]):
+        product["Model"] = f"{product.get('Model', '')} {i}"
+
+    async def run(ops: int) -> float:
+        OptusModemContext.LIVE_OPTUS_CATALOG_DATA = products
+        started = time.perf_counter()
+        for i in range(ops):
+            optus_tools.search_live_optus_catalog(SEARCH_TERMS[i % len(SEARCH_TERMS)], None)
+        return time.perf_counter() - started
+
+    return run
+
+
+async def bench_prompt_compile(ops: int) -> float:
+    modules = [importlib.import_module(name) for name in PROMPT_MODULES]
+    started = time.perf_counter()
+    for _ in range(ops):
+        for module in modules:
+            importlib.reload(module)
+    return time.perf_counter() - started
+
+
+async def prompt_inject_case(agent, app_name: str, profile: Dict[str, Any]) -> Case:
+    context = SessionContext.from_profile(profile, session_id="bench", video_status="inactive")
+    session = await SessionState.create(agent=agent, app_name=app_name, user_id="bench", context=context)
+    readonly = ReadonlyContext(session.runner._new_invocation_context(session.session))
+    instructions = [agent.global_instruction, agent.instruction]
+
+    async def run(ops: int) -> float:
+        started = time.perf_counter()
+        for _ in range(ops):
+            for instruction in instructions:
+                await inject_session_state(instruction, readonly)
+        return time.perf_counter() - started
+
+    return run
+
+
+def session_create_case(agent, profile: Dict[str, Any]) -> Case:
+    async def run(ops: int) -> float:
+        started = time.perf_counter()
+        for i in range(ops):
+            context = SessionContext.from_profile(profile, session_id=f"bench-{i}", video_status="inactive")
+            await SessionState.create(agent=agent, app_name="bench", user_id=f"bench-{i}", context=context)
+        return time.perf_counter() - started
+
+    return run
+
+
+async def build_cases() -> Dict[str, Any]:
+    """Case name -> (case, operations per run)."""
+    generic_agent = create_generic_agent()
+    optus_agent = create_optus_modem_agent()
+    catalog = load_catalog_data(PRODUCT_CATALOG_FILE)
+
+    cases = {
+        "send_buffered_audio": (bench_send_buffered_audio, 2000),
+        "client_audio_parse": (client_audio_parse_case(generic_agent), 2000),
+    }
+    for size in CATALOG_SIZES:
+        cases[f"catalog_search_{size}"] = (catalog_search_case(catalog, size), max(20, 20000 // size))
+    cases["prompt_compile"] = (bench_prompt_compile, 200)
+    cases["prompt_inject_generic"] = (
+        await prompt_inject_case(generic_agent, "generic", GenericContext.CUSTOMER_PROFILE),
+        500,
+    )
+    cases["prompt_inject_optus_modem"] = (
+        await prompt_inject_case(optus_agent, "optus_modem_setup", OptusModemContext.CUSTOMER_PROFILE),
+        500,
+    )
+    cases["session_create"] = (session_create_case(generic_agent, GenericContext.CUSTOMER_PROFILE), 100)
+    return cases
+
+
+# --- Runner ---
+
+
+async def run_cases(repeat: int, only: Optional[List[str]]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, (case, ops) in (await build_cases()).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        await case(max(1, ops // 10))  # Warm up imports, caches and allocators
+        per_op = [await case(ops) / ops * 1e6 for _ in range(repeat)]
+        results[name] = {
+            "us_per_op": round(min(per_op), 3),
+            "median_us": round(statistics.median(per_op), 3),
+            "max_us": round(max(per_op), 3),
+            "ops": ops,
+        }
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float
+) -> Dict[str, Dict[str, Any]]:
+    comparison = {}
+    for name, row in results.items():
+        base = (baseline.get("results") or {}).get(name)
+        if not base:
+            continue
+        limit = THRESHOLDS.get(name, threshold)
+        change = row["us_per_op"] / base["us_per_op"] - 1
+        comparison[name] = {
+            "baseline_us": base["us_per_op"],
+            "change": round(change, 3),
+            "threshold": limit,
+            "regressed": change > limit,
+        }
+    return comparison
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Hot path benchmarks at {report['revision'] or 'unknown revision'} ({report['python']})")
+    print(f"  {'case':<28} {'us/op':>10} {'baseline':>10} {'change':>8}")
+    for name, row in report["results"].items():
+        cmp = report["comparison"].get(name)
+        if cmp:
+            flag = "  REGRESSED" if cmp["regressed"] else ""
+            print(
+                f"  {name:<28} {row['us_per_op']:>10.2f} {cmp['baseline_us']:>10.2f} "
+                f"{cmp['change'] * 100:>+7.1f}%{flag}"
+            )
+        else:
+            print(f"  {name:<28} {row['us_per_op']:>10.2f} {'-':>10} {'-':>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=7, help="Runs per case; the best is reported")
+    parser.add_argument("--only", nargs="*", help="Run only cases starting with these prefixes")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="0.25 = 25%% slower")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any case regressed")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Measure the code paths, not log I/O
+    logging.getLogger().handlers = [logging.NullHandler()]
+    logger.setLevel(logging.WARNING)
+
+    results = asyncio.run(run_cases(args.repeat, args.only))
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "comparison": compare(results, baseline, args.threshold),
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({k: report[k] for k in ("revision", "python", "machine", "results")}, f, indent=2)
+            f.write("\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.check and any(row["regressed"] for row in report["comparison"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Latency of the HTTP-backed generic tools against a local stub server.
+
+Starts an aiohttp stub standing in for the weather, forecast and health stats
+Cloud Run functions, points the tool URLs at it and times tool calls three ways:
+
+    per_call   a new aiohttp.ClientSession per call, as the tools used to do
+    pooled     the real tools, on the shared pooled client from core/http_client.py
+    cached     the real tools asked about a few cities, so the tool cache
+               (core/tool_cache.py) serves or coalesces most calls
+
+each sequentially (one call at a time, as in a single voice turn) and with
+--concurrency calls in flight (many sessions calling tools at once). The stub is
+addressed as "localhost" so each new connection also pays a resolver lookup;
+--server-delay-ms adds simulated function time to every response. per_call and
+pooled ask about a different city every call so the tool cache never answers.
+
+Run from ces/backend/server:
+
+    python -m bench.http_tools --calls 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from urllib.parse import urlencode
+
+import aiohttp
+from aiohttp import web
+
+from bench.loadgen import percentiles
+from core.agents.generic import tools as generic_tools
+from core.http_client import HTTP_CLIENT
+from core.logger import logger
+from core.metrics import TOOL_CACHE_REQUESTS
+from core.tool_cache import TOOL_CACHE
+
+# Tool -> (URL attribute in the tools module, stub path, query parameter)
+TOOLS = {
+    "get_weather": ("WEATHER_FUNCTION_URL", "/weather", "city"),
+    "get_weather_forecast": ("FORECAST_FUNCTION_URL", "/forecast", "city"),
+    "get_health_stats": ("HEALTH_STATS_FUNCTION_URL", "/health", "search_query"),
+}
+ARGUMENTS = ("Sydney", "Melbourne", "Brisbane", "Perth")
+
+
+# --- Stub Server ---
+
+
+async def start_stub(delay_s: float) -> web.AppRunner:
+    async def respond(request: web.Request) -> web.Response:
+        if delay_s:
+            await asyncio.sleep(delay_s)
+        return web.json_response({"path": request.path, "query": dict(request.query), "temp_c": 21})
+
+    app = web.Application()
+    for _, path, _ in TOOLS.values():
+        app.router.add_get(path, respond)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+# --- Clients ---
+
+
+async def per_call(tool: str, argument: str) -> Dict[str, Any]:
+    """The tools' previous behaviour: a fresh ClientSession, connector and connection per call."""
+    attribute, _, parameter = TOOLS[tool]
+    url = f"{getattr(generic_tools, attribute)}?{urlencode({parameter: argument})}"
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.json()
+
+
+async def pooled(tool: str, argument: str) -> Dict[str, Any]:
+    return await getattr(generic_tools, tool)(argument)
+
+
+async def measure(
+    call: Callable[[str, str], Awaitable[Dict[str, Any]]], calls: int, concurrency: int, unique: bool = True
+) -> Dict[str, Any]:
+    names = list(TOOLS)
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            argument = ARGUMENTS[i % len(ARGUMENTS)]
+            result = await call(names[i % len(names)], f"{argument} {i}" if unique else argument)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if "error" in result:
+                errors += 1
+
+    if unique:
+        TOOL_CACHE.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "latency_ms": percentiles(latencies),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "calls_per_s": round(calls / elapsed, 1),
+        "errors": errors,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = await start_stub(args.server_delay_ms / 1000)
+    port = stub.addresses[0][1]
+    for attribute, path, _ in TOOLS.values():
+        setattr(generic_tools, attribute, f"http://localhost:{port}{path}")
+
+    results: Dict[str, Any] = {}
+    try:
+        for mode, call in (("per_call", per_call), ("pooled", pooled)):
+            await measure(call, min(20, args.calls), 1)  # Warm up imports and the pool
+            results[mode] = {
+                "sequential": await measure(call, args.calls, 1),
+                "concurrent": await measure(call, args.calls, args.concurrency),
+            }
+        results["cached"] = {}
+        for name, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+            TOOL_CACHE.clear()
+            TOOL_CACHE_REQUESTS.values.clear()
+            results["cached"][name] = await measure(pooled, args.calls, concurrency, unique=False)
+            counts = {outcome: 0 for outcome in ("hit", "coalesced", "miss")}
+            for (_, outcome), value in TOOL_CACHE_REQUESTS.values.items():
+                counts[outcome] += int(value)
+            results["cached"][name]["cache"] = counts
+    finally:
+        await HTTP_CLIENT.close()
+        await stub.cleanup()
+    return {
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "server_delay_ms": args.server_delay_ms,
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['calls']} tool calls per run, concurrency {report['concurrency']}, "
+        f"stub delay {report['server_delay_ms']}ms"
+    )
+    print(f"  {'client':<10} {'run':<11} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'calls/s':>9} {'errors':>7}")
+    for mode, runs in report["results"].items():
+        for name, row in runs.items():
+            latency = row["latency_ms"]
+            cache = row.get("cache")
+            print(
+                f"  {mode:<10} {name:<11} {latency['p50']:>8} {latency['p90']:>8} {latency['p99']:>8} "
+                f"{row['calls_per_s']:>9} {row['errors']:>7}"
+                + (f"   cache {cache['hit']} hit / {cache['coalesced']} coalesced / {cache['miss']} miss" if cache else "")
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=500, help="Tool calls per run")
+    parser.add_argument("--concurrency", type=int, default=20, help="Calls in flight for the concurrent run")
+    parser.add_argument("--server-delay-ms", type=float, default=0, help="Simulated function time")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().handlers = [logging.NullHandler()]
+    logger.setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
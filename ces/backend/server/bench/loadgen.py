@@ -0,0 +1,514 @@
+"""
+WebSocket load generator with realistic voice-session profiles.
+
+Opens N concurrent /ws clients speaking the same JSON protocol as
+client/src/api/gemini-api.js: 16kHz PCM microphone audio in 2048-sample chunks at
+real-time rate, `state` messages toggling video_active, 1fps JPEG camera frames, and
+`end_session` when done. Each client alternates utterances and pauses (optionally
+barging in on the model), plays received audio through a simulated 24kHz playout
+buffer, and records per-turn latency and audio underruns. Server CPU and RSS are
+sampled once per second.
+
+Run it against the offline fake runner so results are reproducible, either by
+starting the server yourself with LIVE_BACKEND=fake or with --spawn-server:
+
+    cd ces/backend/server
+    python -m bench.loadgen --spawn-server --sessions 50 --duration-s 60 --profile mixed
+
+Profiles:
+    talker  voice only
+    video   voice plus camera: video_active on, 1 frame/s, toggled off and on
+    mixed   half talker, half video
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import random
+import re
+import signal
+import struct
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2
+MIC_CHUNK_SAMPLES = 2048  # client/src/audio/audio-recording-worklet.js
+MIC_CHUNK_S = MIC_CHUNK_SAMPLES / INPUT_SAMPLE_RATE
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+
+    def rank(pct: float) -> float:
+        return round(ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1], 1)
+
+    return {
+        "count": len(ordered),
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": round(ordered[-1], 1),
+    }
+
+
+def pcm_chunk(amplitude: int, seed: int) -> str:
+    """One base64 mic chunk: a tone for speech, low noise for silence."""
+    rng = random.Random(seed)
+    samples = (
+        int(amplitude * math.sin(2 * math.pi * 180 * i / INPUT_SAMPLE_RATE) + rng.randint(-20, 20))
+        for i in range(MIC_CHUNK_SAMPLES)
+    )
+    return base64.b64encode(struct.pack(f"<{MIC_CHUNK_SAMPLES}h", *samples)).decode()
+
+
+def jpeg_frame(size: int, seed: int) -> str:
+    """A JPEG-sized payload with SOI/EOI markers (contents are not decoded)."""
+    rng = random.Random(seed)
+    body = bytes(rng.getrandbits(8) for _ in range(max(0, size - 4)))
+    return base64.b64encode(b"\xff\xd8" + body + b"\xff\xd9").decode()
+
+
+class Stats:
+    """Aggregated results across all clients."""
+
+    def __init__(self):
+        self.connected = 0
+        self.sustained = 0
+        self.failed = 0
+        self.dropped = 0
+        self.handshake_ms: List[float] = []
+        self.turn_latency_ms: List[float] = []
+        self.turns = 0
+        self.turns_completed = 0
+        self.interrupted = 0
+        self.barge_ins = 0
+        self.audio_chunks = 0
+        self.audio_seconds = 0.0
+        self.underruns = 0
+        self.underrun_ms = 0.0
+        self.frames_sent = 0
+        self.send_lag_ms: List[float] = []
+        self.errors: Dict[str, int] = {}
+
+
+class VoiceClient:
+    """
+    One simulated browser client.
+
+    Attributes:
+        index (int): Client number, also the seed for its randomness.
+        video (bool): Whether this client streams camera frames.
+    """
+
+    def __init__(self, index: int, args: argparse.Namespace, stats: Stats, video: bool):
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.video = video
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.speech = pcm_chunk(6000, index)
+        self.silence = pcm_chunk(0, index)
+        self.frame = jpeg_frame(args.frame_bytes, index) if video else None
+
+        self.speaking = False
+        self.speech_ended_at: Optional[float] = None
+        self.awaiting_response = False
+        self.responding = False
+        self.turn_done = asyncio.Event()
+        self.playout_end = 0.0  # when the simulated speaker runs out of audio
+        self.next_chunk_at: Optional[float] = None  # the mic's continuous clock
+
+    async def run(self, session: aiohttp.ClientSession, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        connected = False
+        try:
+            async with session.ws_connect(self.args.url, heartbeat=25) as ws:
+                config = await asyncio.wait_for(self._wait_config(ws), timeout=30)
+                if config is None:
+                    self.stats.failed += 1
+                    return
+                connected = True
+                self.stats.connected += 1
+                self.stats.handshake_ms.append((loop.time() - started) * 1000)
+
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    await self._converse(ws, deadline)
+                    if not ws.closed:
+                        await ws.send_json({"type": "end_session"})
+                        self.stats.sustained += 1
+                    else:
+                        self.stats.dropped += 1
+                finally:
+                    receiver.cancel()
+        except Exception as e:
+            name = type(e).__name__
+            self.stats.errors[name] = self.stats.errors.get(name, 0) + 1
+            if connected:
+                self.stats.dropped += 1
+            else:
+                self.stats.failed += 1
+
+    async def _wait_config(self, ws) -> Optional[Dict[str, Any]]:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(msg.data)
+            if data.get("type") == "config":
+                return data
+            if data.get("type") in ("error", "reconnect"):
+                break
+        return None
+
+    # --- Sending ---
+
+    async def _send_chunks(self, ws, chunks: int, speech: bool, deadline: float) -> bool:
+        """Streams mic chunks at real-time rate; returns False once the run is over."""
+        loop = asyncio.get_running_loop()
+        payload = self.speech if speech else self.silence
+        for _ in range(chunks):
+            now = loop.time()
+            due = self.next_chunk_at if self.next_chunk_at is not None else now
+            if due > now:
+                await asyncio.sleep(due - now)
+            else:
+                self.stats.send_lag_ms.append((now - due) * 1000)
+                if now - due > 1.0:
+                    due = now  # hopelessly behind: resync rather than burst
+            self.next_chunk_at = due + MIC_CHUNK_S
+            if ws.closed or loop.time() >= deadline:
+                return False
+            await ws.send_str(json.dumps({"type": "audio", "data": payload}))
+        return True
+
+    async def _camera(self, ws, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        await ws.send_json({"type": "state", "data": {"video_active": True}})
+        toggle_at = loop.time() + self.rng.uniform(10, 30)
+        active = True
+        while not ws.closed and loop.time() < deadline:
+            await asyncio.sleep(1.0)
+            if loop.time() >= toggle_at:
+                active = not active
+                await ws.send_json({"type": "state", "data": {"video_active": active}})
+                toggle_at = loop.time() + self.rng.uniform(5, 30)
+            if active and not ws.closed:
+                await ws.send_str(json.dumps({"type": "image", "data": self.frame}))
+                self.stats.frames_sent += 1
+
+    async def _converse(self, ws, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        camera = asyncio.create_task(self._camera(ws, deadline)) if self.video else None
+        try:
+            # Stagger the first utterance like users who take a moment to start
+            if not await self._send_chunks(ws, self.rng.randint(2, 10), False, deadline):
+                return
+            while loop.time() < deadline and not ws.closed:
+                utterance = self.rng.uniform(*self.args.utterance_s)
+                self.speaking = True
+                if self.responding:
+                    self.stats.barge_ins += 1
+                ok = await self._send_chunks(ws, math.ceil(utterance / MIC_CHUNK_S), True, deadline)
+                self.speaking = False
+                if not ok:
+                    return
+                self.speech_ended_at = loop.time()
+                self.awaiting_response = True
+                self.stats.turns += 1
+                self.turn_done.clear()
+
+                # Keep the mic open (silence) while the model answers
+                barge_in = self.rng.random() < self.args.barge_in
+                wait_s = self.rng.uniform(1.0, 3.0) if barge_in else self.args.turn_timeout_s
+                listen_chunks = math.ceil(wait_s / MIC_CHUNK_S)
+                for _ in range(listen_chunks):
+                    if self.turn_done.is_set() and not barge_in:
+                        break
+                    if not await self._send_chunks(ws, 1, False, deadline):
+                        return
+                pause = self.rng.uniform(*self.args.pause_s)
+                if not await self._send_chunks(ws, math.ceil(pause / MIC_CHUNK_S), False, deadline):
+                    return
+        finally:
+            if camera:
+                camera.cancel()
+
+    # --- Receiving ---
+
+    async def _receive(self, ws) -> None:
+        loop = asyncio.get_running_loop()
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            data = json.loads(msg.data)
+            msg_type = data.get("type")
+            now = loop.time()
+            if msg_type == "audio":
+                self._on_audio(now, len(data.get("data") or "") * 3 // 4)
+            elif msg_type in ("text", "turn_complete"):
+                # The server forwards turn_complete only when the event stream ends,
+                # so the model's final (non-partial) text is what closes a turn.
+                if self.responding:
+                    self.stats.turns_completed += 1
+                self.responding = False
+                self.awaiting_response = False
+                self.turn_done.set()
+            elif msg_type == "interrupted":
+                self.stats.interrupted += 1
+                self.responding = False
+                self.playout_end = now  # the client flushes its playback queue
+                self.turn_done.set()
+            elif msg_type == "error":
+                self.stats.errors["server_error"] = self.stats.errors.get("server_error", 0) + 1
+
+    def _on_audio(self, now: float, size: int) -> None:
+        duration = size / (OUTPUT_SAMPLE_RATE * BYTES_PER_SAMPLE)
+        self.stats.audio_chunks += 1
+        self.stats.audio_seconds += duration
+        if self.awaiting_response and self.speech_ended_at is not None:
+            self.stats.turn_latency_ms.append((now - self.speech_ended_at) * 1000)
+            self.awaiting_response = False
+            self.responding = True
+            # Playback starts once the client's jitter buffer has filled
+            self.playout_end = now + self.args.playout_buffer_ms / 1000
+        elif self.responding and now > self.playout_end:
+            # The speaker drained before this chunk arrived
+            self.stats.underruns += 1
+            self.stats.underrun_ms += (now - self.playout_end) * 1000
+        self.playout_end = max(self.playout_end, now) + duration
+
+
+# --- Server resource sampling ---
+
+
+def read_proc(pid: int) -> Optional[Dict[str, float]]:
+    """CPU seconds and RSS of a local process, from /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu_s": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_bytes": rss_pages * os.sysconf("SC_PAGE_SIZE"),
+    }
+
+
+async def scrape_metrics(session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, float]]:
+    """CPU seconds and RSS from the server's /metrics endpoint."""
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=2)) as response:
+            text = await response.text()
+    except Exception:
+        return None
+    values = {}
+    for name, key in (
+        ("ces_process_cpu_seconds_total", "cpu_s"),
+        ("ces_process_resident_memory_bytes", "rss_bytes"),
+    ):
+        match = re.search(rf"^{name} (\S+)$", text, re.MULTILINE)
+        if match:
+            values[key] = float(match.group(1))
+    return values if len(values) == 2 else None
+
+
+async def sample_server(
+    session: aiohttp.ClientSession,
+    pid: Optional[int],
+    metrics_url: str,
+    stats: Stats,
+    samples: List[Dict[str, float]],
+    stop: asyncio.Event,
+) -> None:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    previous = None
+    while not stop.is_set():
+        reading = read_proc(pid) if pid else await scrape_metrics(session, metrics_url)
+        now = loop.time()
+        if reading:
+            if previous:
+                cpu_pct = (reading["cpu_s"] - previous[1]["cpu_s"]) / (now - previous[0]) * 100
+                samples.append(
+                    {
+                        "t_s": round(now - start, 1),
+                        "sessions": stats.connected - stats.dropped - stats.sustained,
+                        "cpu_pct": round(cpu_pct, 1),
+                        "rss_mb": round(reading["rss_bytes"] / 2**20, 1),
+                    }
+                )
+            previous = (now, reading)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Starts combined_server.py on the fake runner, from the server directory."""
+    server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PORT=str(port), LIVE_BACKEND="fake", LOG_LEVEL="WARNING")
+    return subprocess.Popen(
+        [sys.executable, "combined_server.py"],
+        cwd=server_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_for_server(url: str, timeout_s: float = 120) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=2)):
+                    return
+            except Exception:
+                await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {url} did not come up within {timeout_s}s")
+
+
+# --- Main ---
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    parsed = urlparse(args.url)
+    metrics_url = f"{'https' if parsed.scheme == 'wss' else 'http'}://{parsed.netloc}/metrics"
+
+    server = None
+    pid = args.server_pid
+    if args.spawn_server:
+        server = spawn_server(parsed.port or 8080)
+        pid = server.pid
+    try:
+        await wait_for_server(metrics_url)
+        stats = Stats()
+        samples: List[Dict[str, float]] = []
+        stop = asyncio.Event()
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            sampler = asyncio.create_task(
+                sample_server(session, pid, metrics_url, stats, samples, stop)
+            )
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + args.ramp_s + args.duration_s
+            clients = []
+            for i in range(args.sessions):
+                video = args.profile == "video" or (args.profile == "mixed" and i % 2 == 1)
+                client = VoiceClient(i, args, stats, video)
+                clients.append(asyncio.create_task(client.run(session, deadline)))
+                if args.ramp_s:
+                    await asyncio.sleep(args.ramp_s / args.sessions)
+            await asyncio.gather(*clients)
+            stop.set()
+            await sampler
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    cpu = [s["cpu_pct"] for s in samples]
+    rss = [s["rss_mb"] for s in samples]
+    return {
+        "config": {
+            "url": args.url,
+            "sessions": args.sessions,
+            "profile": args.profile,
+            "duration_s": args.duration_s,
+            "ramp_s": args.ramp_s,
+            "barge_in": args.barge_in,
+            "seed": args.seed,
+        },
+        "sessions": {
+            "target": args.sessions,
+            "connected": stats.connected,
+            "sustained": stats.sustained,
+            "dropped": stats.dropped,
+            "failed": stats.failed,
+            "handshake_ms": percentiles(stats.handshake_ms),
+        },
+        "turns": {
+            "started": stats.turns,
+            "completed": stats.turns_completed,
+            "interrupted": stats.interrupted,
+            "barge_ins": stats.barge_ins,
+            "latency_ms": percentiles(stats.turn_latency_ms),
+        },
+        "audio": {
+            "chunks_received": stats.audio_chunks,
+            "seconds_received": round(stats.audio_seconds, 1),
+            "underruns": stats.underruns,
+            "underrun_ms": round(stats.underrun_ms, 1),
+        },
+        "video": {"frames_sent": stats.frames_sent},
+        "client": {"send_lag_ms": percentiles(stats.send_lag_ms)},
+        "server": {
+            "cpu_pct": {
+                "mean": round(sum(cpu) / len(cpu), 1) if cpu else None,
+                "max": max(cpu) if cpu else None,
+            },
+            "rss_mb": {"max": max(rss) if rss else None},
+            "samples": samples,
+        },
+        "errors": stats.errors,
+    }
+
+
+def range_arg(value: str):
+    low, _, high = value.partition(",")
+    return (float(low), float(high or low))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="ws://localhost:8080/ws")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration-s", type=float, default=60)
+    parser.add_argument("--ramp-s", type=float, default=10, help="Spread connects over this long")
+    parser.add_argument("--profile", choices=("talker", "video", "mixed"), default="talker")
+    parser.add_argument("--utterance-s", type=range_arg, default=(1.0, 4.0), help="min,max")
+    parser.add_argument("--pause-s", type=range_arg, default=(0.5, 2.0), help="min,max")
+    parser.add_argument("--turn-timeout-s", type=float, default=15)
+    parser.add_argument("--barge-in", type=float, default=0.1, help="Chance to talk over a reply")
+    parser.add_argument("--frame-bytes", type=int, default=40_000)
+    parser.add_argument(
+        "--playout-buffer-ms", type=float, default=200, help="Client jitter buffer before playback"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, help="Sample CPU/RSS from /proc for this pid")
+    parser.add_argument(
+        "--spawn-server", action="store_true", help="Start combined_server.py with LIVE_BACKEND=fake"
+    )
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: cost of hot-path logging on the calling (event loop) thread.
+
+Emits the per-audio-chunk debug record many times under several logging setups and
+reports how long the calling thread spends per record:
+
+    eager_fstring_disabled  f-string built even though DEBUG is off (old hot path)
+    lazy_disabled           %-style args, DEBUG off (record never created)
+    sync_file               DEBUG on, FileHandler writing on the calling thread
+    queue_file              DEBUG on, LocalQueueHandler + listener thread writing the file
+    queue_file_sampled      as queue_file, with the "audio" category sampled 1 in 50
+    sync_slow_sink          DEBUG on, synchronous writes to a sink that stalls per write
+                            (a blocked stdout pipe or slow disk)
+    queue_slow_sink         as sync_slow_sink, through the listener thread
+
+Run from ces/backend/server:
+
+    python -m bench.log_overhead [--records 200000] [--sink-latency-us 200] [--json]
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from core.logger import LOG_FORMAT, LocalQueueHandler, SamplingFilter
+
+AUDIO_LOG = {"category": "audio"}
+
+
+def make_logger(name: str, level: int, handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(f"bench.{name}")
+    log.handlers = [handler]
+    log.setLevel(level)
+    log.propagate = False
+    return log
+
+
+def file_handler(path: str) -> logging.Handler:
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+class SlowSinkHandler(logging.Handler):
+    """Formats each record and then stalls, like a write to a congested pipe."""
+
+    def __init__(self, latency_s: float):
+        super().__init__()
+        self.latency_s = latency_s
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+        time.sleep(self.latency_s)
+
+
+def queued(output: logging.Handler, rates: dict):
+    """Returns a sampling LocalQueueHandler feeding `output`, and its started listener."""
+    queue_handler = LocalQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(rates))
+    listener = logging.handlers.QueueListener(queue_handler.queue, output)
+    listener.start()
+    return queue_handler, listener
+
+
+def run_case(log: logging.Logger, records: int, eager: bool) -> float:
+    """Returns calling-thread seconds spent emitting `records` records."""
+    session_id = "bench-session"
+    chunk = 9600
+    started = time.perf_counter()
+    if eager:
+        for _ in range(records):
+            log.debug(
+                f"[Session: {session_id}] Received direct audio data (PCM): {chunk} bytes"
+            )
+    else:
+        for _ in range(records):
+            log.debug(
+                "[Session: %s] Received direct audio data (PCM): %d bytes",
+                session_id,
+                chunk,
+                extra=AUDIO_LOG,
+            )
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument(
+        "--sink-latency-us", type=float, default=200, help="Per-write stall of the slow sink"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # DEBUG disabled: eager f-string vs lazy formatting
+        null = logging.NullHandler()
+        results["eager_fstring_disabled"] = run_case(
+            make_logger("eager", logging.INFO, null), args.records, eager=True
+        )
+        results["lazy_disabled"] = run_case(
+            make_logger("lazy", logging.INFO, null), args.records, eager=False
+        )
+
+        # DEBUG enabled, synchronous file writes
+        sync_handler = file_handler(os.path.join(tmp, "sync.log"))
+        results["sync_file"] = run_case(
+            make_logger("sync", logging.DEBUG, sync_handler), args.records, eager=False
+        )
+        sync_handler.close()
+
+        # DEBUG enabled, writes on a listener thread (with and without sampling)
+        for name, rates in (("queue_file", {}), ("queue_file_sampled", {"audio": 50})):
+            output = file_handler(os.path.join(tmp, f"{name}.log"))
+            queue_handler, listener = queued(output, rates)
+            results[name] = run_case(
+                make_logger(name, logging.DEBUG, queue_handler), args.records, eager=False
+            )
+            listener.stop()
+            output.close()
+
+    # A stalling sink: fewer records, the synchronous case is slow by construction
+    slow_records = max(1, args.records // 50)
+    latency_s = args.sink_latency_us / 1e6
+    results["sync_slow_sink"] = run_case(
+        make_logger("sync_slow", logging.DEBUG, SlowSinkHandler(latency_s)),
+        slow_records,
+        eager=False,
+    ) * (args.records / slow_records)
+    queue_handler, listener = queued(SlowSinkHandler(latency_s), {})
+    results["queue_slow_sink"] = run_case(
+        make_logger("queue_slow", logging.DEBUG, queue_handler), slow_records, eager=False
+    ) * (args.records / slow_records)
+    listener.stop()
+
+    report = {
+        name: {
+            "total_s": round(seconds, 4),
+            "us_per_record": round(seconds / args.records * 1e6, 3),
+            "records_per_s": round(args.records / seconds) if seconds else None,
+        }
+        for name, seconds in results.items()
+    }
+    if args.json:
+        print(json.dumps({"records": args.records, "results": report}, indent=2))
+        return
+
+    print(f"{args.records} records, calling-thread cost per record:")
+    for name, row in report.items():
+        print(f"  {name:<24} {row['us_per_record']:>9.3f} us  ({row['records_per_s']:,}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Replays a recorded session (RECORD_SESSIONS=true) against a server and diffs the timing.
+
+Client frames are sent at their recorded offsets divided by --speed, over a fresh
+connection; recorded detach/attach marks drop and resume the connection with the
+resume token the server issued. Server frames are collected with their arrival
+times and compared against the recording, with replay times scaled back by
+--speed:
+
+    counts        server messages per type, recorded vs replayed
+    drift         per type, the k-th replayed message vs the k-th recorded one
+    reply_onset   first audio of each reply (after --gap-s of outbound silence)
+
+Run from ces/backend/server, against a running server or one spawned on the fake runner:
+
+    python -m bench.replay /tmp/ces-recordings/<session_id>.cesrec --url ws://localhost:8080/ws
+    python -m bench.replay <recording> --spawn-server --url ws://localhost:18080/ws --speed 2
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from bench.loadgen import percentiles, spawn_server, wait_for_server
+from core.recorder import CLIENT_BINARY, CLIENT_TEXT, MARK, SERVER_TEXT, read_recording
+
+# As core.websocket_handler, which is too heavy to import here
+CLIENT_PROTOCOL = "ces.v1"
+RESUME_PROTOCOL_PREFIX = "resume."
+
+# (seconds since start, message type)
+Timeline = List[Tuple[float, str]]
+
+
+def message_type(payload: bytes) -> str:
+    try:
+        return json.loads(payload).get("type") or "unknown"
+    except ValueError:
+        return "invalid"
+
+
+def load(path: str) -> Tuple[List[Any], Timeline]:
+    """Splits a recording into the frames to replay and the recorded server timeline."""
+    _, frames = read_recording(path)
+    script, server = [], []
+    for frame in frames:
+        if frame.kind == SERVER_TEXT:
+            server.append((frame.t_ns / 1e9, message_type(frame.payload)))
+        elif frame.kind in (CLIENT_TEXT, CLIENT_BINARY, MARK):
+            script.append(frame)
+    return script, server
+
+
+def reply_onsets(timeline: Timeline, gap_s: float) -> List[float]:
+    """Times of the first audio message after at least gap_s without outbound audio."""
+    onsets, last_audio = [], None
+    for t, kind in timeline:
+        if kind != "audio":
+            continue
+        if last_audio is None or t - last_audio >= gap_s:
+            onsets.append(t)
+        last_audio = t
+    return onsets
+
+
+def diff(recorded: Timeline, replayed: Timeline, gap_s: float) -> Dict[str, Any]:
+    by_type: Dict[str, Tuple[List[float], List[float]]] = {}
+    for t, kind in recorded:
+        by_type.setdefault(kind, ([], []))[0].append(t)
+    for t, kind in replayed:
+        by_type.setdefault(kind, ([], []))[1].append(t)
+
+    counts, drift = {}, {}
+    for kind, (rec, rep) in sorted(by_type.items()):
+        counts[kind] = {"recorded": len(rec), "replayed": len(rep)}
+        deltas = [(b - a) * 1000 for a, b in zip(rec, rep)]
+        if deltas:
+            drift[kind] = percentiles(deltas)
+
+    rec_onsets = reply_onsets(recorded, gap_s)
+    rep_onsets = reply_onsets(replayed, gap_s)
+    onset_deltas = [(b - a) * 1000 for a, b in zip(rec_onsets, rep_onsets)]
+    return {
+        "counts": counts,
+        "drift_ms": drift,
+        "reply_onset": {
+            "recorded": len(rec_onsets),
+            "replayed": len(rep_onsets),
+            "drift_ms": percentiles(onset_deltas),
+            "per_reply_ms": [round(d, 1) for d in onset_deltas],
+        },
+    }
+
+
+class Replayer:
+    """Drives one recorded session against a server."""
+
+    def __init__(self, url: str, speed: float):
+        self.url = url
+        self.speed = speed
+        self.replayed: Timeline = []
+        self.resume_token: Optional[str] = None
+        self.started = 0.0
+
+    async def run(self, script: List[Any], tail_s: float) -> None:
+        self.started = time.monotonic()
+        ws, receiver = None, None
+        async with aiohttp.ClientSession() as session:
+            try:
+                for frame in script:
+                    due = self.started + frame.t_ns / 1e9 / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if frame.kind == MARK:
+                        event = json.loads(frame.payload).get("event")
+                        if event == "detach" and ws is not None:
+                            await self._close(ws, receiver)
+                            ws, receiver = None, None
+                        elif event == "attach" and ws is None:
+                            ws, receiver = await self._connect(session)
+                        continue
+                    if ws is None or ws.closed:
+                        ws, receiver = await self._connect(session)
+                    if frame.kind == CLIENT_BINARY:
+                        await ws.send_bytes(frame.payload)
+                    else:
+                        await ws.send_str(frame.payload.decode("utf-8"))
+                await asyncio.sleep(tail_s)
+            finally:
+                if ws is not None:
+                    await self._close(ws, receiver)
+
+    async def _connect(self, session: aiohttp.ClientSession):
+        protocols = [CLIENT_PROTOCOL]
+        if self.resume_token:
+            protocols.append(RESUME_PROTOCOL_PREFIX + self.resume_token)
+        ws = await session.ws_connect(self.url, protocols=protocols)
+        return ws, asyncio.create_task(self._receive(ws))
+
+    async def _close(self, ws, receiver: asyncio.Task) -> None:
+        await ws.close()
+        try:
+            await asyncio.wait_for(receiver, timeout=2)
+        except asyncio.TimeoutError:
+            receiver.cancel()
+
+    async def _receive(self, ws) -> None:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            t = (time.monotonic() - self.started) * self.speed
+            data = json.loads(msg.data)
+            kind = data.get("type") or "unknown"
+            if kind == "config":
+                self.resume_token = (data.get("data") or {}).get("resume_token")
+            self.replayed.append((t, kind))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    script, recorded = load(args.recording)
+    if not script:
+        raise SystemExit(f"{args.recording} has no client frames to replay")
+    last_client_s = script[-1].t_ns / 1e9
+    recorded_end_s = max([last_client_s] + [t for t, _ in recorded])
+    tail_s = args.tail_s if args.tail_s is not None else (recorded_end_s - last_client_s) / args.speed + 1
+
+    server = spawn_server(urlparse(args.url).port or 8080) if args.spawn_server else None
+    try:
+        if server:
+            parsed = urlparse(args.url)
+            await wait_for_server(f"http://{parsed.netloc}/metrics")
+        replayer = Replayer(args.url, args.speed)
+        await replayer.run(script, tail_s)
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    return {
+        "recording": args.recording,
+        "speed": args.speed,
+        "client_frames": sum(1 for frame in script if frame.kind != MARK),
+        "recorded_duration_s": round(recorded_end_s, 3),
+        **diff(recorded, replayer.replayed, args.gap_s),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"Replayed {report['client_frames']} client frames "
+        f"({report['recorded_duration_s']}s recorded) at {report['speed']}x"
+    )
+    print(f"  {'type':<14} {'recorded':>8} {'replayed':>8} {'drift p50':>10} {'p90':>8} {'max':>8}")
+    for kind, count in report["counts"].items():
+        drift = report["drift_ms"].get(kind) or {}
+        print(
+            f"  {kind:<14} {count['recorded']:>8} {count['replayed']:>8} "
+            f"{drift.get('p50', '-'):>10} {drift.get('p90', '-'):>8} {drift.get('max', '-'):>8}"
+        )
+    onset = report["reply_onset"]
+    print(
+        f"  reply onsets   {onset['recorded']:>8} {onset['replayed']:>8} "
+        f"{onset['drift_ms'].get('p50', '-'):>10} {onset['drift_ms'].get('p90', '-'):>8} "
+        f"{onset['drift_ms'].get('max', '-'):>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("recording", help="A .cesrec file written by the session recorder")
+    parser.add_argument("--url", default="ws://localhost:8080/ws")
+    parser.add_argument("--speed", type=float, default=1.0, help="2.0 replays twice as fast")
+    parser.add_argument("--gap-s", type=float, default=1.0, help="Outbound silence that starts a reply")
+    parser.add_argument("--tail-s", type=float, help="Wait after the last client frame (default: as recorded)")
+    parser.add_argument("--spawn-server", action="store_true", help="Start a fake-runner server at --url")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Tool latency under endpoint faults, with and without the tool guard.
+
+Points get_weather at a local stub and calls it sequentially, as one voice session
+would, in two scenarios:
+
+    tail   the stub answers in --base-ms, but --tail-pct of requests take --tail-ms
+           (a slow replica, a lost packet); the guard hedges after the recent p95
+    hung   the stub never answers; the guard returns a timeout error after the
+           tool's budget, then its circuit opens and calls fail immediately
+
+Each scenario runs the raw tool and the guarded one (core/tool_guard.py). The tool
+cache is bypassed: every call asks for a different city.
+
+Run from ces/backend/server:
+
+    python -m bench.tool_faults --calls 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from aiohttp import web
+
+from bench.loadgen import percentiles
+from core.agents.generic import tools as generic_tools
+from core.http_client import HTTP_CLIENT
+from core.logger import logger
+from core.metrics import TOOL_CIRCUITS_OPENED, TOOL_GUARD_EVENTS
+from core.tool_guard import BREAKERS
+
+# get_weather is cached_tool(guarded_tool(raw)): unwrap to skip the cache, then the guard
+GUARDED = generic_tools.get_weather.__wrapped__
+RAW = GUARDED.__wrapped__
+
+
+async def start_stub(args: argparse.Namespace) -> web.AppRunner:
+    async def weather(request: web.Request) -> web.Response:
+        if request.app["scenario"] == "hung":
+            await asyncio.sleep(3600)
+        slow = random.random() * 100 < args.tail_pct
+        await asyncio.sleep((args.tail_ms if slow else args.base_ms) / 1000)
+        return web.json_response({"city": request.query.get("city"), "temp_c": 21})
+
+    app = web.Application()
+    app["scenario"] = "tail"
+    app.router.add_get("/weather", weather)
+    runner = web.AppRunner(app, access_log=None, shutdown_timeout=0.1)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def measure(tool: Callable, calls: int) -> Dict[str, Any]:
+    TOOL_GUARD_EVENTS.values.clear()
+    TOOL_CIRCUITS_OPENED.values.clear()
+    BREAKERS.clear()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    for i in range(calls):
+        started = time.perf_counter()
+        result = await tool(f"Sydney {i}")
+        latencies.append((time.perf_counter() - started) * 1000)
+        if "error" in result:
+            kind = result.get("error_type", "other")
+            errors[kind] = errors.get(kind, 0) + 1
+    return {
+        "latency_ms": percentiles(latencies),
+        "errors": errors,
+        "events": {event: int(value) for (_, event), value in TOOL_GUARD_EVENTS.values.items()},
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    random.seed(args.seed)
+    stub = await start_stub(args)
+    generic_tools.WEATHER_FUNCTION_URL = f"http://localhost:{stub.addresses[0][1]}/weather"
+    results: Dict[str, Any] = {}
+    try:
+        for scenario, calls in (("tail", args.calls), ("hung", args.hung_calls)):
+            stub.app["scenario"] = scenario
+            for mode, tool in (("raw", RAW), ("guarded", GUARDED)):
+                # An unguarded call to a hung endpoint waits out the HTTP client timeout: once is enough
+                runs = 1 if (scenario, mode) == ("hung", "raw") else calls
+                results[f"{scenario}/{mode}"] = await measure(tool, runs)
+    finally:
+        await HTTP_CLIENT.close()
+        await stub.cleanup()
+    return {
+        "base_ms": args.base_ms,
+        "tail_ms": args.tail_ms,
+        "tail_pct": args.tail_pct,
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Stub: {report['base_ms']}ms, {report['tail_pct']}% of requests {report['tail_ms']}ms")
+    print(f"  {'scenario':<14} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors / guard events")
+    for name, row in report["results"].items():
+        latency = row["latency_ms"]
+        print(
+            f"  {name:<14} {latency['count']:>6} {latency['p50']:>9} {latency['p99']:>9} {latency['max']:>9}  "
+            f"{row['errors'] or '-'} / {row['events'] or '-'}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=200, help="Calls in the tail scenario")
+    parser.add_argument("--hung-calls", type=int, default=10, help="Calls in the hung scenario")
+    parser.add_argument("--base-ms", type=float, default=20)
+    parser.add_argument("--tail-ms", type=float, default=1500)
+    parser.add_argument("--tail-pct", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().handlers = [logging.NullHandler()]
+    logger.setLevel(logging.ERROR)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
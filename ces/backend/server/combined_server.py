@@ -7,11 +7,20 @@ Handles HTTP callbacks and delegates WebSocket connections to websocket_handler.
 
 import asyncio
 import json
+import multiprocessing
 import os
+import signal
+from typing import Optional
 
 # Use aiohttp for both HTTP and WebSockets
+import aiohttp
 from aiohttp import WSCloseCode, web
+from config.config import DRAIN_TIMEOUT_S, SERVER_WORKERS, SESSION_DIRECTORY
+from core import session_directory, websocket_handler
+from core.admin import handle_list_sessions, handle_profile, handle_terminate_session
+from core.http_client import HTTP_CLIENT, WORKER_CLIENTS
 from core.logger import logger
+from core.metrics import REGISTRY, monitor_event_loop_lag
 
 # Type hinting and utils needed for the callback handler
 from core.session_state import SessionState
@@ -20,15 +29,91 @@ from core.session_utils import SessionUtils
 # Import necessary components from core modules
 from core.websocket_handler import (
     ACTIVE_SESSIONS,  # Needed for callback handler
+    CLIENT_PROTOCOL,  # WebSocket subprotocol selected for clients
+    RESUME_PROTOCOL_PREFIX,  # Subprotocol prefix carrying a resume token
+    SESSION_POOL,  # Pre-warmed sessions, started/stopped with the app
+    drain_sessions,  # Graceful shutdown on SIGTERM
     handle_client,  # The original entry point for WS logic, now adapted for aiohttp
+    requested_resume_token,  # Resume token offered in the handshake
 )
 
 
+# Marks a callback already forwarded by another worker, so it is never forwarded twice
+FORWARDED_HEADER = session_directory.FORWARDED_HEADER
+
+
+async def forward_callback(
+    request: web.Request, owner_socket: str, body: bytes
+) -> web.Response:
+    """Forwards a callback to the worker owning the session, over its Unix socket."""
+    async with WORKER_CLIENTS.session(owner_socket).post(
+        f"http://localhost{request.path}",
+        data=body,
+        headers={"Content-Type": "application/json", FORWARDED_HEADER: "1"},
+        timeout=aiohttp.ClientTimeout(total=10),
+    ) as response:
+        return web.Response(
+            body=await response.read(),
+            status=response.status,
+            content_type="application/json",
+        )
+
+
+async def _pipe_websocket(source, sink) -> None:
+    """Relays text and binary frames from one websocket to the other until source closes."""
+    async for msg in source:
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            await sink.send_str(msg.data)
+        elif msg.type == aiohttp.WSMsgType.BINARY:
+            await sink.send_bytes(msg.data)
+
+
+async def forward_websocket(
+    request: web.Request, owner_socket: str, resume_token: str
+) -> Optional[web.WebSocketResponse]:
+    """
+    Relays a resuming client's websocket to the worker holding its session, over that
+    worker's Unix socket. Returns None, before the upgrade, if the owner is unreachable.
+    """
+    try:
+        upstream = await WORKER_CLIENTS.session(owner_socket).ws_connect(
+            "http://localhost/ws",
+            protocols=(CLIENT_PROTOCOL, RESUME_PROTOCOL_PREFIX + resume_token),
+            headers={FORWARDED_HEADER: "1"},
+            timeout=aiohttp.ClientWSTimeout(ws_close=10),
+        )
+    except (aiohttp.ClientError, OSError) as e:
+        logger.warning(f"Could not forward resume to {owner_socket}: {e}")
+        return None
+
+    ws = web.WebSocketResponse(heartbeat=25.0, protocols=(CLIENT_PROTOCOL,))
+    try:
+        await ws.prepare(request)
+        relays = [
+            asyncio.create_task(_pipe_websocket(ws, upstream)),
+            asyncio.create_task(_pipe_websocket(upstream, ws)),
+        ]
+        try:
+            await asyncio.wait(relays, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for relay in relays:
+                relay.cancel()
+        # Whichever side closed first, the other gets its close code
+        if not upstream.closed:
+            await upstream.close(code=ws.close_code or WSCloseCode.OK)
+        if not ws.closed:
+            await ws.close(code=upstream.close_code or WSCloseCode.OK)
+    finally:
+        await upstream.close()
+    return ws
+
+
 # --- HTTP Callback Handler (Unchanged from your original working version) ---
 async def handle_callback(request: web.Request):
     """Handles HTTP POST requests to the /callback endpoint."""
     logger.info(f"Received callback request at {request.path}")
     raw_data_decoded = "<Could not read body>"
+    raw_data = b""
     try:
         raw_data = await request.read()
         raw_data_decoded = raw_data.decode("utf-8", errors="ignore")
@@ -48,6 +133,15 @@ async def handle_callback(request: web.Request):
             )
 
         session: SessionState = ACTIVE_SESSIONS.get(session_id)
+        if not session and session_directory.current and not request.headers.get(
+            FORWARDED_HEADER
+        ):
+            # The session may live on another worker sharing this port
+            owner_socket = session_directory.current.owner_of(session_id)
+            if owner_socket:
+                logger.info(f"Forwarding callback for session {session_id} to {owner_socket}")
+                return await forward_callback(request, owner_socket, raw_data)
+
         if not session:
             logger.error(f"Callback received for invalid session_id: {session_id}")
             return web.json_response({"error": "Invalid session_id"}, status=404)
@@ -79,8 +173,31 @@ async def handle_websocket_entrypoint(request: web.Request):
     Accepts incoming WebSocket connections and delegates handling to
     core.websocket_handler.handle_client (adapted for aiohttp).
     """
+    resume_token = requested_resume_token(request)
+    if websocket_handler.DRAINING:
+        # Refuse before the upgrade so the load balancer retries another instance; a
+        # resume token is no use here either, as drained sessions are not kept
+        return web.json_response(
+            {"error": "Server draining"}, status=503, headers={"Retry-After": "1"}
+        )
+
+    if (
+        resume_token
+        and resume_token not in websocket_handler.RESUME_TOKENS
+        and session_directory.current
+        and not request.headers.get(FORWARDED_HEADER)
+    ):
+        # The session may live on another worker sharing this port
+        owner_socket = session_directory.current.token_owner(resume_token)
+        if owner_socket:
+            logger.info(f"Forwarding resumed connection to {owner_socket}")
+            forwarded = await forward_websocket(request, owner_socket, resume_token)
+            if forwarded is not None:
+                return forwarded
+
     heartbeat_interval = 25.0
-    ws = web.WebSocketResponse(heartbeat=heartbeat_interval)
+    # Select the client protocol, as browsers reject a handshake that ignores the ones offered
+    ws = web.WebSocketResponse(heartbeat=heartbeat_interval, protocols=(CLIENT_PROTOCOL,))
     connection_id = str(id(ws))  # Unique ID for logging this specific socket attempt
     try:
         # Prepare the WebSocket handshake (upgrades connection)
@@ -90,8 +207,10 @@ async def handle_websocket_entrypoint(request: web.Request):
         )
 
         # --- Delegate to the adapted handle_client ---
-        # Pass the established aiohttp WebSocketResponse object
-        await handle_client(ws)
+        # Pass the established aiohttp WebSocketResponse object, plus the resume
+        # token a reconnecting client received in its previous `config` message
+        # (offered as a subprotocol, see websocket_handler.CLIENT_PROTOCOL)
+        await handle_client(ws, resume_token=resume_token)
 
         # Log when the handler function returns control (implies connection ended)
         logger.info(f"handle_client finished for connection_id: {connection_id}")
@@ -121,34 +240,177 @@ async def handle_websocket_entrypoint(request: web.Request):
     return ws  # Return the WebSocketResponse
 
 
+# --- Metrics Endpoint ---
+async def handle_metrics(request: web.Request) -> web.Response:
+    """Exports this process's metrics in the Prometheus text format."""
+    return web.Response(
+        body=REGISTRY.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+# --- Application Lifecycle Hooks ---
+async def start_session_pool(app: web.Application) -> None:
+    """Starts warming sessions in the background once the app is up."""
+    await SESSION_POOL.start()
+
+
+async def stop_session_pool(app: web.Application) -> None:
+    """Closes any idle pre-warmed sessions on shutdown."""
+    await SESSION_POOL.stop()
+
+
+async def start_loop_lag_monitor(app: web.Application) -> None:
+    """Starts sampling event-loop lag for /metrics."""
+    app["loop_lag_monitor"] = asyncio.create_task(monitor_event_loop_lag())
+
+
+async def stop_loop_lag_monitor(app: web.Application) -> None:
+    app["loop_lag_monitor"].cancel()
+
+
+async def start_http_client(app: web.Application) -> None:
+    """Opens the pooled HTTP client shared by tools."""
+    await HTTP_CLIENT.start()
+
+
+async def stop_http_client(app: web.Application) -> None:
+    await HTTP_CLIENT.close()
+    await WORKER_CLIENTS.close()
+
+
 # --- Main Application Setup ---
-async def main() -> None:
-    """Starts the combined aiohttp server for HTTP and WebSocket."""
+async def main(worker_index: Optional[int] = None) -> None:
+    """
+    Starts the combined aiohttp server for HTTP and WebSocket.
+    When run as one of several workers, the port is shared via SO_REUSEPORT and the
+    worker also serves its internal Unix socket for forwarded callbacks and resumes.
+    """
     # Get port from environment variable for Cloud Run, default to 8080 locally
     port = int(os.environ.get("PORT", 8080))
+    is_worker = worker_index is not None
 
     app = web.Application()
 
     # Add routes
     app.router.add_post("/callback", handle_callback)
     app.router.add_get("/ws", handle_websocket_entrypoint)  # WebSocket endpoint
+    app.router.add_get("/metrics", handle_metrics)  # Prometheus scrape endpoint
+    app.router.add_post("/admin/profile", handle_profile)  # On-demand profile (ADMIN_TOKEN)
+    app.router.add_get("/admin/sessions", handle_list_sessions)  # Session inspector (ADMIN_TOKEN)
+    app.router.add_delete("/admin/sessions/{session_id}", handle_terminate_session)
+
+    app.on_startup.append(start_session_pool)
+    app.on_startup.append(start_loop_lag_monitor)
+    app.on_startup.append(start_http_client)
+    app.on_cleanup.append(stop_session_pool)
+    app.on_cleanup.append(stop_loop_lag_monitor)
+    app.on_cleanup.append(stop_http_client)
 
     runner = web.AppRunner(app)
     await runner.setup()
 
     # Listen on 0.0.0.0 to be accessible from Cloud Run's proxy
-    site = web.TCPSite(runner, "0.0.0.0", port)
+    site = web.TCPSite(runner, "0.0.0.0", port, reuse_port=is_worker)
     await site.start()
 
-    logger.info(f"Running combined HTTP/WebSocket server on 0.0.0.0:{port}...")
+    directory = None
+    if is_worker:
+        # Each worker answers /metrics for itself; the label keeps their series apart
+        REGISTRY.set_const_labels(worker=str(worker_index))
+        directory = session_directory.configure(SESSION_DIRECTORY)
+        internal_site = web.UnixSite(runner, directory.socket_path)
+        await internal_site.start()
+
+    worker_label = f"worker {worker_index} (pid {os.getpid()})" if is_worker else "server"
+    logger.info(f"Running combined HTTP/WebSocket {worker_label} on 0.0.0.0:{port}...")
     logger.info("WebSocket endpoint available at /ws")
     logger.info("HTTP callback endpoint available at /callback")
+    logger.info("Metrics endpoint available at /metrics")
+    logger.info("Admin endpoints available at /admin/* (require ADMIN_TOKEN)")
+
+    # Run until SIGTERM (e.g. a Cloud Run revision rollout) or SIGINT, then drain
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    try:
+        await stop_event.wait()
+        logger.info(f"Shutdown signal received; draining {worker_label}...")
+        await drain_sessions(DRAIN_TIMEOUT_S)
+    finally:
+        if directory:
+            directory.close()
+        await runner.cleanup()
+        logger.info(f"{worker_label.capitalize()} stopped.")
+
+
+# --- Multi-process Supervisor ---
+def run_worker(worker_index: int) -> None:
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(main(worker_index))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_supervisor(workers: int) -> None:
+    """
+    Runs `workers` server processes on the same port and restarts any that exit.
+    SIGTERM/SIGINT are forwarded to the workers.
+    """
+    session_directory.SessionDirectory.reset(SESSION_DIRECTORY)
+    # Spawn rather than fork: the parent has already created gRPC clients at import
+    # time (e.g. the TTS client), which must not be shared across a fork.
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(
+            target=run_worker, args=(index,), name=f"server-worker-{index}"
+        )
+        process.start()
+        processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        # Each worker drains its own sessions on SIGTERM
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        start(index)
+
+    while processes:
+        for index, process in list(processes.items()):
+            process.join(timeout=0.5)
+            if process.is_alive():
+                continue
+            del processes[index]
+            # Its sessions died with it: stop other workers forwarding to its socket
+            session_directory.SessionDirectory.purge_worker(SESSION_DIRECTORY, process.pid)
+            if not stopping:
+                logger.error(
+                    f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}; restarting."
+                )
+                start(index)
 
-    # Keep the server running indefinitely
-    await asyncio.Future()
+    logger.info("All workers stopped.")
 
 
 if __name__ == "__main__":
     # Ensure logger is configured before running
     logger.info("Starting server...")
-    asyncio.run(main())
+    if SERVER_WORKERS > 1:
+        logger.info(f"Starting supervisor with {SERVER_WORKERS} workers")
+        run_supervisor(SERVER_WORKERS)
+    else:
+        asyncio.run(main())
@@ -52,6 +52,114 @@ TTS_ENDPOINT = (
 )
 logger.info(f"USE_TTS: {USE_TTS}")
 
+# Session Pool Config (pre-warmed sessions handed to new WebSocket clients)
+SESSION_POOL_ENABLED = (
+    True if os.environ.get("SESSION_POOL_ENABLED", "true") == "true" else False
+)
+SESSION_POOL_MIN_SIZE = int(os.environ.get("SESSION_POOL_MIN_SIZE", 1))
+SESSION_POOL_MAX_SIZE = int(os.environ.get("SESSION_POOL_MAX_SIZE", 8))
+SESSION_POOL_WINDOW_S = float(os.environ.get("SESSION_POOL_WINDOW_S", 60))
+SESSION_POOL_MAX_AGE_S = float(os.environ.get("SESSION_POOL_MAX_AGE_S", 300))
+logger.info(
+    f"SESSION_POOL_ENABLED: {SESSION_POOL_ENABLED} (min={SESSION_POOL_MIN_SIZE}, max={SESSION_POOL_MAX_SIZE})"
+)
+
+# Session Resumption Config (grace window for a dropped client to re-attach)
+SESSION_RESUME_GRACE_S = float(os.environ.get("SESSION_RESUME_GRACE_S", 30))
+
+# Multi-process Serving Config (SERVER_WORKERS > 1 runs a supervisor forking workers)
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 1))
+SESSION_DIRECTORY = os.environ.get("SESSION_DIRECTORY", "/tmp/ces-sessions")
+
+# Drain Config (on SIGTERM: stop new sessions, let in-flight turns finish until the deadline)
+# Cloud Run allows 10s between SIGTERM and SIGKILL.
+DRAIN_TIMEOUT_S = float(os.environ.get("DRAIN_TIMEOUT_S", 8))
+DRAIN_RECONNECT_AFTER_MS = int(os.environ.get("DRAIN_RECONNECT_AFTER_MS", 500))
+
+# Live Backend Config ("gemini" for the Live API, "fake" for the offline scripted runner)
+LIVE_BACKEND = os.environ.get("LIVE_BACKEND", "gemini")
+FAKE_LIVE_SCRIPT = os.environ.get("FAKE_LIVE_SCRIPT", None)  # JSON turn script path
+FAKE_LIVE_SPEED = float(os.environ.get("FAKE_LIVE_SPEED", 1.0))  # 2.0 = twice real time
+FAKE_LIVE_TOKENS_PER_S = float(os.environ.get("FAKE_LIVE_TOKENS_PER_S", 3.0))
+FAKE_LIVE_AUDIO_CHUNK_MS = int(os.environ.get("FAKE_LIVE_AUDIO_CHUNK_MS", 40))
+FAKE_LIVE_LATENCY_MS = float(os.environ.get("FAKE_LIVE_LATENCY_MS", 400))
+FAKE_LIVE_JITTER_MS = float(os.environ.get("FAKE_LIVE_JITTER_MS", 0))
+FAKE_LIVE_SEED = int(os.environ.get("FAKE_LIVE_SEED", 0))  # Jitter seed; with the session number, reproducible
+FAKE_LIVE_VAD_THRESHOLD = int(os.environ.get("FAKE_LIVE_VAD_THRESHOLD", 1000))
+FAKE_LIVE_VAD_SILENCE_MS = float(os.environ.get("FAKE_LIVE_VAD_SILENCE_MS", 500))
+if LIVE_BACKEND == "fake":
+    logger.info(
+        f"LIVE_BACKEND: fake (speed={FAKE_LIVE_SPEED}, script={FAKE_LIVE_SCRIPT or 'built-in'})"
+    )
+
+# Turn Tracing Config (TRACE_EXPORT: "none", "log" or "jsonl" for OTLP/JSON spans on disk)
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "none")
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE", "/tmp/ces-turn-spans-{pid}.jsonl")
+TRACE_SPEECH_THRESHOLD = int(os.environ.get("TRACE_SPEECH_THRESHOLD", 1000))  # PCM peak counted as speech
+
+# Session Recording Config (opt-in binary log of every WebSocket frame, for bench/replay.py)
+RECORD_SESSIONS = (
+    True if os.environ.get("RECORD_SESSIONS", "false") == "true" else False
+)
+RECORD_DIR = os.environ.get("RECORD_DIR", "/tmp/ces-recordings")
+if RECORD_SESSIONS:
+    logger.info(f"RECORD_SESSIONS: True (dir={RECORD_DIR})")
+
+# Admin Config (/admin/* routes are disabled unless ADMIN_TOKEN is set; clients send it as a Bearer token)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", None)
+PROFILE_MAX_DURATION_S = float(os.environ.get("PROFILE_MAX_DURATION_S", 60))
+logger.info(f"ADMIN_ROUTES: {'enabled' if ADMIN_TOKEN else 'disabled'}")
+
+# HTTP Client Config (one pooled aiohttp session shared by every HTTP-backed tool)
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_DNS_CACHE_TTL_S = float(os.environ.get("HTTP_DNS_CACHE_TTL_S", 300))
+HTTP_KEEPALIVE_S = float(os.environ.get("HTTP_KEEPALIVE_S", 30))
+HTTP_TIMEOUT_S = float(os.environ.get("HTTP_TIMEOUT_S", 30))
+HTTP_CONNECT_TIMEOUT_S = float(os.environ.get("HTTP_CONNECT_TIMEOUT_S", 5))
+
+# ID Token Cache Config (Cloud Run ID tokens last an hour; refresh this long before expiry)
+ID_TOKEN_REFRESH_MARGIN_S = float(os.environ.get("ID_TOKEN_REFRESH_MARGIN_S", 300))
+ID_TOKEN_FALLBACK_TTL_S = float(os.environ.get("ID_TOKEN_FALLBACK_TTL_S", 600))  # If `exp` is unreadable
+
+# Tool Cache Config (process-wide result cache for idempotent tools; TTLs are set per tool)
+TOOL_CACHE_ENABLED = os.environ.get("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_MAX_BYTES = int(os.environ.get("TOOL_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Tool Executor Config (thread pool for tools calling blocking libraries such as yfinance)
+TOOL_EXECUTOR_WORKERS = int(os.environ.get("TOOL_EXECUTOR_WORKERS", 8))
+
+# Quote Cache Config (concurrent lookups of a ticker share one yfinance job)
+QUOTE_CACHE_TTL_S = float(os.environ.get("QUOTE_CACHE_TTL_S", 60))
+
+# Tool Guard Config (latency budgets are set per tool; breakers open after consecutive failures)
+TOOL_GUARD_ENABLED = os.environ.get("TOOL_GUARD_ENABLED", "true").lower() == "true"
+TOOL_BREAKER_FAILURES = int(os.environ.get("TOOL_BREAKER_FAILURES", 5))
+TOOL_BREAKER_COOLDOWN_S = float(os.environ.get("TOOL_BREAKER_COOLDOWN_S", 30))
+TOOL_HEDGE_MIN_SAMPLES = int(os.environ.get("TOOL_HEDGE_MIN_SAMPLES", 20))  # Latencies needed to estimate p95
+
+# Tool Dispatch Config (function calls of one model turn run concurrently, up to this many per session)
+TOOL_PARALLEL_ENABLED = os.environ.get("TOOL_PARALLEL_ENABLED", "true").lower() == "true"
+TOOL_MAX_CONCURRENCY = int(os.environ.get("TOOL_MAX_CONCURRENCY", 4))
+
+# Tool Prefetch Config (likely next tool calls run ahead of time into the tool cache; rules are "tool->next,...")
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_RULES = os.environ.get(
+    "PREFETCH_RULES", "get_weather->get_weather_forecast,get_stock_price->get_company_details"
+)
+PREFETCH_LEARN = os.environ.get("PREFETCH_LEARN", "true").lower() == "true"
+PREFETCH_MIN_CONFIDENCE = float(os.environ.get("PREFETCH_MIN_CONFIDENCE", 0.6))
+PREFETCH_MIN_SAMPLES = int(os.environ.get("PREFETCH_MIN_SAMPLES", 20))
+PREFETCH_MAX_INFLIGHT = int(os.environ.get("PREFETCH_MAX_INFLIGHT", 2))
+PREFETCH_WASTE_BUDGET = int(os.environ.get("PREFETCH_WASTE_BUDGET", 5))  # Unclaimed prefetches per session
+PREFETCH_CLAIM_WINDOW_S = float(os.environ.get("PREFETCH_CLAIM_WINDOW_S", 120))
+
+# Tool Result Budget Config (defaults for @budgeted_tool; tools set tighter budgets where they return a lot)
+TOOL_RESULT_BUDGET_ENABLED = os.environ.get("TOOL_RESULT_BUDGET_ENABLED", "true").lower() == "true"
+TOOL_RESULT_MAX_BYTES = int(os.environ.get("TOOL_RESULT_MAX_BYTES", 8192))
+TOOL_RESULT_MAX_ITEMS = int(os.environ.get("TOOL_RESULT_MAX_ITEMS", 5))
+TOOL_RESULT_MAX_STRING_CHARS = int(os.environ.get("TOOL_RESULT_MAX_STRING_CHARS", 1000))
+
 
 class ConfigurationError(Exception):
     """Custom exception for configuration errors."""
@@ -0,0 +1,167 @@
+"""
+Authenticated admin routes for inspecting a live server process.
+
+All routes are disabled (404) unless ADMIN_TOKEN is set, and require it as a
+bearer token: `Authorization: Bearer <ADMIN_TOKEN>`. With SERVER_WORKERS > 1
+each request is served by whichever worker accepted the connection, so profiles
+and session listings describe that worker only (its pid is in every response);
+terminating a session another worker owns is forwarded to that worker.
+"""
+
+import os
+import secrets
+import time
+from typing import Any, Dict
+
+import aiohttp
+from aiohttp import web
+from config.config import ADMIN_TOKEN, PROFILE_MAX_DURATION_S
+
+from . import session_directory
+from .http_client import WORKER_CLIENTS
+from .logger import logger
+from .profiler import ProfileInProgress, run_profile
+from .session_state import SessionState
+from .session_usage import SessionUsage, estimate_memory
+from .websocket_handler import ACTIVE_SESSIONS, terminate_session
+
+# Sort keys for /admin/sessions besides the SessionUsage counters
+SESSION_SORT_KEYS = set(SessionUsage.__slots__) | {"memory_bytes", "age_s", "turns"}
+
+
+def require_admin(request: web.Request) -> None:
+    """Rejects the request unless admin routes are enabled and it carries the admin token."""
+    if not ADMIN_TOKEN:
+        raise web.HTTPNotFound()
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        logger.warning(f"Rejected unauthenticated admin request to {request.path} from {request.remote}")
+        raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+
+
+async def _forward(request: web.Request, owner_socket: str) -> web.Response:
+    """Replays an admin request on the worker owning the session, over its Unix socket."""
+    async with WORKER_CLIENTS.session(owner_socket).request(
+        request.method,
+        f"http://localhost{request.path_qs}",
+        headers={
+            "Authorization": request.headers["Authorization"],
+            session_directory.FORWARDED_HEADER: "1",
+        },
+        timeout=aiohttp.ClientTimeout(total=10),
+    ) as response:
+        return web.Response(
+            body=await response.read(),
+            status=response.status,
+            content_type=response.content_type,
+        )
+
+
+def _float_param(request: web.Request, name: str, default: float, low: float, high: float) -> float:
+    try:
+        value = float(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be a number")
+    if not low <= value <= high:
+        raise web.HTTPBadRequest(text=f"{name} must be between {low} and {high}")
+    return value
+
+
+# --- Profiling ---
+
+
+async def handle_profile(request: web.Request) -> web.Response:
+    """
+    Profiles this process for a bounded window and returns a zip archive.
+
+    Query parameters:
+        duration_s: Profiling window, up to PROFILE_MAX_DURATION_S (default 10).
+        interval_ms: Stack sampling interval (default 5).
+        slow_callback_ms: Report loop callbacks slower than this (default 50).
+        memory: "false" to skip the tracemalloc diff (default "true"). Tracing
+            allocations slows the loop down, so use "false" when profiling CPU.
+        top: Entries per summary table (default 25).
+    """
+    require_admin(request)
+    duration_s = _float_param(request, "duration_s", 10, 0.1, PROFILE_MAX_DURATION_S)
+    interval_ms = _float_param(request, "interval_ms", 5, 1, 1000)
+    slow_callback_ms = _float_param(request, "slow_callback_ms", 50, 1, 60000)
+    top = int(_float_param(request, "top", 25, 1, 500))
+    trace_memory = request.query.get("memory", "true") != "false"
+
+    logger.info(f"Admin profile requested by {request.remote}: {duration_s}s, memory={trace_memory}")
+    try:
+        archive = await run_profile(
+            duration_s,
+            interval_s=interval_ms / 1000,
+            slow_callback_s=slow_callback_ms / 1000,
+            trace_memory=trace_memory,
+            top=top,
+        )
+    except ProfileInProgress:
+        raise web.HTTPConflict(text="A profile is already running in this process")
+
+    filename = f"ces-profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.zip"
+    return web.Response(
+        body=archive,
+        content_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# --- Session Inspector ---
+
+
+def describe_session(session: SessionState, now: float) -> Dict[str, Any]:
+    memory = estimate_memory(session)
+    return {
+        "session_id": session.user_id,
+        "app_name": session.app_name,
+        "attached": session.websocket is not None,
+        "age_s": round(now - session.created_at, 1),
+        "turns": session.turns_completed,
+        "video_active": session.video_active,
+        **session.usage.to_dict(),
+        "memory_bytes": memory["total"],
+        "memory": memory,
+    }
+
+
+async def handle_list_sessions(request: web.Request) -> web.Response:
+    """
+    Lists this process's sessions with their resource usage, most expensive first.
+
+    Query parameters:
+        sort: A SessionUsage counter, "memory_bytes", "age_s" or "turns" (default "bytes_out").
+        order: "desc" (default) or "asc".
+        limit: Maximum sessions returned (default 50).
+    """
+    require_admin(request)
+    sort = request.query.get("sort", "bytes_out")
+    if sort not in SESSION_SORT_KEYS:
+        raise web.HTTPBadRequest(text=f"sort must be one of: {', '.join(sorted(SESSION_SORT_KEYS))}")
+    limit = int(_float_param(request, "limit", 50, 1, 10000))
+    now = time.time()
+    sessions = [describe_session(session, now) for session in list(ACTIVE_SESSIONS.values())]
+    sessions.sort(key=lambda row: row[sort], reverse=request.query.get("order", "desc") != "asc")
+    return web.json_response(
+        {"pid": os.getpid(), "count": len(sessions), "sort": sort, "sessions": sessions[:limit]}
+    )
+
+
+async def handle_terminate_session(request: web.Request) -> web.Response:
+    """Ends a session, disconnecting its client if one is attached."""
+    require_admin(request)
+    session_id = request.match_info["session_id"]
+    if (
+        session_id not in ACTIVE_SESSIONS
+        and session_directory.current
+        and not request.headers.get(session_directory.FORWARDED_HEADER)
+    ):
+        # The session may live on another worker sharing this port
+        owner_socket = session_directory.current.owner_of(session_id)
+        if owner_socket:
+            return await _forward(request, owner_socket)
+    if not await terminate_session(session_id):
+        raise web.HTTPNotFound(text=f"No session {session_id} in process {os.getpid()}")
+    return web.json_response({"pid": os.getpid(), "session_id": session_id, "terminated": True})
@@ -26,6 +26,7 @@ from core.agents.generic.generic_assist import create_generic_agent
 
 
 from .logger import logger
+from .session_context import SessionContext
 
 def get_agent_config(session_id: str):
     agent_config = {"app_name": None, "root_agent": None, "context": None}
@@ -33,18 +34,24 @@ def get_agent_config(session_id: str):
         # --- Add Optus Modem Option ---
     if DEMO_TYPE == "optus_modem_setup":
         agent_config["app_name"] = "optus_modem_setup"
-        agent_config["context"] = OptusModemContext.CUSTOMER_PROFILE
-        agent_config["context"]["session_id"] = session_id # Add session_id to context
-        agent_config["context"]["video_status"] = "inactive" # Set initial video status
+        # Layer per-session keys over the shared profile; never write into it
+        agent_config["context"] = SessionContext.from_profile(
+            OptusModemContext.CUSTOMER_PROFILE,
+            session_id=session_id,
+            video_status="inactive", # Set initial video status
+        )
         agent_config["root_agent"] = create_optus_modem_agent ()
     # --- End Optus Modem Option ---
 
      # --- Add Generic Option ---
     elif DEMO_TYPE == "generic":
         agent_config["app_name"] = "generic"
-        agent_config["context"] = GenericContext.CUSTOMER_PROFILE
-        agent_config["context"]["session_id"] = session_id # Add session_id to context
-        agent_config["context"]["video_status"] = "inactive" # Set initial video status
+        # Layer per-session keys over the shared profile; never write into it
+        agent_config["context"] = SessionContext.from_profile(
+            GenericContext.CUSTOMER_PROFILE,
+            session_id=session_id,
+            video_status="inactive", # Set initial video status
+        )
         agent_config["root_agent"] = create_generic_agent ()
      # --- Add Generic Option ---
 
@@ -0,0 +1,90 @@
+"""
+Single-flight, cached Yahoo Finance lookups for the stock tools.
+
+A ticker lookup that arrives while the same symbol is already being fetched
+waits for that fetch instead of starting its own, so a burst of sessions asking
+about GOOG, GOOG and AAPL costs one lookup per distinct symbol. Each symbol is
+fetched as soon as it is asked for, as its own job on the tool executor: a cache
+miss never waits for other lookups to join it. The `info` dict of each symbol is
+then cached for QUOTE_CACHE_TTL_S and shared by get_stock_price and
+get_company_details.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Set, Tuple
+
+import yfinance as yf
+from config.config import QUOTE_CACHE_TTL_S
+from core.tool_executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_SYMBOLS = 1000
+
+
+def _fetch_info(symbol: str) -> Dict[str, Any]:
+    """Fetches one symbol's `info`. Runs on a worker thread."""
+    return yf.Ticker(symbol).info
+
+
+class QuoteCache:
+    """
+    Shares in-flight ticker lookups between callers and caches the results.
+
+    Attributes:
+        ttl_s (float): How long a symbol's info is served from the cache.
+    """
+
+    def __init__(self, ttl_s: float = QUOTE_CACHE_TTL_S):
+        self.ttl_s = ttl_s
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._fetches: Set[asyncio.Task] = set()
+
+    async def info(self, symbol: str) -> Dict[str, Any]:
+        """
+        Returns yfinance's `info` dict for a ticker symbol.
+
+        Raises:
+            Exception: Whatever yfinance raised for this symbol.
+        """
+        symbol = symbol.strip().upper()
+        cached = self._cache.get(symbol)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        future = self._in_flight.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[symbol] = future
+            task = asyncio.create_task(self._fetch(symbol, future))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+        # Shielded so a cancelled caller does not cancel the lookup for the other waiters
+        return await asyncio.shield(future)
+
+    async def _fetch(self, symbol: str, future: asyncio.Future) -> None:
+        started = time.perf_counter()
+        try:
+            info = await run_blocking(_fetch_info, symbol)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved here too, in case every waiter was cancelled
+            return
+        finally:
+            # Removed only once resolved, so callers arriving mid-fetch join this one
+            self._in_flight.pop(symbol, None)
+        logger.info(f"Fetched quote for {symbol} in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        if len(self._cache) >= MAX_CACHED_SYMBOLS:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[symbol] = (time.monotonic() + self.ttl_s, info)
+        future.set_result(info)
+
+
+QUOTES = QuoteCache()
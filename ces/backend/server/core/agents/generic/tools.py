@@ -8,10 +8,14 @@ import re # For parsing prices
 import aiohttp
 from typing import Dict, Any
 from urllib.parse import urlencode
-import yfinance as yf
+from yfinance.exceptions import YFRateLimitError
 
 from google.adk.tools.tool_context import ToolContext
+from core.http_client import get_http_session
+from core.tool_cache import cached_tool
+from core.tool_guard import UPSTREAM_ERROR, guarded_tool
 from .context import GenericContext # Imports LIVE_OPTUS_CATALOG_DATA
+from .quotes import QUOTES
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +24,23 @@ WEATHER_FUNCTION_URL = os.environ.get("WEATHER_FUNCTION_URL")
 FORECAST_FUNCTION_URL = os.environ.get("FORECAST_FUNCTION_URL")
 HEALTH_STATS_FUNCTION_URL = os.environ.get("HEALTH_STATS_FUNCTION_URL")
 
+def _status_error(status: int) -> Dict[str, Any]:
+    """Error result for a non-200 response; only server-side statuses count against the service."""
+    error = {"error": f"Cloud function returned status {status}"}
+    if status >= 500 or status == 429:
+        error["error_type"] = UPSTREAM_ERROR
+    return error
+
+
+def _is_upstream_error(e: Exception) -> bool:
+    """Whether a yfinance exception means Yahoo is failing, rather than the ticker being unknown."""
+    if isinstance(e, YFRateLimitError):
+        return True
+    if not isinstance(e, OSError):
+        return False  # Parse and data errors for a bad symbol
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status is None or status >= 500 or status == 429
+
 # --- Tool Implementations for Ollie ---
 
 def greeting() -> dict:
@@ -32,6 +53,8 @@ def get_current_datetime_tool() -> dict:
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return {"current_datetime_str": now_str}
 
+@cached_tool(ttl_s=600)
+@guarded_tool(budget_s=4, endpoint="weather", hedge=True)
 async def get_weather(city: str) -> Dict[str, Any]:
     """Gets the current weather for a given city.
 
@@ -47,22 +70,24 @@ async def get_weather(city: str) -> Dict[str, Any]:
     function_url = f"{WEATHER_FUNCTION_URL}?{query_string}"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(function_url) as response:
-                response_text = await response.text()
-                logger.debug(f"Weather Response status: {response.status}")
-                logger.debug(f"Weather Response body: {response_text}")
-                if response.status != 200:
-                    logger.error(f"Cloud function error: {response_text}")
-                    return {"error": f"Cloud function returned status {response.status}"}
-                return await response.json()
+        session = get_http_session()
+        async with session.get(function_url) as response:
+            response_text = await response.text()
+            logger.debug(f"Weather Response status: {response.status}")
+            logger.debug(f"Weather Response body: {response_text}")
+            if response.status != 200:
+                logger.error(f"Cloud function error: {response_text}")
+                return _status_error(response.status)
+            return await response.json()
     except aiohttp.ClientError as e:
         logger.error(f"Network error calling weather function: {str(e)}")
-        return {"error": f"Failed to call weather service: {str(e)}"}
+        return {"error": f"Failed to call weather service: {str(e)}", "error_type": UPSTREAM_ERROR}
     except Exception as e:
         logger.error(f"Error getting weather for {city}: {str(e)}")
-        return {"error": f"Tool execution failed: {str(e)}"}
+        return {"error": f"Tool execution failed: {str(e)}", "error_type": UPSTREAM_ERROR}
 
+@cached_tool(ttl_s=1800)
+@guarded_tool(budget_s=4, endpoint="forecast", hedge=True)
 async def get_weather_forecast(city: str) -> Dict[str, Any]:
     """Get weather forecast information for a location.
 
@@ -78,22 +103,23 @@ async def get_weather_forecast(city: str) -> Dict[str, Any]:
     function_url = f"{FORECAST_FUNCTION_URL}?{query_string}"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(function_url) as response:
-                response_text = await response.text()
-                logger.debug(f"Forecast Response status: {response.status}")
-                logger.debug(f"Forecast Response body: {response_text}")
-                if response.status != 200:
-                    logger.error(f"Cloud function error: {response_text}")
-                    return {"error": f"Cloud function returned status {response.status}"}
-                return await response.json()
+        session = get_http_session()
+        async with session.get(function_url) as response:
+            response_text = await response.text()
+            logger.debug(f"Forecast Response status: {response.status}")
+            logger.debug(f"Forecast Response body: {response_text}")
+            if response.status != 200:
+                logger.error(f"Cloud function error: {response_text}")
+                return _status_error(response.status)
+            return await response.json()
     except aiohttp.ClientError as e:
         logger.error(f"Network error calling forecast function: {str(e)}")
-        return {"error": f"Failed to call forecast service: {str(e)}"}
+        return {"error": f"Failed to call forecast service: {str(e)}", "error_type": UPSTREAM_ERROR}
     except Exception as e:
         logger.error(f"Error getting forecast for {city}: {str(e)}")
-        return {"error": f"Tool execution failed: {str(e)}"}
+        return {"error": f"Tool execution failed: {str(e)}", "error_type": UPSTREAM_ERROR}
 
+@guarded_tool(budget_s=5, endpoint="health stats", hedge=True)
 async def get_health_stats(search_query: str) -> Dict[str, Any]:
     """Get the users health stats including sleep, activities, heart rate.
 
@@ -109,21 +135,21 @@ async def get_health_stats(search_query: str) -> Dict[str, Any]:
     function_url = f"{HEALTH_STATS_FUNCTION_URL}?{query_string}"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(function_url) as response:
-                response_text = await response.text()
-                logger.debug(f"Health Stats Response status: {response.status}")
-                logger.debug(f"Health Stats Response body: {response_text}")
-                if response.status != 200:
-                    logger.error(f"Cloud function error: {response_text}")
-                    return {"error": f"Cloud function returned status {response.status}"}
-                return await response.json()
+        session = get_http_session()
+        async with session.get(function_url) as response:
+            response_text = await response.text()
+            logger.debug(f"Health Stats Response status: {response.status}")
+            logger.debug(f"Health Stats Response body: {response_text}")
+            if response.status != 200:
+                logger.error(f"Cloud function error: {response_text}")
+                return _status_error(response.status)
+            return await response.json()
     except aiohttp.ClientError as e:
         logger.error(f"Network error calling health stats function: {str(e)}")
-        return {"error": f"Failed to call health stats service: {str(e)}"}
+        return {"error": f"Failed to call health stats service: {str(e)}", "error_type": UPSTREAM_ERROR}
     except Exception as e:
         logger.error(f"Error getting health stats for {search_query}: {str(e)}")
-        return {"error": f"Tool execution failed: {str(e)}"}
+        return {"error": f"Tool execution failed: {str(e)}", "error_type": UPSTREAM_ERROR}
     
 #!/usr/bin/env python
 
@@ -133,6 +159,8 @@ async def get_health_stats(search_query: str) -> Dict[str, Any]:
 # Before running, you must install the yfinance library:
 # pip install yfinance
 
+@cached_tool(ttl_s=60)
+@guarded_tool(budget_s=6, endpoint="finance", hedge=True)
 async def get_stock_price(ticker_symbol: str) -> Dict[str, Any]:
     """
     Fetches stock price and 52-week high/low for a given ticker symbol.
@@ -150,8 +178,7 @@ async def get_stock_price(ticker_symbol: str) -> Dict[str, Any]:
         }
 
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
+        info = await QUOTES.info(ticker_symbol)
 
         company_name = info.get('longName', 'N/A')
         price = info.get('regularMarketPrice')
@@ -189,12 +216,17 @@ async def get_stock_price(ticker_symbol: str) -> Dict[str, Any]:
                 }
 
     except Exception as e:
-        return {
+        error = {
             "status": "error",
             "message": f"An error occurred: {e}. Please ensure the ticker symbol is correct and you have an internet connection."
         }
+        if _is_upstream_error(e):
+            error["error_type"] = UPSTREAM_ERROR
+        return error
 
-def get_company_details(ticker_symbol: str) -> Dict[str, Any]:
+@cached_tool(ttl_s=86400)
+@guarded_tool(budget_s=6, endpoint="finance", hedge=True)
+async def get_company_details(ticker_symbol: str) -> Dict[str, Any]:
     """
     Fetches and returns key company details for a given ticker symbol.
 
@@ -211,8 +243,7 @@ def get_company_details(ticker_symbol: str) -> Dict[str, Any]:
         }
 
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
+        info = await QUOTES.info(ticker_symbol)
 
         return {
             "status": "success",
@@ -227,10 +258,13 @@ def get_company_details(ticker_symbol: str) -> Dict[str, Any]:
         }
 
     except Exception as e:
-        return {
+        error = {
             "status": "error",
             "message": f"An error occurred while fetching company details: {e}. Please ensure the ticker symbol is correct and you have an internet connection."
         }
+        if _is_upstream_error(e):
+            error["error_type"] = UPSTREAM_ERROR
+        return error
 
  
 def request_visual_input(reason_for_request: str, tool_context: ToolContext) -> dict:
@@ -8,6 +8,9 @@ from google.adk.tools import BaseTool
 # from google.adk.tools.tool_context import ToolContext # If complex callbacks needed
 
 from config.config import MODEL
+from core.prefetch import prefetch_after_tool
+from core.tool_dispatch import parallel_tool_dispatch
+from core.tool_registry import TOOL_REGISTRY
 from .prompts import OptusModemPrompts # Will import OlliePrompts from prompts_R3.py
 # Assuming session_utils is in parent directory, adjust if necessary
 # from ...session_utils import SessionUtils # Example if session_utils is in a parent 'core' directory
@@ -76,11 +79,13 @@ def create_optus_modem_agent(
         name=name,
         global_instruction=global_instructions,
         instruction=instruction,
-        tools=final_tools,
+        tools=TOOL_REGISTRY.instrument(final_tools),  # Per-tool latency, outcome and payload metrics
         sub_agents=final_sub_agents,
     )
 
     # Assign callbacks if defined and needed (ensure SessionUtils is correctly imported if used)
+    agent.before_tool_callback = parallel_tool_dispatch  # Runs a turn's function calls concurrently
+    agent.after_tool_callback = prefetch_after_tool  # Starts likely next tool calls ahead of time
     # agent.before_tool_callback = logic_check_ollie
     # agent.after_tool_callback = after_tool_routing_ollie
     # agent.before_model_callback = SessionUtils.log_before_model # Ensure SessionUtils is available
@@ -1,8 +1,9 @@
 # ./server/core/agents/ollie/tools.py
+import asyncio
 import logging
 import os
 import json
-import requests
+import aiohttp
 import re # For parsing prices
 
 # For Google Cloud authentication and ID token generation (retained for other tools)
@@ -12,6 +13,10 @@ from google.oauth2 import id_token as google_id_token
 import google.auth.exceptions
 
 from google.adk.tools.tool_context import ToolContext
+from core.http_client import get_http_session
+from core.id_token_cache import IdTokenCache
+from core.result_budget import budgeted_tool
+from core.tool_guard import UPSTREAM_ERROR, guarded_tool
 from .context import OptusModemContext # Imports LIVE_OPTUS_CATALOG_DATA
 
 logger = logging.getLogger(__name__)
@@ -85,6 +90,10 @@ def get_id_token(target_audience_url: str) -> str:
             logger.error(f"Credentials state at time of error: valid={credentials.valid}, expired={credentials.expired}, token={credentials.token is not None}")
         raise
 
+# Tokens are cached per audience until shortly before they expire. get_id_token is
+# looked up at call time so it can be swapped out.
+ID_TOKENS = IdTokenCache(lambda audience: get_id_token(audience))
+
 # --- Tool Implementations for Ollie ---
 
 def greeting() -> dict:
@@ -97,7 +106,34 @@ def get_current_datetime_tool() -> dict:
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return {"current_datetime_str": now_str}
 
-def custom_web_search(search_query: str, tool_context: ToolContext, num_results: int = 3) -> dict:
+async def _post_json(url: str, payload: dict, token: str, timeout_s: float) -> dict:
+    """POSTs to a Cloud Run service on the pooled HTTP client and returns the decoded JSON body.
+
+    Raises aiohttp.ClientResponseError for HTTP error statuses, with the response body as its message.
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+    session = get_http_session()
+    async with session.post(url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout_s)) as response:
+        body = await response.text()
+        if response.status >= 400:
+            raise aiohttp.ClientResponseError(
+                response.request_info, response.history, status=response.status, message=body or "No response body"
+            )
+        return json.loads(body)
+
+def _http_error(fields: dict, service: str, status: int) -> dict:
+    """Error result for an HTTP error status; only server-side statuses count against the service."""
+    error = {**fields, "error": f"{service.capitalize()} service request failed (HTTP {status})."}
+    if status >= 500 or status == 429:
+        error["error_type"] = UPSTREAM_ERROR
+    return error
+
+@budgeted_tool(max_tokens=1000, max_string_chars=400)
+@guarded_tool(budget_s=8, endpoint="web search", hedge=True, error_fields={"search_results": []})
+async def custom_web_search(search_query: str, tool_context: ToolContext, num_results: int = 3) -> dict:
     logger.info(f"Tool: custom_web_search (via authenticated Cloud Run) called with query: '{search_query}', num_results: {num_results}")
 
     if not CUSTOM_SEARCH_CLOUD_RUN_URL:
@@ -105,7 +141,7 @@ def custom_web_search(search_query: str, tool_context: ToolContext, num_results:
         return {"search_results": [], "error": "Search service endpoint not configured."}
 
     try:
-        token = get_id_token(CUSTOM_SEARCH_CLOUD_RUN_URL)
+        token = await ID_TOKENS.get(CUSTOM_SEARCH_CLOUD_RUN_URL)
     except Exception as auth_err:
         logger.error(f"Authentication failed for custom_web_search: {str(auth_err)}")
         return {"search_results": [], "error": f"Authentication failed for search service: {str(auth_err)}"}
@@ -115,16 +151,9 @@ def custom_web_search(search_query: str, tool_context: ToolContext, num_results:
         "num_results": num_results,
         "simplified_response": True 
     }
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}"
-    }
 
     try:
-        response = requests.post(CUSTOM_SEARCH_CLOUD_RUN_URL, json=payload, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await _post_json(CUSTOM_SEARCH_CLOUD_RUN_URL, payload, token, timeout_s=15)
         if "error" in data: 
             logger.error(f"Custom Search Cloud Run service returned an error: {data['error']}")
             return {"search_results": [], "error": data["error"]}
@@ -134,18 +163,20 @@ def custom_web_search(search_query: str, tool_context: ToolContext, num_results:
              logger.info(f"No search results from Cloud Run for query: '{search_query}'")
         return {"search_results": search_results}
 
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error calling Custom Search Cloud Run: {http_err} - Response: {http_err.response.text if http_err.response else 'No response body'}")
-        return {"search_results": [], "error": f"Search service request failed (HTTP {http_err.response.status_code if http_err.response else 'Unknown'})."}
-    except requests.exceptions.RequestException as req_err:
-        logger.exception(f"Error calling Custom Search Cloud Run: {req_err}")
-        return {"search_results": [], "error": f"Could not connect to search service: {str(req_err)}"}
+    except aiohttp.ClientResponseError as http_err:
+        logger.error(f"HTTP error calling Custom Search Cloud Run: {http_err.status} - Response: {http_err.message}")
+        return _http_error({"search_results": []}, "search", http_err.status)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+        logger.exception(f"Error calling Custom Search Cloud Run: {req_err!r}")
+        return {"search_results": [], "error": f"Could not connect to search service: {str(req_err) or 'request timed out'}", "error_type": UPSTREAM_ERROR}
     except json.JSONDecodeError:
-        logger.error(f"Failed to decode JSON response from Custom Search Cloud Run. Response: {response.text if response else 'No response object'}")
-        return {"search_results": [], "error": "Invalid response format from search service."}
+        logger.error("Failed to decode JSON response from Custom Search Cloud Run.")
+        return {"search_results": [], "error": "Invalid response format from search service.", "error_type": UPSTREAM_ERROR}
 
 
-def web_content_summarizer(url: str, tool_context: ToolContext) -> dict:
+@budgeted_tool(max_tokens=1500, max_string_chars=6000)
+@guarded_tool(budget_s=25, endpoint="web summarizer", error_fields={"summary": None})
+async def web_content_summarizer(url: str, tool_context: ToolContext) -> dict:
     logger.info(f"Tool: web_content_summarizer (via authenticated Cloud Run) called for URL: '{url}'")
 
     if not WEB_SUMMARIZER_CLOUD_RUN_URL:
@@ -153,22 +184,15 @@ def web_content_summarizer(url: str, tool_context: ToolContext) -> dict:
         return {"summary": None, "error": "Summarizer service endpoint not configured."}
 
     try:
-        token = get_id_token(WEB_SUMMARIZER_CLOUD_RUN_URL)
+        token = await ID_TOKENS.get(WEB_SUMMARIZER_CLOUD_RUN_URL)
     except Exception as auth_err:
         logger.error(f"Authentication failed for web_content_summarizer: {str(auth_err)}")
         return {"summary": None, "error": f"Authentication failed for summarizer service: {str(auth_err)}"}
 
     payload = {"url": url}
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}"
-    }
 
     try:
-        response = requests.post(WEB_SUMMARIZER_CLOUD_RUN_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await _post_json(WEB_SUMMARIZER_CLOUD_RUN_URL, payload, token, timeout_s=30)
         if "error" in data: 
             logger.error(f"Web Summarizer Cloud Run service returned an error: {data['error']}")
             return {"summary": None, "error": data["error"]}
@@ -179,15 +203,15 @@ def web_content_summarizer(url: str, tool_context: ToolContext) -> dict:
             return {"summary": None, "message": "Content could not be summarized or the summary was empty."}
         return {"summary": summary}
 
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error calling Web Summarizer Cloud Run: {http_err} - Response: {http_err.response.text if http_err.response else 'No response body'}")
-        return {"summary": None, "error": f"Summarizer service request failed (HTTP {http_err.response.status_code if http_err.response else 'Unknown'})."}
-    except requests.exceptions.RequestException as req_err:
-        logger.exception(f"Error calling Web Summarizer Cloud Run: {req_err}")
-        return {"summary": None, "error": f"Could not connect to summarizer service: {str(req_err)}"}
+    except aiohttp.ClientResponseError as http_err:
+        logger.error(f"HTTP error calling Web Summarizer Cloud Run: {http_err.status} - Response: {http_err.message}")
+        return _http_error({"summary": None}, "summarizer", http_err.status)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
+        logger.exception(f"Error calling Web Summarizer Cloud Run: {req_err!r}")
+        return {"summary": None, "error": f"Could not connect to summarizer service: {str(req_err) or 'request timed out'}", "error_type": UPSTREAM_ERROR}
     except json.JSONDecodeError:
-        logger.error(f"Failed to decode JSON response from Web Summarizer Cloud Run. Response: {response.text if response else 'No response object'}")
-        return {"summary": None, "error": "Invalid response format from summarizer service."}
+        logger.error("Failed to decode JSON response from Web Summarizer Cloud Run.")
+        return {"summary": None, "error": "Invalid response format from summarizer service.", "error_type": UPSTREAM_ERROR}
 
 def _get_price_string(product_data: dict) -> str:
     """Extracts a representative price string from product data."""
@@ -232,6 +256,7 @@ def _get_stock_status(product_data: dict) -> str:
     return "In Stock"
 
 
+@budgeted_tool(max_tokens=1000, max_items=5, max_string_chars=300)
 def search_live_optus_catalog(search_term: str, tool_context: ToolContext) -> dict:
     """
     Searches the Optus product catalog (from a local JSON data source) for Android devices using a search term.
@@ -0,0 +1,95 @@
+"""
+Cheap debug logging of live agent events.
+
+Reads only the fields worth logging (text, function_call, function_response)
+straight off the event's parts instead of serializing the content with pydantic,
+and collapses a turn's streamed partial text into a single log line. Only names
+and sizes are logged, never the text or tool payloads themselves: those can hold
+personal data, and the handler already logs each tool call and result by name.
+"""
+
+import json
+import logging
+from typing import Any, Optional
+
+from google.adk.events import Event
+
+from .logger import logger
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class EventInspector:
+    """
+    Logs the shape of one session's events at DEBUG level.
+
+    Partial model text is counted and logged once per turn: when the final
+    (non-partial) text arrives, or when the turn completes or is interrupted
+    before one does.
+
+    Attributes:
+        session_id (str): Session the events belong to, used as the log prefix.
+    """
+
+    __slots__ = ("session_id", "_partial_chars", "_partial_author")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._partial_chars = 0
+        self._partial_author: Optional[str] = None
+
+    def inspect(self, event: Event) -> None:
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
+        content = event.content
+        if content is not None and content.parts:
+            for part in content.parts:
+                if part.text:
+                    self._text(event, content.role, part.text)
+                elif part.function_call:
+                    call = part.function_call
+                    logger.debug(
+                        "[Session: %s] TOOL CALL: %s (%d bytes of args)",
+                        self.session_id,
+                        call.name,
+                        _json_size(call.args),
+                    )
+                elif part.function_response:
+                    result = part.function_response
+                    logger.debug(
+                        "[Session: %s] TOOL RESULT: %s (%d bytes)",
+                        self.session_id,
+                        result.name,
+                        _json_size(result.response),
+                    )
+
+        if event.interrupted:
+            self.flush(" [interrupted]")
+        elif event.turn_complete:
+            self.flush()
+
+    def flush(self, suffix: str = "") -> None:
+        """Logs buffered partial text that never received a final chunk."""
+        if self._partial_chars:
+            logger.debug(
+                "[Session: %s] %s: %d chars of text%s",
+                self.session_id,
+                self._partial_author,
+                self._partial_chars,
+                suffix,
+            )
+            self._partial_chars = 0
+
+    def _text(self, event: Event, role: Optional[str], text: str) -> None:
+        if role == "user":
+            logger.debug("[Session: %s] USER QUERY: %d chars", self.session_id, len(text))
+        elif event.partial:
+            self._partial_author = event.author
+            self._partial_chars += len(text)
+        else:
+            # The final chunk carries the whole text the partials streamed
+            self._partial_chars = 0
+            logger.debug("[Session: %s] %s: %d chars of text", self.session_id, event.author, len(text))
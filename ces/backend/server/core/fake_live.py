@@ -0,0 +1,390 @@
+"""
+Offline stand-in for the Gemini Live API, for load testing without a network.
+
+FakeLiveRunner is a drop-in Runner (selected with LIVE_BACKEND=fake) whose run_live
+consumes the session's LiveRequestQueue like the real model would and streams
+scripted events back: 24kHz PCM audio chunks paced in (scaled) real time, partial
+and final output transcription text, function calls that run the agent's real tools
+through ADK, interruptions and backend disconnects. A turn's tool_calls arrive in one
+function call event, as the Live API batches them, and run once that event has been
+delivered, as in ADK's live flow.
+
+A turn starts when the client finishes speaking, detected from the inbound PCM with a
+simple energy threshold, or when text content is sent on the queue. Speech detected
+while the fake model is talking interrupts it, as barge-in does with the Live API.
+Pacing is derived from audio durations rather than wall-clock arrival, so a given
+script and input produce the same event sequence on every run. Latency jitter
+(FAKE_LIVE_JITTER_MS) is drawn from a generator seeded with FAKE_LIVE_SEED and the
+number of the session within the process, so it repeats from run to run too.
+
+Script format (FAKE_LIVE_SCRIPT, JSON); turns are used in order and cycled:
+
+    {"turns": [
+        {"text": "Let me check.", "tool_calls": [{"name": "get_current_datetime_tool", "args": {}}]},
+        {"text": "Both, then.", "tool_calls": [{"name": "get_weather", "args": {"city": "Sydney"}},
+                                               {"name": "get_stock_price", "args": {"ticker_symbol": "GOOG"}}]},
+        {"text": "A long answer ...", "interrupt_after_ms": 800},
+        {"text": "Goodbye.", "latency_ms": 150, "audio_ms": 900},
+        {"disconnect": true}
+    ]}
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import struct
+from array import array
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from config.config import (
+    FAKE_LIVE_AUDIO_CHUNK_MS,
+    FAKE_LIVE_JITTER_MS,
+    FAKE_LIVE_LATENCY_MS,
+    FAKE_LIVE_SCRIPT,
+    FAKE_LIVE_SEED,
+    FAKE_LIVE_SPEED,
+    FAKE_LIVE_TOKENS_PER_S,
+    FAKE_LIVE_VAD_SILENCE_MS,
+    FAKE_LIVE_VAD_THRESHOLD,
+)
+from google.adk.agents import RunConfig
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.live_request_queue import LiveRequestQueue
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event
+from google.adk.flows.llm_flows import functions
+from google.adk.runners import Runner
+from google.adk.sessions import Session
+from google.genai import types
+from websockets.exceptions import ConnectionClosedError
+
+from .logger import logger
+
+INPUT_SAMPLE_RATE = 16000  # Client microphone PCM
+OUTPUT_SAMPLE_RATE = 24000  # Live API audio out
+BYTES_PER_SAMPLE = 2
+
+DEFAULT_SCRIPT: Dict[str, Any] = {
+    "turns": [
+        {"text": "Hi, thanks for calling. How can I help you today?"},
+        {
+            "text": "Sure, let me look that up for you. It is a good time to check on that now.",
+            "tool_calls": [{"name": "get_current_datetime_tool", "args": {}}],
+        },
+        {
+            "text": (
+                "There are a few options here. The first one is the most popular with "
+                "customers like you, and it includes everything you asked about, plus a "
+                "few extras that most people find really useful over time."
+            ),
+            "interrupt_after_ms": 1500,
+        },
+        {"text": "No problem. Is there anything else I can help with?"},
+    ]
+}
+
+
+def load_script(path: Optional[str]) -> Dict[str, Any]:
+    """Loads a turn script from JSON, falling back to the built-in script."""
+    if not path:
+        return DEFAULT_SCRIPT
+    with open(path, encoding="utf-8") as f:
+        script = json.load(f)
+    if not script.get("turns"):
+        raise ValueError(f"Fake Live script {path} has no turns")
+    return script
+
+
+def _tone(duration_ms: int, frequency: float = 220.0) -> bytes:
+    """A quiet sine tone, so recorded output is recognizable audio rather than silence."""
+    samples = OUTPUT_SAMPLE_RATE * duration_ms // 1000
+    return struct.pack(
+        f"<{samples}h",
+        *(
+            int(3000 * math.sin(2 * math.pi * frequency * i / OUTPUT_SAMPLE_RATE))
+            for i in range(samples)
+        ),
+    )
+
+
+# Numbers the fake models of this process, in creation order, for their jitter seeds
+_model_numbers = itertools.count()
+
+
+def jitter_random(seed: int, number: int) -> random.Random:
+    """The jitter generator of the number-th fake model run with a given seed."""
+    return random.Random(f"{seed}:{number}")
+
+
+class FakeLiveModel:
+    """
+    Scripted model for one run_live invocation.
+
+    Attributes:
+        ctx (InvocationContext): The live invocation, used to run tools.
+        script (Dict[str, Any]): Turn script (see module docstring).
+        speed (float): Playback speed; 2.0 emits a second of audio every 0.5s.
+    """
+
+    def __init__(
+        self,
+        ctx: InvocationContext,
+        script: Dict[str, Any],
+        speed: float = FAKE_LIVE_SPEED,
+        tokens_per_s: float = FAKE_LIVE_TOKENS_PER_S,
+        audio_chunk_ms: int = FAKE_LIVE_AUDIO_CHUNK_MS,
+        latency_ms: float = FAKE_LIVE_LATENCY_MS,
+        jitter_ms: float = FAKE_LIVE_JITTER_MS,
+        vad_threshold: int = FAKE_LIVE_VAD_THRESHOLD,
+        vad_silence_ms: float = FAKE_LIVE_VAD_SILENCE_MS,
+        seed: int = FAKE_LIVE_SEED,
+    ):
+        self.ctx = ctx
+        self.script = script
+        self.speed = max(speed, 0.01)
+        self.tokens_per_s = tokens_per_s
+        self.audio_chunk_ms = audio_chunk_ms
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.vad_threshold = vad_threshold
+        self.vad_silence_ms = vad_silence_ms
+
+        # Session ids are random, so the seed uses the session's number in this process
+        self._random = jitter_random(seed, next(_model_numbers))
+        self._chunk = _tone(audio_chunk_ms)
+        self._turn_index = 0
+        self._out: asyncio.Queue = asyncio.Queue()
+        self._response: Optional[asyncio.Task] = None
+        self._speaking = False  # user speech in progress
+        self._silence_ms = 0.0
+        self._tools: Optional[Dict[str, Any]] = None
+        self._delivered: Dict[str, asyncio.Future] = {}  # event id -> set once run() has yielded it
+
+    # --- Public ---
+
+    async def run(self) -> AsyncGenerator[Event, None]:
+        consumer = asyncio.create_task(self._consume(), name="fake_live_consume")
+        try:
+            while True:
+                item = await self._out.get()
+                if item is None:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                delivered = self._delivered.pop(item.id, None)
+                if delivered is not None and not delivered.done():
+                    delivered.set_result(None)
+        finally:
+            consumer.cancel()
+            if self._response:
+                self._response.cancel()
+
+    # --- Input side ---
+
+    async def _consume(self) -> None:
+        queue: LiveRequestQueue = self.ctx.live_request_queue
+        try:
+            while True:
+                request = await queue.get()
+                if request.close:
+                    break
+                if request.blob and request.blob.mime_type.startswith("audio/pcm"):
+                    self._on_audio(request.blob.data)
+                elif request.content:
+                    self._start_turn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Fake Live: error consuming requests: {e}")
+        if self._response:
+            self._response.cancel()
+        self._out.put_nowait(None)
+
+    def _on_audio(self, data: bytes) -> None:
+        samples = array("h")
+        samples.frombytes(data[: len(data) - len(data) % BYTES_PER_SAMPLE])
+        if not samples:
+            return
+        peak = max(max(samples), -min(samples))
+        duration_ms = len(samples) * 1000 / INPUT_SAMPLE_RATE
+
+        if peak >= self.vad_threshold:
+            self._silence_ms = 0.0
+            if not self._speaking:
+                self._speaking = True
+                self._interrupt()
+        elif self._speaking:
+            self._silence_ms += duration_ms
+            if self._silence_ms >= self.vad_silence_ms:
+                self._speaking = False
+                self._start_turn()
+
+    # --- Output side ---
+
+    def _start_turn(self) -> None:
+        if self._response and not self._response.done():
+            return
+        turns = self.script["turns"]
+        turn = turns[self._turn_index % len(turns)]
+        self._turn_index += 1
+        self._response = asyncio.create_task(self._respond(turn), name="fake_live_turn")
+
+    def _interrupt(self) -> None:
+        if self._response and not self._response.done():
+            self._response.cancel()
+            self._emit(interrupted=True)
+
+    def _emit(self, **fields) -> Event:
+        event = Event(
+            author=self.ctx.agent.name,
+            invocation_id=self.ctx.invocation_id,
+            **fields,
+        )
+        self._out.put_nowait(event)
+        return event
+
+    async def _sleep_ms(self, ms: float) -> None:
+        if ms > 0:
+            await asyncio.sleep(ms / 1000 / self.speed)
+
+    async def _respond(self, turn: Dict[str, Any]) -> None:
+        try:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            await self._sleep_ms(max(0.0, turn.get("latency_ms", self.latency_ms) + jitter))
+
+            if turn.get("disconnect"):
+                self._out.put_nowait(ConnectionClosedError(None, None))
+                return
+
+            if turn.get("tool_calls"):
+                await self._call_tools(turn["tool_calls"])
+
+            await self._speak(turn)
+            self._emit(turn_complete=True)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.exception(f"Fake Live: error producing turn: {e}")
+            self._out.put_nowait(e)
+
+    async def _speak(self, turn: Dict[str, Any]) -> None:
+        text = turn.get("text", "")
+        words = text.split()
+        audio_ms = turn.get("audio_ms") or len(words) / self.tokens_per_s * 1000
+        interrupt_after_ms = turn.get("interrupt_after_ms")
+        chunks = max(1, math.ceil(audio_ms / self.audio_chunk_ms))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent_words = 0
+        for i in range(chunks):
+            elapsed_ms = i * self.audio_chunk_ms
+            if interrupt_after_ms is not None and elapsed_ms >= interrupt_after_ms:
+                self._emit(interrupted=True)
+                return
+            self._emit(
+                partial=True,
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            inline_data=types.Blob(
+                                mime_type=f"audio/pcm;rate={OUTPUT_SAMPLE_RATE}",
+                                data=self._chunk,
+                            )
+                        )
+                    ],
+                ),
+            )
+            # Transcription tokens spread evenly over the audio
+            due_words = min(len(words), math.ceil((i + 1) * len(words) / chunks))
+            if due_words > sent_words:
+                self._emit(
+                    partial=True,
+                    content=types.Content(
+                        role="model",
+                        parts=[types.Part(text=" ".join(words[sent_words:due_words]) + " ")],
+                    ),
+                )
+                sent_words = due_words
+            # Pace against the turn start so per-chunk overhead does not accumulate
+            delay = started + (i + 1) * self.audio_chunk_ms / 1000 / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if text:
+            self._emit(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+    async def _call_tools(self, tool_calls: List[Dict[str, Any]]) -> None:
+        if self._tools is None:
+            tools = await self.ctx.agent.canonical_tools(ReadonlyContext(self.ctx))
+            self._tools = {tool.name: tool for tool in tools}
+        parts = []
+        for call in tool_calls:
+            if call["name"] not in self._tools:
+                logger.warning(f"Fake Live: agent has no tool {call['name']!r}; skipping call.")
+                continue
+            function_call = types.FunctionCall(
+                id=functions.generate_client_function_call_id(),
+                name=call["name"],
+                args=call.get("args", {}),
+            )
+            parts.append(types.Part(function_call=function_call))
+        if not parts:
+            return
+
+        call_event = self._emit(content=types.Content(role="model", parts=parts))
+        # The live flow runs tools after the call event has gone out (and into the session)
+        delivered = asyncio.get_running_loop().create_future()
+        self._delivered[call_event.id] = delivered
+        try:
+            await delivered
+        finally:
+            self._delivered.pop(call_event.id, None)
+        # Runs the tools (and the agent's tool callbacks) the way the live flow does
+        response_event = await functions.handle_function_calls_live(
+            self.ctx, call_event, self._tools
+        )
+        if response_event:
+            self._out.put_nowait(response_event)
+
+
+class FakeLiveRunner(Runner):
+    """Runner whose live mode talks to FakeLiveModel instead of the Live API."""
+
+    script: Optional[Dict[str, Any]] = None
+
+    async def run_live(
+        self,
+        *,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        live_request_queue: LiveRequestQueue,
+        run_config: RunConfig = RunConfig(),
+        session: Optional[Session] = None,
+    ) -> AsyncGenerator[Event, None]:
+        if session is None:
+            session = await self.session_service.get_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+            if not session:
+                raise ValueError(f"Session not found: {session_id}")
+        if FakeLiveRunner.script is None:
+            FakeLiveRunner.script = load_script(FAKE_LIVE_SCRIPT)
+
+        ctx = self._new_invocation_context_for_live(
+            session, live_request_queue=live_request_queue, run_config=run_config
+        )
+        ctx.agent = self._find_agent_to_run(session, self.agent)
+        model = FakeLiveModel(ctx, FakeLiveRunner.script)
+
+        async def execute(ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+            async for event in model.run():
+                yield event
+
+        # Appends non-partial events to the session and runs plugins, as Runner does
+        async for event in self._exec_with_plugin(ctx, session, execute):
+            yield event
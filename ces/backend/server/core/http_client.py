@@ -0,0 +1,119 @@
+"""
+Process-wide pooled HTTP client for tools that call HTTP services.
+
+Opening an aiohttp.ClientSession per tool call pays DNS resolution, TCP and TLS
+setup on every invocation, in the middle of a live voice turn. Tools instead
+share one ClientSession whose connector keeps idle connections alive per host,
+caches DNS lookups and caps connections per host. The server opens it on app
+startup and closes it on cleanup; outside the server (scripts, benchmarks) it
+is created on first use.
+
+Requests forwarded to sibling workers over their Unix sockets likewise reuse one
+ClientSession per socket (WORKER_CLIENTS), closed with the tool pool.
+"""
+
+from typing import Dict, Optional
+
+import aiohttp
+from config.config import (
+    HTTP_CONNECT_TIMEOUT_S,
+    HTTP_DNS_CACHE_TTL_S,
+    HTTP_KEEPALIVE_S,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_TIMEOUT_S,
+)
+
+from .logger import logger
+
+
+class HttpClientManager:
+    """
+    Owns the shared ClientSession and its connection pool.
+
+    Attributes:
+        limit (int): Maximum open connections across all hosts.
+        limit_per_host (int): Maximum open connections to one host.
+        dns_ttl_s (float): How long resolved addresses are reused.
+        keepalive_s (float): How long an idle connection is kept for reuse.
+        timeout (aiohttp.ClientTimeout): Default timeout for requests.
+    """
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        dns_ttl_s: float = HTTP_DNS_CACHE_TTL_S,
+        keepalive_s: float = HTTP_KEEPALIVE_S,
+        timeout_s: float = HTTP_TIMEOUT_S,
+        connect_timeout_s: float = HTTP_CONNECT_TIMEOUT_S,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl_s = dns_ttl_s
+        self.keepalive_s = keepalive_s
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s, connect=connect_timeout_s)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, created on first use. Must be used on the event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=int(self.dns_ttl_s),
+                keepalive_timeout=self.keepalive_s,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, raise_for_status=False
+            )
+            logger.info(
+                f"HTTP client pool opened (limit={self.limit}, per_host={self.limit_per_host}, "
+                f"dns_ttl={self.dns_ttl_s}s, keepalive={self.keepalive_s}s)"
+            )
+        return self._session
+
+    async def start(self) -> None:
+        self.session  # Open the pool up front rather than on the first tool call
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client pool closed")
+        self._session = None
+
+
+class WorkerClients:
+    """
+    Keeps one ClientSession per sibling worker's Unix socket for forwarded requests.
+
+    There is one entry per worker socket, so the set is bounded by SERVER_WORKERS.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    def session(self, socket_path: str) -> aiohttp.ClientSession:
+        """The session for a worker's socket, created on first use. Do not close it."""
+        session = self._sessions.get(socket_path)
+        if session is None or session.closed:
+            session = self._sessions[socket_path] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=socket_path)
+            )
+        return session
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+
+HTTP_CLIENT = HttpClientManager()
+WORKER_CLIENTS = WorkerClients()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Returns the process-wide pooled ClientSession. Do not close it."""
+    return HTTP_CLIENT.session
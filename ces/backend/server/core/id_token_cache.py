@@ -0,0 +1,154 @@
+"""
+Per-audience cache of Google ID tokens for calling authenticated Cloud Run services.
+
+Fetching an ID token resolves application default credentials, refreshes them and
+calls the token endpoint: several blocking round trips. Tokens are valid for an hour,
+so the cache reads the expiry from each token's JWT payload and keeps serving it
+until shortly before it lapses:
+
+- A token is refreshed in the background ID_TOKEN_REFRESH_MARGIN_S before it
+  expires, as long as its audience was used since the last refresh, so an active
+  tool never waits on a fetch after the first one.
+- Concurrent callers share one in-flight fetch per audience (single-flight).
+- If a refresh fails while the current token is still valid, it keeps being served.
+
+Fetches run in a worker thread since google.auth uses blocking HTTP.
+"""
+
+import asyncio
+import base64
+import json
+import time
+from typing import Callable, Dict, Optional
+
+from config.config import ID_TOKEN_FALLBACK_TTL_S, ID_TOKEN_REFRESH_MARGIN_S
+
+from .logger import logger
+from .metrics import ID_TOKEN_FETCHES, ID_TOKEN_LOOKUPS
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Reads the `exp` claim (epoch seconds) from a JWT without verifying it."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class _Entry:
+    __slots__ = ("token", "expires_at", "used", "refresh_handle")
+
+    def __init__(self, token: str, expires_at: float):
+        self.token = token
+        self.expires_at = expires_at
+        self.used = False
+        self.refresh_handle: Optional[asyncio.TimerHandle] = None
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """Marks a failed fetch as seen, in case every caller waiting on it was cancelled."""
+    if not task.cancelled():
+        task.exception()
+
+
+class IdTokenCache:
+    """
+    Caches ID tokens by audience and refreshes them ahead of expiry.
+
+    Attributes:
+        fetch (Callable[[str], str]): Blocking function returning a fresh ID token for an audience.
+        refresh_margin_s (float): How long before expiry a token is refreshed.
+        fallback_ttl_s (float): Lifetime assumed for a token whose expiry cannot be read.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str],
+        refresh_margin_s: float = ID_TOKEN_REFRESH_MARGIN_S,
+        fallback_ttl_s: float = ID_TOKEN_FALLBACK_TTL_S,
+    ):
+        self.fetch = fetch
+        self.refresh_margin_s = refresh_margin_s
+        self.fallback_ttl_s = fallback_ttl_s
+        self._entries: Dict[str, _Entry] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, audience: str) -> str:
+        """
+        Returns a valid ID token for the audience, fetching one only if none is cached.
+
+        Raises:
+            Exception: Whatever the fetch raised, when no valid token is cached.
+        """
+        entry = self._entries.get(audience)
+        if entry is not None and time.time() < entry.expires_at - self.refresh_margin_s:
+            entry.used = True
+            ID_TOKEN_LOOKUPS.inc(1, "hit")
+            return entry.token
+        ID_TOKEN_LOOKUPS.inc(1, "miss")
+        # Shielded so a cancelled caller (e.g. on barge-in) does not cancel the fetch for the others
+        return (await asyncio.shield(self._refresh(audience))).token
+
+    def _refresh(self, audience: str) -> "asyncio.Task[_Entry]":
+        """Starts a fetch for the audience, or joins the one already running."""
+        task = self._inflight.get(audience)
+        if task is None:
+            task = asyncio.create_task(self._fetch(audience))
+            self._inflight[audience] = task
+            task.add_done_callback(lambda _: self._inflight.pop(audience, None))
+            task.add_done_callback(_retrieve_exception)
+        return task
+
+    async def _fetch(self, audience: str) -> _Entry:
+        started = time.perf_counter()
+        try:
+            token = await asyncio.to_thread(self.fetch, audience)
+        except Exception:
+            ID_TOKEN_FETCHES.inc(1, "error")
+            current = self._entries.get(audience)
+            if current is not None and time.time() < current.expires_at:
+                logger.warning(f"ID token refresh for {audience} failed; serving the current token until it expires")
+                self._schedule_refresh(audience, current, retry=True)
+                return current
+            raise
+        ID_TOKEN_FETCHES.inc(1, "ok")
+
+        expires_at = token_expiry(token)
+        if expires_at is None:
+            logger.warning(f"Could not read the expiry of the ID token for {audience}; caching it for {self.fallback_ttl_s}s")
+            expires_at = time.time() + self.fallback_ttl_s + self.refresh_margin_s
+        entry = _Entry(token, expires_at)
+        previous = self._entries.get(audience)
+        if previous is not None and previous.refresh_handle is not None:
+            previous.refresh_handle.cancel()
+        self._entries[audience] = entry
+        self._schedule_refresh(audience, entry)
+        logger.info(
+            f"Fetched ID token for {audience} in {(time.perf_counter() - started) * 1000:.0f}ms, "
+            f"valid for {expires_at - time.time():.0f}s"
+        )
+        return entry
+
+    def _schedule_refresh(self, audience: str, entry: _Entry, retry: bool = False) -> None:
+        if retry:
+            delay = min(30.0, max(1.0, (entry.expires_at - time.time()) / 4))
+        else:
+            delay = max(0.0, entry.expires_at - self.refresh_margin_s - time.time())
+        entry.refresh_handle = asyncio.get_running_loop().call_later(delay, self._refresh_if_used, audience, entry)
+
+    def _refresh_if_used(self, audience: str, entry: _Entry) -> None:
+        if self._entries.get(audience) is not entry:
+            return
+        if not entry.used:
+            # Nobody called this audience for a whole token lifetime: let it lapse
+            del self._entries[audience]
+            return
+        entry.used = False
+        self._refresh(audience).add_done_callback(_log_refresh_failure)
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background ID token refresh failed: {task.exception()}")
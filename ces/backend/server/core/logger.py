@@ -1,5 +1,8 @@
+import atexit
 import os
 import logging
+import logging.handlers
+import queue
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -7,21 +10,111 @@ load_dotenv()
 LOG_LEVEL=os.getenv('LOG_LEVEL', 'INFO').upper()
 LOG_TO_FILE= True if (os.getenv('LOG_TO_FILE', False) == "true") else False
 LOG_FILE_NAME=os.getenv('LOG_FILE_NAME', "debug_messages.log")
+# Write log records from a background thread instead of on the event loop
+LOG_ASYNC= True if (os.getenv('LOG_ASYNC', "true") == "true") else False
+# Per-category sampling for chatty records, e.g. "audio=50,video=10" keeps 1 in N
+LOG_SAMPLE_RATES=os.getenv('LOG_SAMPLE_RATES', "audio=50,video=10")
+
+LOG_FORMAT = "%(asctime)s - [%(filename)s:%(lineno)d] - %(levelname)s - %(message)s"
 
 print(f"LOG_LEVEL: {os.getenv('LOG_LEVEL')}")
 
-if LOG_TO_FILE:
-    logging.basicConfig(
-        filename=LOG_FILE_NAME,
-        level=getattr(logging, LOG_LEVEL),
-        format="%(asctime)s - [%(filename)s:%(lineno)d] - %(levelname)s - %(message)s",
-        force=True
-    )
-else:
-    logging.basicConfig(
-        level=getattr(logging, LOG_LEVEL),
-        format="%(asctime)s - [%(filename)s:%(lineno)d] - %(levelname)s - %(message)s",
-        force=True
+
+def parse_sample_rates(spec: str) -> dict:
+    """Parses "category=N,..." into {category: N}, ignoring malformed entries."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip().isdigit() and int(value) > 0:
+            rates[name.strip()] = int(value)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N records of each sampled category.
+
+    A record opts in with `extra={"category": "audio"}`; records without a category,
+    and all WARNING or higher records, always pass.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self.counts = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        category = getattr(record, "category", None)
+        rate = self.rates.get(category) if category else None
+        if not rate or record.levelno >= logging.WARNING:
+            return True
+        count = self.counts.get(category, 0)
+        self.counts[category] = count + 1
+        return count % rate == 0
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a same-process listener.
+
+    The message and any traceback are rendered before the record is enqueued, while
+    its args and exception are still what they were at the call site (mutable args
+    may change, or be read concurrently, before the listener thread gets to them).
+    Unlike QueueHandler.prepare, the line itself is not formatted here: the timestamp
+    and prefix, and the write, are left to the listener thread. Nor is the record
+    copied, as this is the only handler on the root logger.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args or not isinstance(record.msg, str):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None  # Tracebacks keep frames, and their locals, alive
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+def build_handlers():
+    """Returns the handler(s) to install on the root logger, and the listener if any."""
+    if LOG_TO_FILE:
+        output = logging.FileHandler(LOG_FILE_NAME)
+    else:
+        output = logging.StreamHandler()
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    sampler = SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES))
+
+    if not LOG_ASYNC:
+        output.addFilter(sampler)
+        return output, None
+
+    # The event loop only renders the message and enqueues the record; formatting the
+    # line and the (possibly blocking) write happen on the listener thread.
+    queue_handler = LocalQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(sampler)
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, output, respect_handler_level=True
     )
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler, listener
+
+
+handler, listener = build_handlers()
+logging.basicConfig(
+    level=getattr(logging, LOG_LEVEL),
+    handlers=[handler],
+    force=True
+)
 
 logger = logging.getLogger(__name__)
@@ -0,0 +1,417 @@
+"""
+Low-overhead metric primitives for the server hot paths, and the server's metrics.
+
+Counters are a dict update and histograms use fixed bucket bounds chosen up front,
+so an observation is a bisect and three integer/float updates: cheap enough to call
+per audio chunk. Everything runs on the event loop thread, so no locking is needed.
+The registry renders the Prometheus text exposition format for the /metrics route;
+under the multi-worker supervisor every series carries a worker label.
+"""
+
+import asyncio
+import os
+import resource
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .logger import logger
+
+# Bucket upper bounds (ms) for conversational latencies.
+LATENCY_BUCKETS_MS = (
+    25, 50, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000,
+)
+# Bucket upper bounds (ms) for event-loop lag.
+LOOP_LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+# Bucket upper bounds (bytes) for outbound audio flushes (24kHz 16-bit PCM).
+AUDIO_FLUSH_BUCKETS_BYTES = (480, 1200, 2400, 4800, 7200, 9600, 12000, 14400, 28800)
+# Bucket upper bounds (bytes) for tool arguments and results (JSON-encoded).
+TOOL_PAYLOAD_BUCKETS_BYTES = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+# Bucket upper bounds (ms) for tool execution, down to cache hits.
+TOOL_EXECUTION_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram.
+
+    Attributes:
+        buckets (Sequence[float]): Sorted bucket upper bounds; an implicit +Inf follows.
+        counts (list): Per-bucket (non-cumulative) observation counts.
+        sum (float): Sum of all observed values.
+        count (int): Number of observations.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Approximates a percentile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 1) if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+# --- Metric families ---
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, optionally labelled.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Help text.
+        label_names (Tuple[str, ...]): Label names; values are passed positionally.
+        values (Dict[LabelValues, float]): Current value per label combination.
+    """
+
+    __slots__ = ("name", "help", "label_names", "values")
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        # An unlabelled counter is exported as 0 before its first increment
+        self.values: Dict[LabelValues, float] = {} if self.label_names else {(): 0}
+
+    def inc(self, amount: float = 1, *label_values: str) -> None:
+        values = self.values
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge:
+    """
+    Point-in-time value, either set directly or read from a callback at scrape time.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Help text.
+        value (float): Last value set (ignored when a callback is given).
+    """
+
+    __slots__ = ("name", "help", "value", "callback")
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help: str, callback: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self.callback = callback
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> List[str]:
+        value = self.callback() if self.callback else self.value
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class CounterFunc(Gauge):
+    """Counter read from a callback at scrape time (e.g. process CPU seconds)."""
+
+    __slots__ = ()
+    kind = "counter"
+
+
+class HistogramFamily:
+    """
+    Fixed-bucket histograms keyed by label values.
+
+    Values are observed in the unit of the buckets (e.g. ms) and exported multiplied
+    by `scale`, so the exposition uses Prometheus base units (seconds).
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Help text.
+        label_names (Tuple[str, ...]): Label names.
+        buckets (Sequence[float]): Bucket upper bounds, in observation units.
+        scale (float): Factor converting observation units to exported units.
+    """
+
+    __slots__ = ("name", "help", "label_names", "buckets", "scale", "children")
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+        scale: float = 1.0,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.scale = scale
+        self.children: Dict[LabelValues, Histogram] = {}
+
+    def labels(self, *label_values: str) -> Histogram:
+        """Returns the histogram for one label combination, creating it on first use."""
+        child = self.children.get(label_values)
+        if child is None:
+            child = self.children[label_values] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float, *label_values: str) -> None:
+        self.labels(*label_values).observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, child in self.children.items():
+            cumulative = 0
+            for bound, bucket_count in zip(child.buckets, child.counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound * self.scale) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+                )
+            inf = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {child.count}")
+            label_str = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(child.sum * self.scale)}")
+            lines.append(f"{self.name}_count{label_str} {child.count}")
+        return lines
+
+
+class Registry:
+    """Collection of metric families rendered together for a scrape."""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.const_labels = ""
+
+    def set_const_labels(self, **labels: str) -> None:
+        """Adds labels to every series, e.g. worker="0" so per-worker scrapes stay apart."""
+        self.const_labels = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, label_names))
+
+    def gauge(
+        self, name: str, help: str, callback: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self.register(Gauge(name, help, callback))
+
+    def histogram(self, name: str, help: str, **kwargs) -> HistogramFamily:
+        return self.register(HistogramFamily(name, help, **kwargs))
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                samples = metric.render()
+                if self.const_labels:
+                    samples = [self._with_const_labels(sample) for sample in samples]
+                lines.extend(samples)
+            except Exception as e:
+                logger.error(f"Failed to render metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+    def _with_const_labels(self, sample: str) -> str:
+        name, sep, rest = sample.partition("{")
+        if sep:
+            return f"{name}{{{self.const_labels},{rest}"
+        name, _, value = sample.partition(" ")
+        return f"{name}{{{self.const_labels}}} {value}"
+
+
+REGISTRY = Registry()
+
+
+# --- Process metrics ---
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_rss_bytes() -> float:
+    """Current resident set size, from /proc (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- Server metrics ---
+
+HANDSHAKE_LATENCY = REGISTRY.histogram(
+    "ces_handshake_seconds",
+    "WebSocket handshake-to-ready time, by how the session was obtained.",
+    label_names=("mode",),
+    scale=0.001,
+)
+TURN_LATENCY = REGISTRY.histogram(
+    "ces_turn_latency_seconds",
+    "Time from the end of the user's speech to each turn milestone.",
+    label_names=("milestone",),
+    scale=0.001,
+)
+WS_INBOUND_MESSAGES = REGISTRY.counter(
+    "ces_ws_inbound_messages_total", "Client messages received.", ("type",)
+)
+WS_INBOUND_BYTES = REGISTRY.counter(
+    "ces_ws_inbound_bytes_total", "Client message bytes received.", ("type",)
+)
+WS_OUTBOUND_MESSAGES = REGISTRY.counter(
+    "ces_ws_outbound_messages_total", "Messages sent to clients.", ("type",)
+)
+WS_OUTBOUND_BYTES = REGISTRY.counter(
+    "ces_ws_outbound_bytes_total", "Message bytes sent to clients.", ("type",)
+)
+AUDIO_FLUSH_SIZE = REGISTRY.histogram(
+    "ces_audio_flush_bytes",
+    "Size of each outbound audio buffer flush, by flush reason.",
+    label_names=("reason",),
+    buckets=AUDIO_FLUSH_BUCKETS_BYTES,
+)
+INTERRUPTS = REGISTRY.counter(
+    "ces_interrupts_total", "Model responses interrupted by user input."
+)
+TOOL_CALLS = REGISTRY.counter(
+    "ces_tool_calls_total", "Tool calls made by the model.", ("tool",)
+)
+TOOL_DURATION = REGISTRY.histogram(
+    "ces_tool_duration_seconds",
+    "Time spent running each tool function, including cache lookups and guards, by tool cache result (or uncached).",
+    label_names=("tool", "cache"),
+    buckets=TOOL_EXECUTION_BUCKETS_MS,
+    scale=0.001,
+)
+TOOL_CACHE_REQUESTS = REGISTRY.counter(
+    "ces_tool_cache_requests_total",
+    "Calls to cached tools, by tool and result (hit, miss or coalesced onto an in-flight call).",
+    ("tool", "result"),
+)
+TOOL_GUARD_EVENTS = REGISTRY.counter(
+    "ces_tool_guard_events_total",
+    "Guarded tool calls that timed out, raised, were hedged or were rejected by an open circuit.",
+    ("tool", "event"),
+)
+TOOL_CIRCUITS_OPENED = REGISTRY.counter(
+    "ces_tool_circuits_opened_total", "Times a tool endpoint's circuit breaker opened.", ("endpoint",)
+)
+TOOL_PARALLEL_CALLS = REGISTRY.counter(
+    "ces_tool_parallel_calls_total", "Function calls run concurrently with other calls of the same model turn."
+)
+TOOL_PREFETCHES = REGISTRY.counter(
+    "ces_tool_prefetches_total",
+    "Speculative tool calls, by outcome (started, used, wasted, over_budget).",
+    ("tool", "outcome"),
+)
+TOOL_EXECUTIONS = REGISTRY.counter(
+    "ces_tool_executions_total",
+    "Tool function runs, by outcome (ok, error result, exception) and tool cache result (or uncached).",
+    ("tool", "outcome", "cache"),
+)
+TOOL_PAYLOAD_SIZE = REGISTRY.histogram(
+    "ces_tool_payload_bytes",
+    "JSON size of tool arguments and results.",
+    label_names=("tool", "direction"),
+    buckets=TOOL_PAYLOAD_BUCKETS_BYTES,
+)
+TOOL_RESULT_TRIMMED = REGISTRY.histogram(
+    "ces_tool_result_trimmed_bytes",
+    "Bytes cut from a tool result by its size budget, per trimmed call.",
+    label_names=("tool",),
+    buckets=TOOL_PAYLOAD_BUCKETS_BYTES,
+)
+ID_TOKEN_LOOKUPS = REGISTRY.counter(
+    "ces_id_token_lookups_total", "ID token requests by tools, by whether the cache had a fresh token.", ("result",)
+)
+ID_TOKEN_FETCHES = REGISTRY.counter(
+    "ces_id_token_fetches_total", "ID tokens fetched from Google, by outcome.", ("outcome",)
+)
+TTS_LATENCY = REGISTRY.histogram(
+    "ces_tts_first_audio_seconds",
+    "Time from a TTS request to its first audio chunk.",
+    scale=0.001,
+)
+LOOP_LAG = REGISTRY.histogram(
+    "ces_event_loop_lag_seconds",
+    "Delay of a periodic timer on the event loop, a proxy for loop blocking.",
+    buckets=LOOP_LAG_BUCKETS_MS,
+    scale=0.001,
+)
+PROCESS_RSS = REGISTRY.gauge(
+    "ces_process_resident_memory_bytes", "Resident memory of this process.", process_rss_bytes
+)
+PROCESS_CPU = REGISTRY.register(
+    CounterFunc(
+        "ces_process_cpu_seconds_total",
+        "User and system CPU time of this process.",
+        lambda: sum(os.times()[:2]),
+    )
+)
+
+
+async def monitor_event_loop_lag(interval_s: float = 0.5) -> None:
+    """Samples event-loop lag until cancelled (started with the app)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        LOOP_LAG.observe(max(0.0, loop.time() - expected) * 1000)
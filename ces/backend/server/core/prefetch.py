@@ -0,0 +1,237 @@
+"""
+Speculative prefetch of a session's likely next tool call.
+
+Some tool sequences are very predictable: a get_weather is usually followed by a
+get_weather_forecast for the same city, a get_stock_price by get_company_details for
+the same ticker. prefetch_after_tool is installed as an agent's after_tool_callback;
+after each call it looks up the likely next tools and, when every parameter of one
+can be filled from the call's arguments (matched by name), starts that call in the
+background. The result lands in the tool cache (core/tool_cache.py), so when the
+model does ask for it the call is a hit, or joins the prefetch still in flight.
+
+Transitions come from PREFETCH_RULES ("get_weather->get_weather_forecast,...") and,
+with PREFETCH_LEARN, from the tool sequences observed in this process: a transition
+seen in at least PREFETCH_MIN_CONFIDENCE of PREFETCH_MIN_SAMPLES or more calls is
+used too. Only @cached_tool tools are prefetched, only with the tool cache enabled
+(TOOL_CACHE_ENABLED) to receive the result, only after a call that succeeded (a
+failed call's arguments, say an unknown ticker, would fail again), and only when the
+result is not already cached or loading.
+
+Wasted upstream calls are capped per session: a prefetch not claimed within
+PREFETCH_CLAIM_WINDOW_S counts against PREFETCH_WASTE_BUDGET, and a session that has
+used up its budget stops prefetching. At most PREFETCH_MAX_INFLIGHT prefetches are
+outstanding (running or waiting to be claimed) per session. Outcomes are exported
+as ces_tool_prefetches_total.
+"""
+
+import asyncio
+import inspect
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from config.config import (
+    PREFETCH_CLAIM_WINDOW_S,
+    PREFETCH_ENABLED,
+    PREFETCH_LEARN,
+    PREFETCH_MAX_INFLIGHT,
+    PREFETCH_MIN_CONFIDENCE,
+    PREFETCH_MIN_SAMPLES,
+    PREFETCH_RULES,
+    PREFETCH_WASTE_BUDGET,
+    TOOL_CACHE_ENABLED,
+)
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import BaseTool, FunctionTool, ToolContext
+
+from .logger import logger
+from .metrics import TOOL_PREFETCHES
+from .tool_cache import CacheKey, is_success
+from .tool_registry import TOOL_REGISTRY
+
+_UNPREFETCHABLE_PARAMS = {"tool_context"}
+
+
+def parse_rules(spec: str) -> Dict[str, List[str]]:
+    """Parses "a->b,a->c,x->y" into {"a": ["b", "c"], "x": ["y"]}."""
+    rules: Dict[str, List[str]] = defaultdict(list)
+    for rule in spec.split(","):
+        if not rule.strip():
+            continue
+        source, sep, target = rule.partition("->")
+        if not sep or not source.strip() or not target.strip():
+            logger.warning(f"Prefetch: ignoring malformed rule {rule!r}")
+            continue
+        rules[source.strip()].append(target.strip())
+    return dict(rules)
+
+
+class _Prefetch:
+    __slots__ = ("tool", "task", "started_at")
+
+    def __init__(self, tool: str, task: asyncio.Task):
+        self.tool = tool
+        self.task = task
+        self.started_at = time.monotonic()
+
+
+class _SessionPrefetches:
+    """One session's last tool call, outstanding prefetches and waste so far."""
+
+    def __init__(self):
+        self.last_tool: Optional[str] = None
+        self.outstanding: Dict[CacheKey, _Prefetch] = {}
+        self.wasted = 0
+
+
+class PrefetchEngine:
+    """
+    Predicts each session's next tool calls and runs them ahead of time.
+
+    Attributes:
+        rules (Dict[str, List[str]]): Configured transitions, tool -> likely next tools.
+        learn (bool): Whether transitions observed at run time are used as well.
+        min_confidence (float): Share of a tool's successors a learned transition needs.
+        min_samples (int): Transitions out of a tool observed before learning applies.
+        max_inflight (int): Unclaimed prefetches per session at once.
+        waste_budget (int): Unclaimed prefetches a session may waste before it stops prefetching.
+        claim_window_s (float): How long a prefetch may wait for its call before it counts as wasted.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, List[str]]] = None,
+        learn: bool = PREFETCH_LEARN,
+        min_confidence: float = PREFETCH_MIN_CONFIDENCE,
+        min_samples: int = PREFETCH_MIN_SAMPLES,
+        max_inflight: int = PREFETCH_MAX_INFLIGHT,
+        waste_budget: int = PREFETCH_WASTE_BUDGET,
+        claim_window_s: float = PREFETCH_CLAIM_WINDOW_S,
+    ):
+        self.rules = parse_rules(PREFETCH_RULES) if rules is None else rules
+        self.learn = learn
+        self.min_confidence = min_confidence
+        self.min_samples = min_samples
+        self.max_inflight = max_inflight
+        self.waste_budget = waste_budget
+        self.claim_window_s = claim_window_s
+        # Process-wide transition counts: tool -> next tool -> times seen
+        self._transitions: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._sessions: Dict[str, _SessionPrefetches] = {}
+
+    def predict(self, tool_name: str) -> List[str]:
+        """Likely next tools after tool_name: configured rules first, then learned ones."""
+        predicted = list(self.rules.get(tool_name, ()))
+        if self.learn:
+            successors = self._transitions.get(tool_name, {})
+            total = sum(successors.values())
+            if total >= self.min_samples:
+                for name, count in sorted(successors.items(), key=lambda item: -item[1]):
+                    if count / total >= self.min_confidence and name not in predicted:
+                        predicted.append(name)
+        return [name for name in predicted if name != tool_name]
+
+    def observe(
+        self,
+        session_id: str,
+        tool: BaseTool,
+        args: Dict[str, Any],
+        tools: Dict[str, BaseTool],
+        succeeded: bool = True,
+    ) -> None:
+        """
+        Records a call the model made and, if it succeeded, starts prefetches for the
+        calls likely to follow.
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionPrefetches()
+        self._expire(session)
+
+        key = _cache_key(tool, args)
+        prefetch = session.outstanding.pop(key, None) if key is not None else None
+        if prefetch is not None:
+            TOOL_PREFETCHES.inc(1, prefetch.tool, "used")
+
+        if session.last_tool is not None:
+            self._transitions[session.last_tool][tool.name] += 1
+        session.last_tool = tool.name
+        if not succeeded:
+            return
+
+        for name in self.predict(tool.name):
+            if session.wasted >= self.waste_budget:
+                TOOL_PREFETCHES.inc(1, name, "over_budget")
+                break
+            if len(session.outstanding) >= self.max_inflight:
+                break
+            self._start(session, tools.get(name), args)
+
+    def release(self, session_id: str) -> None:
+        """Drops a closed session, counting its unclaimed prefetches as wasted."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        for prefetch in session.outstanding.values():
+            # The upstream call itself is shielded by the tool cache and still fills it
+            prefetch.task.cancel()
+            TOOL_PREFETCHES.inc(1, prefetch.tool, "wasted")
+
+    def _start(self, session: _SessionPrefetches, tool: Optional[BaseTool], source_args: Dict[str, Any]) -> None:
+        if not isinstance(tool, FunctionTool) or getattr(tool.func, "cache_key", None) is None:
+            return  # Only idempotent, cached tools are safe to call speculatively
+        params = [p for p in inspect.signature(tool.func).parameters.values() if p.name not in _UNPREFETCHABLE_PARAMS]
+        args = {p.name: source_args[p.name] for p in params if p.name in source_args}
+        if any(p.default is inspect.Parameter.empty and p.name not in args for p in params):
+            return  # The arguments cannot be inferred from this call
+        key = _cache_key(tool, args)
+        if key is None or key in session.outstanding or tool.func.tool_cache.has(key):
+            return
+
+        task = asyncio.create_task(self._run(tool, args), name=f"prefetch_{tool.name}")
+        session.outstanding[key] = _Prefetch(tool.name, task)
+        TOOL_PREFETCHES.inc(1, tool.name, "started")
+        logger.debug(f"Prefetching {tool.name}({args})")
+
+    @staticmethod
+    async def _run(tool: FunctionTool, args: Dict[str, Any]) -> None:
+        try:
+            # Past the registry's instrumentation: a prefetch is not a call the model made
+            await TOOL_REGISTRY.unwrap(tool.func)(**args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Prefetch of {tool.name} failed: {e}")
+
+    def _expire(self, session: _SessionPrefetches) -> None:
+        deadline = time.monotonic() - self.claim_window_s
+        for key, prefetch in list(session.outstanding.items()):
+            if prefetch.started_at <= deadline:
+                del session.outstanding[key]
+                session.wasted += 1
+                TOOL_PREFETCHES.inc(1, prefetch.tool, "wasted")
+
+
+def _cache_key(tool: BaseTool, args: Dict[str, Any]) -> Optional[CacheKey]:
+    cache_key = getattr(getattr(tool, "func", None), "cache_key", None)
+    if cache_key is None:
+        return None
+    try:
+        return cache_key(**args)
+    except TypeError:
+        return None  # Arguments that do not bind to the tool's signature
+
+
+PREFETCH = PrefetchEngine()
+
+
+async def prefetch_after_tool(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> None:
+    """after_tool_callback feeding the session's calls to PREFETCH; never alters the response."""
+    if not PREFETCH_ENABLED or not TOOL_CACHE_ENABLED:
+        return None  # Without the cache a prefetched result would go nowhere
+    ctx = tool_context._invocation_context
+    tools = {t.name: t for t in await ctx.agent.canonical_tools(ReadonlyContext(ctx))}
+    PREFETCH.observe(ctx.session.id, tool, args, tools, succeeded=is_success(tool_response))
+    return None
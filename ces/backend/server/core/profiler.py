@@ -0,0 +1,236 @@
+"""
+On-demand, time-bounded profiling of a live server process.
+
+A profile runs for a fixed window and then tears everything down again, so
+nothing is sampled, traced or put in debug mode while no profile is running:
+
+- Stack sampling: a background thread snapshots the event loop thread's stack
+  via sys._current_frames() every interval and aggregates the samples into
+  collapsed stacks (the input format of flamegraph.pl and speedscope).
+- Memory: tracemalloc snapshots at the start and end of the window, diffed by line.
+  Tracing is only started for the window if it was not already running.
+- Slow callbacks: asyncio debug mode with slow_callback_duration set, capturing
+  the "Executing <Handle> took Xs" warnings asyncio logs for every callback or
+  task step that held the loop longer than the threshold.
+
+The results are packed into a zip archive for download.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from .logger import logger
+
+# Frames that mean the loop thread was waiting for I/O rather than running Python
+_IDLE_FUNCTIONS = {("selectors.py", "select"), ("selectors.py", "poll")}
+_SLOW_CALLBACK_RE = re.compile(r"^Executing (?P<handle>.*) took (?P<seconds>[\d.]+) seconds$")
+
+
+class ProfileInProgress(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+_lock = asyncio.Lock()
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack from a background thread.
+
+    Attributes:
+        thread_id (int): Identifier of the thread to sample (the event loop thread).
+        interval_s (float): Time between samples.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            leaf = frame.f_code
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples += 1
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_FUNCTIONS:
+                self.idle_samples += 1
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format: `root;...;leaf count` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, top: int) -> Dict[str, List[Tuple[str, int]]]:
+        """Most sampled functions, by own (leaf) samples and by inclusive samples."""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                inclusive[name] += count
+        return {"self": own.most_common(top), "inclusive": inclusive.most_common(top)}
+
+
+class SlowCallbackCollector(logging.Handler):
+    """Collects asyncio's slow-callback warnings while the loop is in debug mode."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.callbacks: List[Dict[str, Any]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        match = _SLOW_CALLBACK_RE.match(record.getMessage())
+        if match:
+            self.callbacks.append(
+                {
+                    "ms": round(float(match.group("seconds")) * 1000, 1),
+                    "handle": match.group("handle"),
+                    "at": round(record.created, 3),
+                }
+            )
+
+
+def _memory_diff(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int) -> str:
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    total = sum(stat.size for stat in stats)
+    growth = sum(stat.size_diff for stat in stats)
+    lines = [f"Traced memory at end: {total / 1e6:.1f} MB ({growth / 1e6:+.1f} MB over the window)", ""]
+    lines += [str(stat) for stat in stats[:top]]
+    return "\n".join(lines) + "\n"
+
+
+async def run_profile(
+    duration_s: float,
+    interval_s: float = 0.005,
+    slow_callback_s: float = 0.05,
+    trace_memory: bool = True,
+    top: int = 25,
+) -> bytes:
+    """
+    Profiles this process for duration_s and returns the results as a zip archive.
+
+    Must be awaited on the event loop to be profiled. Only one profile runs at a time.
+
+    Args:
+        duration_s: Length of the profiling window.
+        interval_s: Time between stack samples.
+        slow_callback_s: Callbacks holding the loop longer than this are reported.
+        trace_memory: Whether to diff tracemalloc snapshots across the window.
+        top: Number of entries in the function and memory summaries.
+
+    Returns:
+        bytes: Zip archive with summary.json, stacks.folded, slow_callbacks.json and,
+            when trace_memory is set, memory_diff.txt.
+
+    Raises:
+        ProfileInProgress: Another profile is already running.
+    """
+    if _lock.locked():
+        raise ProfileInProgress()
+    async with _lock:
+        loop = asyncio.get_running_loop()
+        started_tracing = False
+        before = None
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(1)  # The diff is by line, so one frame per trace is enough
+                started_tracing = True
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+
+        collector = SlowCallbackCollector()
+        asyncio_logger = logging.getLogger("asyncio")
+        was_debug, was_threshold = loop.get_debug(), loop.slow_callback_duration
+        was_level = asyncio_logger.level
+        if not asyncio_logger.isEnabledFor(logging.WARNING):
+            asyncio_logger.setLevel(logging.WARNING)
+        asyncio_logger.addHandler(collector)
+        loop.slow_callback_duration = slow_callback_s
+        loop.set_debug(True)
+
+        sampler = StackSampler(threading.get_ident(), interval_s)
+        wall_started = time.time()
+        cpu_started = time.process_time()
+        sampler.start()
+        logger.info(f"Profiling started for {duration_s}s (pid {os.getpid()})")
+        try:
+            await asyncio.sleep(duration_s)
+        finally:
+            sampler.stop()
+            loop.set_debug(was_debug)
+            loop.slow_callback_duration = was_threshold
+            asyncio_logger.removeHandler(collector)
+            asyncio_logger.setLevel(was_level)
+            cpu_s = time.process_time() - cpu_started
+            try:
+                # Off the loop, like the first one: a snapshot walks every live trace
+                after = await asyncio.to_thread(tracemalloc.take_snapshot) if before is not None else None
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+            logger.info(f"Profiling finished ({sampler.samples} samples)")
+
+        memory_report = None
+        if after is not None:
+            memory_report = await asyncio.to_thread(_memory_diff, before, after, top)
+
+        slow_callbacks = sorted(collector.callbacks, key=lambda c: c["ms"], reverse=True)
+        summary = {
+            "pid": os.getpid(),
+            "started_at": round(wall_started, 3),
+            "duration_s": duration_s,
+            "cpu_s": round(cpu_s, 3),
+            "interval_ms": interval_s * 1000,
+            # Debug mode records a source traceback per callback, which tracemalloc
+            # makes markedly more expensive: profile CPU with trace_memory off.
+            "instruments": ["stack_sampler", "loop_debug"] + (["tracemalloc"] if trace_memory else []),
+            "samples": sampler.samples,
+            "loop_busy_fraction": round(1 - sampler.idle_samples / sampler.samples, 3)
+            if sampler.samples
+            else None,
+            "slow_callback_ms": slow_callback_s * 1000,
+            "slow_callbacks": len(slow_callbacks),
+            "top_functions": sampler.top_functions(top),
+        }
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("summary.json", json.dumps(summary, indent=2))
+            zf.writestr("stacks.folded", sampler.collapsed())
+            zf.writestr("slow_callbacks.json", json.dumps(slow_callbacks, indent=2))
+            if memory_report is not None:
+                zf.writestr("memory_diff.txt", memory_report)
+        return archive.getvalue()
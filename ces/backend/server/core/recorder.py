@@ -0,0 +1,170 @@
+"""
+Opt-in per-session recording of WebSocket traffic, for replaying real sessions
+against a server to reproduce latency regressions.
+
+Each session is written to `{directory}/{session_id}.cesrec`, an append-only
+binary log:
+
+    header  MAGIC, then <Q: wall-clock start in ns since the epoch>
+    frame   <B: kind><Q: ns since recording start (monotonic)><I: length><payload>
+
+Payloads are the raw WebSocket text messages (UTF-8), or a small JSON document
+for MARK frames (client attach/detach). On the event loop, recording a frame is
+a clock read and a queue put; encoding and file I/O happen on one background
+writer thread shared by all sessions.
+"""
+
+import atexit
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import IO, Dict, Iterator, NamedTuple, Optional, Tuple, Union
+
+from .logger import logger
+
+MAGIC = b"CESREC\x01\n"
+HEADER = struct.Struct("<Q")
+FRAME = struct.Struct("<BQI")
+
+# Frame kinds
+CLIENT_TEXT = 0  # client -> server
+SERVER_TEXT = 1  # server -> client
+CLIENT_BINARY = 2
+MARK = 3
+_OPEN = -1  # Writer commands, never written as frames
+_CLOSE = -2
+
+KIND_NAMES = {CLIENT_TEXT: "client", SERVER_TEXT: "server", CLIENT_BINARY: "client_binary", MARK: "mark"}
+
+
+class Frame(NamedTuple):
+    kind: int
+    t_ns: int
+    payload: bytes
+
+
+class _Writer:
+    """Background thread appending queued frames to their session's file."""
+
+    def __init__(self):
+        self._queue: "queue.SimpleQueue[Optional[Tuple]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def put(self, item: Tuple) -> None:
+        self._queue.put(item)
+
+    def shutdown(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        files: Dict[str, IO[bytes]] = {}
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, kind, t_ns, payload = item
+            try:
+                if kind == _OPEN:
+                    f = files[path] = open(path, "ab")
+                    if f.tell() == 0:
+                        f.write(MAGIC + HEADER.pack(t_ns))
+                    continue
+                if kind == _CLOSE:
+                    f = files.pop(path, None)
+                    if f is not None:
+                        f.close()
+                    continue
+                f = files.get(path)
+                if f is None:
+                    continue  # The file failed to open
+                if isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                f.write(FRAME.pack(kind, t_ns, len(payload)))
+                f.write(payload)
+                if self._queue.empty():
+                    f.flush()
+            except OSError as e:
+                logger.error(f"Session recorder failed writing {path}: {e}")
+        for f in files.values():
+            f.close()
+
+
+_writer: Optional[_Writer] = None
+
+
+class SessionRecorder:
+    """
+    Records one session's inbound and outbound WebSocket frames.
+
+    Attributes:
+        session_id (str): Session being recorded.
+        path (str): File the frames are appended to.
+    """
+
+    __slots__ = ("session_id", "path", "_start_ns", "_put", "closed")
+
+    def __init__(self, session_id: str, directory: str):
+        global _writer
+        if _writer is None:
+            _writer = _Writer()
+        os.makedirs(directory, exist_ok=True)
+        self.session_id = session_id
+        self.path = os.path.join(directory, f"{session_id}.cesrec")
+        self._start_ns = time.monotonic_ns()
+        self._put = _writer.put
+        self._put((self.path, _OPEN, time.time_ns(), b""))
+        self.closed = False
+        logger.info(f"[Session: {session_id}] Recording WebSocket traffic to {self.path}")
+
+    def client(self, message: Union[str, bytes], kind: int = CLIENT_TEXT) -> None:
+        """Records a message received from the client."""
+        self._put((self.path, kind, time.monotonic_ns() - self._start_ns, message))
+
+    def server(self, message: str) -> None:
+        """Records a message sent to the client."""
+        self._put((self.path, SERVER_TEXT, time.monotonic_ns() - self._start_ns, message))
+
+    def mark(self, event: str, **fields) -> None:
+        """Records a session lifecycle event, e.g. a client attaching or detaching."""
+        payload = json.dumps({"event": event, **fields})
+        self._put((self.path, MARK, time.monotonic_ns() - self._start_ns, payload))
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._put((self.path, _CLOSE, 0, b""))
+
+
+def read_recording(path: str) -> Tuple[int, Iterator[Frame]]:
+    """
+    Opens a recording.
+
+    Returns:
+        Tuple[int, Iterator[Frame]]: Wall-clock start (ns since the epoch) and the frames in order.
+    """
+    f = open(path, "rb")
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a session recording")
+    (started_ns,) = HEADER.unpack(f.read(HEADER.size))
+
+    def frames() -> Iterator[Frame]:
+        with f:
+            while True:
+                head = f.read(FRAME.size)
+                if len(head) < FRAME.size:
+                    return  # End of file, or a frame cut short by a crash
+                kind, t_ns, length = FRAME.unpack(head)
+                payload = f.read(length)
+                if len(payload) < length:
+                    return
+                yield Frame(kind, t_ns, payload)
+
+    return started_ns, frames()
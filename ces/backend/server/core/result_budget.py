@@ -0,0 +1,181 @@
+"""
+Size budgets for tool results returned to the model.
+
+A tool result goes into the Live API context and is paid for, in latency and
+tokens, on every later turn of the session. Decorating a tool with
+@budgeted_tool(...) trims its dict results to a per-tool budget in structured steps,
+so what is left is still well-formed and the most relevant part:
+
+- null and empty fields of nested objects are dropped (top-level keys are the
+  tool's contract and stay);
+- lists are cut to the first max_items entries (tools return results best first);
+- strings longer than max_string_chars are cut at a word boundary, marked with "…";
+- while the JSON is still over budget, strings are shortened further and lists
+  cut down to one entry.
+
+A trimmed result gets "truncated": true so the model knows there is more. Budgets
+are in bytes of JSON, or in tokens at roughly BYTES_PER_TOKEN bytes each. Bytes
+saved per call are exported as ces_tool_result_trimmed_bytes. Sync tools stay sync.
+Apply it outermost, above @cached_tool and @guarded_tool. The size of the result
+returned is left in RESULT_SIZE, so the tool registry need not encode it again.
+"""
+
+import functools
+import inspect
+import json
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.config import (
+    TOOL_RESULT_BUDGET_ENABLED,
+    TOOL_RESULT_MAX_BYTES,
+    TOOL_RESULT_MAX_ITEMS,
+    TOOL_RESULT_MAX_STRING_CHARS,
+)
+
+from .logger import logger
+from .metrics import TOOL_RESULT_TRIMMED
+
+BYTES_PER_TOKEN = 4  # Rough size of a token of English JSON text
+MIN_STRING_CHARS = 40  # Strings are never cut shorter than this
+ELLIPSIS = "…"
+MARKER_BYTES = len(', "truncated": true')
+
+# JSON size of the result the innermost budgeted tool call just returned
+RESULT_SIZE: ContextVar[Optional[int]] = ContextVar("tool_result_size", default=None)
+
+
+def json_size(value: Any) -> int:
+    """Bytes of value as UTF-8 JSON; non-ASCII text counts its encoded size, not \\uXXXX escapes."""
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _shrink(value: Any, max_items: int, max_chars: int, cuts: list, nested: bool = False) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: _shrink(item, max_items, max_chars, cuts, nested=True)
+            for key, item in value.items()
+            if not (nested and _is_empty(item))
+        }
+    if isinstance(value, list):
+        if len(value) > max_items:
+            cuts.append(len(value) - max_items)
+        return [_shrink(item, max_items, max_chars, cuts, nested=True) for item in value[:max_items]]
+    if isinstance(value, str) and len(value) > max_chars:
+        cuts.append(1)
+        cut = value[:max_chars]
+        space = cut.rfind(" ")
+        if space > max_chars // 2:
+            cut = cut[:space]
+        return cut.rstrip() + ELLIPSIS
+    return value
+
+
+def _longest(value: Any, kind: type) -> int:
+    """Length of the longest list (kind=list) or string (kind=str) inside value."""
+    own = len(value) if isinstance(value, kind) else 0
+    if isinstance(value, dict):
+        return max([own, *(_longest(item, kind) for item in value.values())])
+    if isinstance(value, list):
+        return max([own, *(_longest(item, kind) for item in value)])
+    return own
+
+
+def fit_result(
+    result: Dict[str, Any], max_bytes: int, max_items: int, max_string_chars: int
+) -> Dict[str, Any]:
+    """
+    Returns result trimmed to at most max_bytes of JSON where structured trimming allows.
+
+    Results already within the budget with no list over max_items and no string over
+    max_string_chars come back unchanged (apart from dropped empty nested fields).
+    """
+    return _fit(result, max_bytes, max_items, max_string_chars)[0]
+
+
+def _fit(
+    result: Dict[str, Any], max_bytes: int, max_items: int, max_string_chars: int
+) -> Tuple[Dict[str, Any], int]:
+    """fit_result, also returning the JSON size of what it returns."""
+    cuts: list = []
+    max_items = min(max_items, max(1, _longest(result, list)))
+    max_chars = min(max_string_chars, max(MIN_STRING_CHARS, _longest(result, str)))
+    trimmed = _shrink(result, max_items, max_chars, cuts)
+    # Over budget: shorten strings in proportion to the overrun down to a readable
+    # length, then drop list entries, then shorten strings as far as the floor allows
+    limit = max_bytes - MARKER_BYTES
+    while (size := json_size(trimmed)) > limit:
+        if max_chars > 4 * MIN_STRING_CHARS:
+            max_chars = max(4 * MIN_STRING_CHARS, min(max_chars - 1, max_chars * limit // size))
+        elif max_items > 1:
+            max_items -= 1
+        elif max_chars > MIN_STRING_CHARS:
+            max_chars = max(MIN_STRING_CHARS, max_chars // 2)
+        else:
+            break
+        cuts = []
+        trimmed = _shrink(result, max_items, max_chars, cuts)
+    if cuts:
+        trimmed["truncated"] = True
+        size += MARKER_BYTES
+    return trimmed, size
+
+
+def budgeted_tool(
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    max_items: Optional[int] = None,
+    max_string_chars: Optional[int] = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorates a tool so its dict results are trimmed to a size budget.
+
+    Args:
+        max_bytes: Budget for the result's JSON (default TOOL_RESULT_MAX_BYTES).
+        max_tokens: Budget in model tokens; the tighter of this and max_bytes applies.
+        max_items: Entries kept per list (default TOOL_RESULT_MAX_ITEMS).
+        max_string_chars: Longest string kept whole (default TOOL_RESULT_MAX_STRING_CHARS).
+    """
+    budget = max_bytes or TOOL_RESULT_MAX_BYTES
+    if max_tokens is not None:
+        budget = min(budget, max_tokens * BYTES_PER_TOKEN)
+    items = max_items or TOOL_RESULT_MAX_ITEMS
+    chars = max_string_chars or TOOL_RESULT_MAX_STRING_CHARS
+
+    def decorate(func: Callable) -> Callable:
+        name = func.__name__
+
+        def apply(result: Any) -> Any:
+            if not TOOL_RESULT_BUDGET_ENABLED or not isinstance(result, dict):
+                return result
+            before = json_size(result)
+            trimmed, after = _fit(result, budget, items, chars)
+            RESULT_SIZE.set(after)
+            saved = before - after
+            if saved > 0:
+                TOOL_RESULT_TRIMMED.observe(saved, name)
+                logger.info(
+                    f"Trimmed {name} result from {before} to {before - saved} bytes "
+                    f"(~{saved // BYTES_PER_TOKEN} tokens saved)"
+                )
+            return trimmed
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                return apply(await func(*args, **kwargs))
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return apply(func(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,126 @@
+"""
+Layered per-session context: an immutable shared base plus a small per-session overlay.
+
+The demo contexts (e.g. GenericContext.CUSTOMER_PROFILE) are module-level dicts shared
+by every connection. SessionContext lets each session read them without copying and
+without ever writing back into them.
+"""
+
+import copy
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional
+
+# Values of these types are copied into the overlay before they are handed out,
+# so in-place edits by one session can never reach the shared base.
+_MUTABLE_TYPES = (dict, list, set, bytearray)
+
+# One read-only proxy per shared profile dict, keyed by id() of the profile.
+_BASE_PROXIES: Dict[int, MappingProxyType] = {}
+
+
+def shared_base(profile: Dict[str, Any]) -> MappingProxyType:
+    """Returns the cached read-only proxy for a shared profile dict."""
+    proxy = _BASE_PROXIES.get(id(profile))
+    if proxy is None:
+        proxy = MappingProxyType(profile)
+        _BASE_PROXIES[id(profile)] = proxy
+    return proxy
+
+
+class SessionContext(MutableMapping):
+    """
+    Copy-on-write view over a shared base mapping.
+
+    Reads fall through to the base unless the key has been written for this session.
+    Writes and deletes only ever touch the overlay. Mutable base values (dicts, lists)
+    are copied into the overlay on first access, so the per-session footprint stays
+    limited to the keys a session actually touches.
+
+    Attributes:
+        base (Mapping[str, Any]): The shared, read-only base mapping.
+        overlay (Dict[str, Any]): The per-session keys written so far.
+    """
+
+    __slots__ = ("_base", "_overlay", "_deleted")
+
+    def __init__(self, base: Mapping, overlay: Optional[Dict[str, Any]] = None):
+        self._base = base
+        self._overlay: Dict[str, Any] = dict(overlay) if overlay else {}
+        self._deleted: Optional[set] = None
+
+    @classmethod
+    def from_profile(cls, profile: Dict[str, Any], **overlay: Any) -> "SessionContext":
+        """Creates a session context layered over a shared profile dict."""
+        return cls(shared_base(profile), overlay)
+
+    @property
+    def base(self) -> Mapping:
+        return self._base
+
+    @property
+    def overlay(self) -> Dict[str, Any]:
+        return self._overlay
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            return self._overlay[key]
+        if self._deleted and key in self._deleted:
+            raise KeyError(key)
+        value = self._base[key]
+        if isinstance(value, _MUTABLE_TYPES):
+            # Copy-on-write: the caller may mutate what we return.
+            value = copy.deepcopy(value)
+            self._overlay[key] = value
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._overlay[key] = value
+        if self._deleted:
+            self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        if key in self._base:
+            if self._deleted is None:
+                self._deleted = set()
+            self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._overlay:
+            return True
+        if self._deleted and key in self._deleted:
+            return False
+        return key in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._overlay:
+            yield key
+        for key in self._base:
+            if key in self._overlay or (self._deleted and key in self._deleted):
+                continue
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def as_state(self) -> Dict[str, Any]:
+        """
+        Flattens the layers into a plain dict for the session service.
+
+        This is a shallow merge: base values are shared by reference rather than
+        deep-copied. The session service owns the resulting dict and only ever
+        replaces top-level keys, so the shared base is never written through it.
+        """
+        state = {
+            key: value
+            for key, value in self._base.items()
+            if not (self._deleted and key in self._deleted)
+        }
+        state.update(self._overlay)
+        return state
+
+    def __repr__(self) -> str:
+        return f"SessionContext(overlay={self._overlay!r}, base_keys={len(self._base)})"
@@ -0,0 +1,205 @@
+"""
+Shared session directory for multi-worker serving.
+
+Each worker listens on a private Unix socket and publishes the sessions it owns as
+symlinks `<root>/sessions/<session_id> -> <root>/workers/<pid>.sock`. A worker that
+receives a request for a session it does not own looks up the owner here and
+forwards the request over the owner's socket. Resume tokens are published the same
+way under `<root>/tokens/`, named by their SHA-256 so the secret never reaches the
+filesystem, letting a reconnect that lands on another worker reach its session.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+from typing import Optional
+
+from .logger import logger
+
+# Marks a request already forwarded by another worker, so it is never forwarded twice
+FORWARDED_HEADER = "X-Session-Forwarded"
+
+# Session IDs are token_urlsafe strings; anything else never reaches the filesystem.
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class SessionDirectory:
+    """
+    Filesystem index of session ownership, shared by all workers on one host.
+
+    Attributes:
+        root (str): Directory holding the `sessions/` and `workers/` subdirectories.
+        socket_path (str): This worker's internal Unix socket.
+    """
+
+    def __init__(self, root: str, pid: Optional[int] = None):
+        self.root = root
+        self.sessions_dir = os.path.join(root, "sessions")
+        self.tokens_dir = os.path.join(root, "tokens")
+        self.workers_dir = os.path.join(root, "workers")
+        self.socket_path = os.path.join(self.workers_dir, f"{pid or os.getpid()}.sock")
+        for path in (self.sessions_dir, self.tokens_dir, self.workers_dir):
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def reset(root: str) -> None:
+        """Clears entries left behind by a previous run (called by the supervisor)."""
+        for name in ("sessions", "tokens", "workers"):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    @staticmethod
+    def purge_worker(root: str, pid: int) -> None:
+        """
+        Removes a dead worker's socket and every entry pointing at it (called by the
+        supervisor), so requests for its lost sessions are not forwarded into the void.
+        """
+        socket_path = os.path.join(root, "workers", f"{pid}.sock")
+        removed = 0
+        for name in ("sessions", "tokens"):
+            path = os.path.join(root, name)
+            try:
+                entries = os.listdir(path)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if os.readlink(os.path.join(path, entry)) == socket_path:
+                        os.unlink(os.path.join(path, entry))
+                        removed += 1
+                except OSError:
+                    pass
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+        if removed:
+            logger.info(f"Removed {removed} session directory entries of dead worker {pid}")
+
+    def _entry(self, session_id: str) -> Optional[str]:
+        if not _SESSION_ID_PATTERN.match(session_id or ""):
+            return None
+        return os.path.join(self.sessions_dir, session_id)
+
+    def _token_entry(self, resume_token: str) -> Optional[str]:
+        if not resume_token:
+            return None
+        return os.path.join(self.tokens_dir, hashlib.sha256(resume_token.encode()).hexdigest())
+
+    def _link(self, entry: str) -> None:
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        os.symlink(self.socket_path, tmp)
+        os.replace(tmp, entry)
+
+    def _unlink(self, entry: str) -> None:
+        try:
+            if os.readlink(entry) == self.socket_path:
+                os.unlink(entry)
+        except FileNotFoundError:
+            pass
+
+    def _owner(self, entry: Optional[str]) -> Optional[str]:
+        if not entry:
+            return None
+        try:
+            target = os.readlink(entry)
+        except OSError:
+            return None
+        if target == self.socket_path or not os.path.exists(target):
+            return None
+        return target
+
+    def publish(self, session_id: str) -> None:
+        """Records this worker as the owner of a session (atomic replace)."""
+        entry = self._entry(session_id)
+        if not entry:
+            logger.warning(f"Not publishing session with unsafe id: {session_id!r}")
+            return
+        try:
+            self._link(entry)
+        except OSError as e:
+            logger.error(f"Failed to publish session {session_id} to directory: {e}")
+
+    def withdraw(self, session_id: str) -> None:
+        """Removes a session entry, if this worker still owns it."""
+        entry = self._entry(session_id)
+        if not entry:
+            return
+        try:
+            self._unlink(entry)
+        except OSError as e:
+            logger.error(f"Failed to withdraw session {session_id} from directory: {e}")
+
+    def owner_of(self, session_id: str) -> Optional[str]:
+        """
+        Returns the socket path of the worker owning a session, or None if the session
+        is unknown, owned by this worker, or owned by a worker that is gone.
+        """
+        return self._owner(self._entry(session_id))
+
+    def publish_token(self, resume_token: str) -> None:
+        """Records this worker as the holder of a resume token's session."""
+        try:
+            self._link(self._token_entry(resume_token))
+        except OSError as e:
+            logger.error(f"Failed to publish resume token to directory: {e}")
+
+    def withdraw_token(self, resume_token: str) -> None:
+        """Removes a resume token entry, if this worker still holds it."""
+        entry = self._token_entry(resume_token)
+        if not entry:
+            return
+        try:
+            self._unlink(entry)
+        except OSError as e:
+            logger.error(f"Failed to withdraw resume token from directory: {e}")
+
+    def token_owner(self, resume_token: str) -> Optional[str]:
+        """Returns the socket path of the worker holding a resume token's session, as owner_of."""
+        return self._owner(self._token_entry(resume_token))
+
+    def close(self) -> None:
+        """Withdraws every entry owned by this worker and removes its socket."""
+        for path in (self.sessions_dir, self.tokens_dir):
+            try:
+                for name in os.listdir(path):
+                    self._unlink(os.path.join(path, name))
+            except OSError:
+                pass
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+# The directory this worker publishes to; None when running a single process.
+current: Optional[SessionDirectory] = None
+
+
+def configure(root: str) -> SessionDirectory:
+    """Sets up the shared directory for this worker process."""
+    global current
+    current = SessionDirectory(root)
+    logger.info(f"Session directory at {root}; internal socket {current.socket_path}")
+    return current
+
+
+def publish_session(session_id: str) -> None:
+    if current:
+        current.publish(session_id)
+
+
+def withdraw_session(session_id: str) -> None:
+    if current:
+        current.withdraw(session_id)
+
+
+def publish_resume_token(resume_token: str) -> None:
+    if current:
+        current.publish_token(resume_token)
+
+
+def withdraw_resume_token(resume_token: str) -> None:
+    if current:
+        current.withdraw_token(resume_token)
@@ -0,0 +1,165 @@
+"""
+Pool of pre-built SessionState objects so a new WebSocket client only has to attach.
+
+Building a session (agent config, session service session, runner and live event
+stream) happens in a background task. The pool keeps enough idle sessions to cover
+the connections expected to arrive while one more session is being built, based on
+the recent connection arrival rate.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+from .logger import logger
+from .session_state import SessionState
+
+class SessionPool:
+    """
+    Keeps a small stock of ready-to-attach sessions, sized from the arrival rate.
+
+    Attributes:
+        factory (Callable[[], Awaitable[Optional[SessionState]]]): Builds one session.
+        enabled (bool): When False, acquire() always builds a session inline.
+        min_size (int): Idle sessions kept even when no clients are arriving.
+        max_size (int): Upper bound on idle sessions.
+        window_s (float): Window over which the arrival rate is measured.
+        max_age_s (float): Idle sessions older than this are discarded and rebuilt.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[Optional[SessionState]]],
+        enabled: bool = True,
+        min_size: int = 1,
+        max_size: int = 8,
+        window_s: float = 60.0,
+        max_age_s: float = 300.0,
+    ):
+        self.factory = factory
+        self.enabled = enabled
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.window_s = window_s
+        self.max_age_s = max_age_s
+
+        self._idle: Deque[Tuple[float, SessionState]] = deque()
+        self._arrivals: Deque[float] = deque()
+        self._build_time_s: Optional[float] = None  # EMA of build duration
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refill_task: Optional[asyncio.Task] = None
+
+    # --- Lifecycle ---
+
+    async def start(self) -> None:
+        """Starts the background refill task."""
+        if not self.enabled or self._refill_task:
+            return
+        self._wakeup = asyncio.Event()
+        self._refill_task = asyncio.create_task(
+            self._refill_loop(), name="session_pool_refill"
+        )
+        logger.info(
+            f"Session pool started (min={self.min_size}, max={self.max_size}, window={self.window_s}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stops refilling and closes every idle session."""
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        while self._idle:
+            _, session = self._idle.popleft()
+            await session.close()
+        logger.info("Session pool stopped.")
+
+    # --- Acquisition ---
+
+    async def acquire(self) -> Tuple[Optional[SessionState], bool]:
+        """
+        Returns a session for a new client and whether it came from the pool.
+
+        Falls back to building the session inline when the pool is empty or disabled.
+        """
+        now = asyncio.get_running_loop().time()
+        self._arrivals.append(now)
+        self._prune(now)
+
+        session = None
+        if self._idle:
+            _, session = self._idle.popleft()
+        if self._wakeup:
+            self._wakeup.set()
+
+        if session:
+            return session, True
+        return await self._build(), False
+
+    def target_size(self) -> int:
+        """Idle sessions needed to cover arrivals expected during one build."""
+        rate = len(self._arrivals) / self.window_s if self.window_s > 0 else 0.0
+        lead_time = self._build_time_s or 1.0
+        # Twice the expected arrivals during a build absorbs small bursts.
+        wanted = math.ceil(rate * lead_time * 2)
+        return max(self.min_size, min(self.max_size, wanted))
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    # --- Internals ---
+
+    def _prune(self, now: float) -> None:
+        while self._arrivals and now - self._arrivals[0] > self.window_s:
+            self._arrivals.popleft()
+
+    async def _build(self) -> Optional[SessionState]:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        session = await self.factory()
+        elapsed = loop.time() - started
+        if self._build_time_s is None:
+            self._build_time_s = elapsed
+        else:
+            self._build_time_s = 0.8 * self._build_time_s + 0.2 * elapsed
+        return session
+
+    async def _discard_expired(self, now: float) -> None:
+        while self._idle and now - self._idle[0][0] > self.max_age_s:
+            _, session = self._idle.popleft()
+            logger.debug(f"Session pool: discarding expired session {session.user_id}")
+            await session.close()
+
+    async def _refill_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                now = loop.time()
+                self._prune(now)
+                await self._discard_expired(now)
+
+                while len(self._idle) < self.target_size():
+                    session = await self._build()
+                    if session is None:
+                        logger.error("Session pool: session factory returned no session.")
+                        break
+                    self._idle.append((loop.time(), session))
+                    logger.debug(
+                        f"Session pool: warmed session {session.user_id} ({len(self._idle)}/{self.target_size()})"
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Session pool: error while refilling: {e}")
+
+            self._wakeup.clear()
+            try:
+                # Wake on the next acquire, or periodically to age out idle sessions.
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.window_s / 4)
+            except asyncio.TimeoutError:
+                pass
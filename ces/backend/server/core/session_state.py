@@ -1,13 +1,41 @@
-from typing import Any, Dict, Optional
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional
 
-from config.config import USE_TTS
+from config.config import LIVE_BACKEND, USE_TTS
 from google.adk.agents import Agent, LiveRequestQueue
 from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
 from google.adk.events import Event
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 
+from .event_inspector import EventInspector
+from .fake_live import FakeLiveRunner
 from .logger import logger
+from .recorder import SessionRecorder
+from .session_context import SessionContext
+from .prefetch import PREFETCH
+from .session_usage import SessionUsage, event_bytes
+from .tool_dispatch import release_session
+from .tracing import TurnTracer
+
+
+class _EndOfStream:
+    """Marks the end of the live event stream in the session's event queue."""
+
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+def _is_audio_only(event: Event) -> bool:
+    """Whether an event carries nothing but model audio (no text, tool or turn signals)."""
+    if event.turn_complete or event.interrupted or event.content is None or not event.content.parts:
+        return False
+    return all(
+        part.inline_data is not None
+        and (part.inline_data.mime_type or "").startswith("audio/")
+        for part in event.content.parts
+    )
 
 
 class SessionState:
@@ -28,7 +56,8 @@ class SessionState:
         session_service (Optional[Any]): The initialized session service object.
         artifact_service (Optional[Any]): The initialized artifact service object.
         session (Optional[Any]): The session object created by the session service.
-        context (Optional[Dict[str, Any]]): The session context data.
+        context (Optional[Mapping[str, Any]]): The session context data, usually a
+            SessionContext layered over a shared profile.
         num_agents (int): The number of agents involved in the session.
         num_agents_set (bool): Flag indicating if the number of agents has been determined.
         runner (Runner): The runner object for executing the agent.
@@ -38,6 +67,15 @@ class SessionState:
         interrupted (bool): Flag indicating if the session has been interrupted.
         current_audio_stream (Optional[Any]): The current audio stream object (if any).
         received_model_response (bool): Flag indicating if a model response has been received in the current turn.
+        websocket (Optional[Any]): The client connection currently attached to the session.
+        resume_token (Optional[str]): Secret a reconnecting client presents to re-attach.
+        detached_at (Optional[float]): Loop time the client dropped, while awaiting resumption.
+        client_ended (bool): Flag indicating the client explicitly ended the session.
+        tracer (TurnTracer): Per-turn latency tracer for the session.
+        event_inspector (EventInspector): Logs event text and tool activity per turn.
+        recorder (Optional[SessionRecorder]): WebSocket traffic recorder, when RECORD_SESSIONS is on.
+        usage (SessionUsage): Bytes, audio, frames, tool and TTS use, for the admin session inspector.
+        created_at (float): Wall-clock creation time.
     """
 
     def __init__(
@@ -47,7 +85,7 @@ class SessionState:
         user_id: str = "userX",
         session_service: str = "in_memory",
         artifact_service: str = "in_memory",
-        context: Dict[str, Any] = None,
+        context: Mapping[str, Any] = None,
     ):
         self.agent = agent
         self.app_name = app_name
@@ -76,6 +114,38 @@ class SessionState:
             False  # Track if we've received a model response in current turn
         )
 
+        # Client attachment and resumption
+        self.websocket: Optional[Any] = None
+        self.resume_token: Optional[str] = None
+        self.detached_at: Optional[float] = None
+        self.detached_event = asyncio.Event()
+        self.expiry_handle: Optional[asyncio.TimerHandle] = None
+        self.client_ended: bool = False
+
+        # Live events are pumped into a queue owned by the session, so a client
+        # disconnect never cancels the Live API stream itself. Audio produced while
+        # detached is dropped rather than queued: it would be stale by the time a
+        # client resumes, and the queue would grow for the whole grace window.
+        self.event_queue: asyncio.Queue = asyncio.Queue()
+        self.event_queue_bytes: int = 0  # Payload bytes of the queued events
+        self.pump_task: Optional[asyncio.Task] = None
+        self.events_finished: bool = False
+
+        # Turn tracking, used to let in-flight turns finish while draining
+        self.turn_in_progress: bool = False
+        self.turn_idle = asyncio.Event()
+        self.turn_idle.set()
+        self.turns_completed: int = 0
+        # Set by the attached response handler; flushes its outbound audio buffer
+        self.flush_outbound_audio: Optional[Callable[[], Awaitable[None]]] = None
+
+        # Per-turn latency milestones and histograms
+        self.tracer = TurnTracer(user_id)
+        self.event_inspector = EventInspector(user_id)
+        self.recorder: Optional[SessionRecorder] = None
+        self.usage = SessionUsage()
+        self.created_at = time.time()
+
     @classmethod
     async def create(
         cls,
@@ -84,12 +154,91 @@ class SessionState:
         user_id: str = "userX",
         session_service: str = "in_memory",
         artifact_service: str = "in_memory",
-        context: Dict[str, Any] = None,
+        context: Mapping[str, Any] = None,
     ):
         self = cls(agent, app_name, user_id, session_service, artifact_service, context)
         self.runner = await self.setup()
         return self
 
+    def mark_turn_started(self):
+        """Records that the model is producing a response."""
+        if not self.turn_in_progress:
+            self.turn_in_progress = True
+            self.turn_idle.clear()
+
+    def mark_turn_finished(self):
+        """Records that the model's turn completed or was interrupted."""
+        if self.turn_in_progress:
+            self.turn_in_progress = False
+            self.turns_completed += 1
+            self.turn_idle.set()
+
+    def start_event_pump(self):
+        """Starts forwarding live events into the session's event queue (idempotent)."""
+        if self.pump_task is None and self.events is not None:
+            self.pump_task = asyncio.create_task(
+                self._pump_events(), name=f"event_pump_{self.user_id}"
+            )
+
+    async def _pump_events(self):
+        error = None
+        try:
+            async for event in self.events:
+                if self.detached_at is not None and _is_audio_only(event):
+                    self.usage.audio_events_dropped += 1
+                    continue
+                self.event_queue.put_nowait(event)
+                self.event_queue_bytes += event_bytes(event)
+                depth = self.event_queue.qsize()
+                if depth > self.usage.event_queue_peak:
+                    self.usage.event_queue_peak = depth
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            self.events_finished = True
+            self.event_queue.put_nowait(_EndOfStream(error))
+
+    async def stream_events(self) -> AsyncIterator[Event]:
+        """
+        Yields live events for the attached client until the live stream ends.
+
+        Cancelling the consumer (e.g. when the client disconnects) leaves the pump and
+        the Live API stream running, so a resumed client picks up where it left off.
+        Errors raised by the live stream are re-raised here.
+        """
+        while True:
+            item = await self.event_queue.get()
+            if isinstance(item, _EndOfStream):
+                self.event_queue.put_nowait(item)  # Later consumers see the end too
+                if item.error:
+                    raise item.error
+                return
+            self.event_queue_bytes -= event_bytes(item)
+            yield item
+
+    async def close(self):
+        """
+        Closes the live request queue and the live event stream, if one was created.
+        """
+        self.live_request_queue.close()
+        if self.pump_task is not None and not self.pump_task.done():
+            self.pump_task.cancel()
+            try:
+                await self.pump_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.events is not None:
+            try:
+                await self.events.aclose()
+            except Exception as e:
+                logger.debug(f"Error closing live event stream for {self.user_id}: {e}")
+            self.events = None
+        if self.session is not None:
+            release_session(self.session.id)
+            PREFETCH.release(self.session.id)
+
     def _get_session_service(self):
         """
         Retrieves or initializes the session service.
@@ -139,29 +288,8 @@ class SessionState:
             self.num_agents = 1 + len(agent.sub_agents)
 
     def log_event_output(self, event: Event):
-        try:
-            res = event.content.model_dump(exclude_none=True).get("parts", None)
-        except Exception as e:
-            logger.debug(f"e:{e}\nevent:{event}")
-            return None
-
-        if not res:
-            return None
-
-        for part in res:
-            if part.get("text", None):
-                if event.content.role == "model" and not event.partial:
-                    logger.info(f"{event.author}: {part['text']}")
-                elif event.content.role == "user":
-                    logger.info(f"USER QUERY: {part['text']}")
-
-            if part.get("function_call", None):
-                logger.info(f"TOOL CALL: {part['function_call']}")
-
-            if part.get("function_response", None):
-                logger.info(f"TOOL RESULT: {part['function_response']}")
-
-        return res
+        """Logs the event's text and tool activity, as names and sizes, at DEBUG (see EventInspector)."""
+        self.event_inspector.inspect(event)
 
     async def setup(self):
         """
@@ -180,8 +308,14 @@ class SessionState:
         if not self.session:
             if self.context:
                 logger.info("Creating new session with session context")
+                # Shallow flatten only: shared profile values are not deep-copied here
+                state = (
+                    self.context.as_state()
+                    if isinstance(self.context, SessionContext)
+                    else dict(self.context)
+                )
                 self.session = await session_service.create_session(
-                    app_name=self.app_name, user_id=self.user_id, state=self.context
+                    app_name=self.app_name, user_id=self.user_id, state=state
                 )
             else:
                 logger.info("Creating new session with no context")
@@ -190,6 +324,13 @@ class SessionState:
                     user_id=self.user_id,
                 )
 
+        if LIVE_BACKEND == "fake":
+            return FakeLiveRunner(
+                app_name=self.app_name,
+                agent=self.agent,
+                artifact_service=self.artifact_service,
+                session_service=self.session_service,
+            )
         if USE_TTS:
             return Runner(
                 app_name=self.app_name,
@@ -0,0 +1,100 @@
+"""
+Per-session resource accounting, for finding which sessions are expensive.
+
+Counters are plain attribute increments on the hot paths; the memory estimate is
+only computed when a report is requested.
+"""
+
+import json
+from typing import Any, Dict
+
+INPUT_BYTES_PER_SECOND = 16000 * 2  # 16kHz 16-bit PCM from the client microphone
+OUTPUT_BYTES_PER_SECOND = 24000 * 2  # 24kHz 16-bit PCM to the client speaker
+
+
+class SessionUsage:
+    """
+    Running totals of what one session has consumed since it was created.
+
+    Attributes:
+        bytes_in (int): WebSocket payload bytes received from the client.
+        bytes_out (int): WebSocket payload bytes sent to the client.
+        messages_in (int): WebSocket messages received.
+        messages_out (int): WebSocket messages sent.
+        audio_in_s (float): Seconds of microphone audio forwarded to the agent.
+        audio_out_s (float): Seconds of agent audio sent to the client.
+        image_frames (int): Camera frames forwarded to the agent.
+        tool_calls (int): Tool calls made by the agent.
+        tool_time_s (float): Time from tool call to tool result, summed.
+        tts_chars (int): Characters sent to Cloud TTS.
+        audio_buffer_peak (int): Largest outbound audio buffer, in bytes.
+        event_queue_peak (int): Deepest backlog of live events awaiting the client.
+        audio_events_dropped (int): Model audio events discarded while no client was attached.
+    """
+
+    __slots__ = (
+        "bytes_in",
+        "bytes_out",
+        "messages_in",
+        "messages_out",
+        "audio_in_s",
+        "audio_out_s",
+        "image_frames",
+        "tool_calls",
+        "tool_time_s",
+        "tts_chars",
+        "audio_buffer_peak",
+        "event_queue_peak",
+        "audio_events_dropped",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            name: round(value, 3) if isinstance(value, float) else value
+            for name in self.__slots__
+            for value in (getattr(self, name),)
+        }
+
+
+def event_bytes(event: Any) -> int:
+    """Approximate payload size of an event kept in the ADK session history."""
+    size = 0
+    content = getattr(event, "content", None)
+    for part in (content.parts or []) if content is not None else []:
+        if part.text:
+            size += len(part.text)
+        if part.inline_data and part.inline_data.data:
+            size += len(part.inline_data.data)
+        if part.function_call:
+            size += len(str(part.function_call.args))
+        if part.function_response:
+            size += len(str(part.function_response.response))
+    return size
+
+
+def estimate_memory(session: Any) -> Dict[str, int]:
+    """
+    Approximate memory held by a SessionState, in bytes.
+
+    Counts the outbound audio buffer high-water mark, queued live events, the ADK
+    session state and the payloads of its event history. Interpreter overhead is
+    not included, so treat the total as a lower bound for ranking sessions.
+    """
+    adk_session = session.session
+    state = adk_session.state if adk_session is not None else {}
+    history = adk_session.events if adk_session is not None else []
+    estimate = {
+        "audio_buffer_peak": session.usage.audio_buffer_peak,
+        "event_queue": session.event_queue_bytes,
+        "state": len(json.dumps(state, default=str)),
+        "history": sum(event_bytes(event) for event in history),
+        "history_events": len(history),
+    }
+    estimate["total"] = (
+        estimate["audio_buffer_peak"] + estimate["event_queue"] + estimate["state"] + estimate["history"]
+    )
+    return estimate
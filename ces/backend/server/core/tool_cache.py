@@ -0,0 +1,227 @@
+"""
+Result cache for idempotent tools, shared by every session in the process.
+
+Concurrent sessions often ask for the same thing (the weather in Sydney, the price
+of GOOG). Decorating a tool with @cached_tool(ttl_s=...) makes it:
+
+- serve a successful result from memory for ttl_s, keyed by the tool name and its
+  arguments normalized (strings stripped, case-folded and whitespace-collapsed;
+  defaults applied; ToolContext excluded), so "Sydney" and " sydney" share an entry;
+- coalesce identical concurrent calls onto one upstream request (single-flight);
+- stay within TOOL_CACHE_MAX_BYTES of results overall, evicting least recently used.
+
+Error results are not cached. Hits, misses and coalesced calls are exported per tool
+as ces_tool_cache_requests_total. The decorated tool is always a coroutine function;
+a sync tool is run on the tool executor. functools.wraps keeps the name, docstring and
+signature the ADK builds the function declaration from.
+"""
+
+import asyncio
+import contextvars
+import copy
+import functools
+import inspect
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config.config import TOOL_CACHE_ENABLED, TOOL_CACHE_MAX_BYTES
+
+from .logger import logger
+from .metrics import REGISTRY, TOOL_CACHE_REQUESTS
+from .tool_executor import run_blocking
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_UNCACHED_PARAMS = {"tool_context"}
+
+# How the current task's last cached tool call was served; read by the tool registry
+CACHE_OUTCOME: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("tool_cache_outcome", default=None)
+
+CacheKey = Tuple[str, Tuple[Tuple[str, Hashable], ...]]
+
+
+def normalize(value: Any) -> Hashable:
+    """Canonical, hashable form of a tool argument."""
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value.strip()).casefold()
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(v) for v in value)
+    return value
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    """Marks a failed fill as seen, in case every caller waiting on it was cancelled."""
+    if not task.cancelled():
+        task.exception()
+
+
+def is_success(result: Any) -> bool:
+    """Whether a tool result is worth caching: not one of the tools' error shapes."""
+    if not isinstance(result, dict):
+        return result is not None
+    return "error" not in result and result.get("status") != "error"
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ToolCache:
+    """
+    TTL + LRU cache of tool results under a byte budget, with single-flight loading.
+
+    Attributes:
+        max_bytes (int): Budget for cached results, measured as their JSON size.
+        bytes (int): Current size of cached results.
+    """
+
+    def __init__(self, max_bytes: int = TOOL_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, value: Any, ttl_s: float) -> None:
+        try:
+            size = len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, time.monotonic() + ttl_s, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def has(self, key: CacheKey) -> bool:
+        """Whether key has a fresh result or a load in flight; does not count as a use."""
+        entry = self._entries.get(key)
+        return key in self._inflight or (entry is not None and entry.expires_at > time.monotonic())
+
+    def _remove(self, key: CacheKey) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    async def load(
+        self, key: CacheKey, ttl_s: float, call: Callable[[], Any], cache_if: Callable[[Any], bool]
+    ) -> Tuple[Any, str]:
+        """
+        Returns the cached result for key, or runs call() once for all concurrent callers.
+
+        Returns:
+            Tuple[Any, str]: The result and how it was obtained: "hit", "miss" or "coalesced".
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry.value, "hit"
+        task = self._inflight.get(key)
+        outcome = "coalesced"
+        if task is None:
+            outcome = "miss"
+            task = asyncio.create_task(self._fill(key, ttl_s, call, cache_if))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            task.add_done_callback(_retrieve_exception)
+        # Shielded so one caller being cancelled (e.g. on barge-in) does not fail the others
+        return await asyncio.shield(task), outcome
+
+    async def _fill(self, key: CacheKey, ttl_s: float, call: Callable[[], Any], cache_if: Callable[[Any], bool]) -> Any:
+        result = await call()
+        if cache_if(result):
+            self.put(key, result, ttl_s)
+        return result
+
+
+TOOL_CACHE = ToolCache()
+REGISTRY.gauge("ces_tool_cache_bytes", "Size of cached tool results.", lambda: TOOL_CACHE.bytes)
+REGISTRY.gauge("ces_tool_cache_entries", "Number of cached tool results.", lambda: len(TOOL_CACHE))
+
+
+def cached_tool(
+    ttl_s: float, cache_if: Callable[[Any], bool] = is_success, cache: Optional[ToolCache] = None
+) -> Callable[[Callable], Callable]:
+    """
+    Decorates an idempotent tool so its results are cached and concurrent calls coalesced.
+
+    Args:
+        ttl_s: How long a successful result is served from the cache.
+        cache_if: Predicate deciding whether a result may be cached (default: not an error).
+        cache: Cache to use instead of the process-wide TOOL_CACHE.
+    """
+
+    def decorate(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        name = func.__name__
+        is_async = inspect.iscoroutinefunction(func)
+
+        def cache_key(*args, **kwargs) -> Optional[CacheKey]:
+            """The cache key of a call, or None if its arguments are unhashable."""
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (
+                name,
+                tuple(
+                    (param, normalize(value))
+                    for param, value in bound.arguments.items()
+                    if param not in _UNCACHED_PARAMS
+                ),
+            )
+            try:
+                hash(key)
+            except TypeError:
+                return None
+            return key
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async def call():
+                if is_async:
+                    return await func(*args, **kwargs)
+                return await run_blocking(func, *args, **kwargs)
+
+            if not TOOL_CACHE_ENABLED:
+                return await call()
+            key = cache_key(*args, **kwargs)
+            if key is None:
+                logger.warning(f"Tool cache: unhashable arguments for {name}, not caching")
+                return await call()
+
+            result, outcome = await (cache or TOOL_CACHE).load(key, ttl_s, call, cache_if)
+            TOOL_CACHE_REQUESTS.inc(1, name, outcome)
+            CACHE_OUTCOME.set(outcome)
+            # Cached results are shared between sessions: hand each caller its own copy
+            return copy.deepcopy(result)
+
+        # Lets callers such as the prefetcher (core/prefetch.py) tell whether a call would be served from memory
+        wrapper.cache_key = cache_key
+        wrapper.tool_cache = cache or TOOL_CACHE
+        return wrapper
+
+    return decorate
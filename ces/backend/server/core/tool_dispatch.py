@@ -0,0 +1,157 @@
+"""
+Concurrent execution of the function calls in one model turn.
+
+The Live API can ask for several tools in one message ("what's the weather in
+Sydney and how is GOOG doing?"), but ADK's live flow runs them one after another,
+so the caller hears silence for the sum of the tool latencies. parallel_tool_dispatch
+is installed as an agent's before_tool_callback: when ADK reaches the first call of
+such an event, it starts every call of the event at once, at most
+TOOL_MAX_CONCURRENCY at a time per session, and returns each result as ADK asks for
+that call. ADK still builds the merged function response event, runs the
+after_tool_callback and applies each call's state changes.
+
+Only plain function tools are dispatched this way; long-running and streaming tools,
+and events with a single call, run through ADK as before.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import TOOL_MAX_CONCURRENCY, TOOL_PARALLEL_ENABLED
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import BaseTool, FunctionTool, ToolContext
+from google.genai import types
+
+from .logger import logger
+from .metrics import TOOL_PARALLEL_CALLS
+
+RECENT_EVENTS = 8  # How far back in the session to look for the event holding a call
+
+# (ADK session id, function call id) -> the batch that is running that call
+_batches: Dict[Tuple[str, str], "_Batch"] = {}
+# ADK session id -> the session's concurrency limit, shared by all of its batches
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _dispatchable(tool: Optional[BaseTool]) -> bool:
+    return (
+        isinstance(tool, FunctionTool)
+        and not tool.is_long_running
+        and not inspect.isasyncgenfunction(tool.func)
+    )
+
+
+def _sibling_calls(ctx: InvocationContext, call_id: str) -> List[types.FunctionCall]:
+    """Returns every function call of the event containing call_id."""
+    for event in reversed(ctx.session.events[-RECENT_EVENTS:]):
+        calls = event.get_function_calls()
+        if any(call.id == call_id for call in calls):
+            return calls
+    return []
+
+
+class _Batch:
+    """The function calls of one event, started together."""
+
+    def __init__(
+        self,
+        ctx: InvocationContext,
+        tools: Dict[str, BaseTool],
+        calls: List[types.FunctionCall],
+        first: ToolContext,
+    ):
+        self.session_id = ctx.session.id
+        self.started = time.monotonic()
+        self.contexts: Dict[str, ToolContext] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.unclaimed = len(calls)
+        semaphore = _semaphores.get(self.session_id)
+        if semaphore is None:
+            semaphore = _semaphores[self.session_id] = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+
+        for call in calls:
+            # The call ADK asked for runs on ADK's own context; the others get one each
+            tool_context = first if call.id == first.function_call_id else ToolContext(ctx, function_call_id=call.id)
+            self.contexts[call.id] = tool_context
+            self.tasks[call.id] = asyncio.create_task(
+                self._run(semaphore, tools[call.name], call.args or {}, tool_context),
+                name=f"tool_{call.name}",
+            )
+            _batches[(self.session_id, call.id)] = self
+        TOOL_PARALLEL_CALLS.inc(len(calls))
+
+    @staticmethod
+    async def _run(semaphore: asyncio.Semaphore, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        async with semaphore:
+            return await tool.run_async(args=args, tool_context=tool_context)
+
+    async def result(self, tool_context: ToolContext) -> Any:
+        """Waits for one call's result and hands its side effects to ADK's context for it."""
+        call_id = tool_context.function_call_id
+        _batches.pop((self.session_id, call_id), None)
+        try:
+            result = await self.tasks[call_id]
+        except asyncio.CancelledError:
+            self.cancel()  # The turn was abandoned (barge-in, disconnect): stop the rest too
+            raise
+        except Exception:
+            # ADK reports the exception; the calls it will not reach must not keep running
+            self.cancel()
+            raise
+
+        ours = self.contexts[call_id]
+        if ours is not tool_context:
+            actions, theirs = tool_context.actions, ours.actions
+            actions.state_delta.update(theirs.state_delta)
+            actions.artifact_delta.update(theirs.artifact_delta)
+            actions.requested_auth_configs.update(theirs.requested_auth_configs)
+            actions.skip_summarization = actions.skip_summarization or theirs.skip_summarization
+            actions.transfer_to_agent = actions.transfer_to_agent or theirs.transfer_to_agent
+            actions.escalate = actions.escalate or theirs.escalate
+        self.unclaimed -= 1
+        if not self.unclaimed:
+            logger.info(f"Ran {len(self.tasks)} tool calls concurrently in {(time.monotonic() - self.started) * 1000:.0f}ms")
+        return result
+
+    def cancel(self) -> None:
+        for call_id, task in self.tasks.items():
+            task.cancel()
+            _batches.pop((self.session_id, call_id), None)
+
+
+async def parallel_tool_dispatch(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict[str, Any]]:
+    """
+    before_tool_callback running the function calls of one event concurrently.
+
+    Returns None to let ADK run the call itself (a lone or non-dispatchable call),
+    otherwise the call's result, which ADK then uses as the tool's response.
+    """
+    if not TOOL_PARALLEL_ENABLED:
+        return None
+    ctx = tool_context._invocation_context
+    call_id = tool_context.function_call_id
+    batch = _batches.get((ctx.session.id, call_id))
+    if batch is None:
+        calls = _sibling_calls(ctx, call_id)
+        if len(calls) < 2 or not _dispatchable(tool):
+            return None
+        tools = {t.name: t for t in await ctx.agent.canonical_tools(ReadonlyContext(ctx))}
+        calls = [call for call in calls if _dispatchable(tools.get(call.name))]
+        if len(calls) < 2 or all(call.id != call_id for call in calls):
+            return None
+        batch = _Batch(ctx, tools, calls, tool_context)
+
+    result = await batch.result(tool_context)
+    # A falsy response would make ADK run the tool again; wrap it as ADK does non-dict results
+    return result if result else {"result": result}
+
+
+def release_session(session_id: str) -> None:
+    """Cancels any calls still running for a closed session and drops its limit."""
+    for key, batch in list(_batches.items()):
+        if key[0] == session_id:
+            batch.cancel()
+    _semaphores.pop(session_id, None)
@@ -0,0 +1,32 @@
+"""
+Bounded thread pool for tools that have to call blocking libraries.
+
+A blocking call made on the event loop (yfinance, for instance) stalls every session
+in the process for the whole network fetch. run_blocking() runs it on a dedicated
+pool of TOOL_EXECUTOR_WORKERS threads instead. The pool is separate from the loop's
+default executor, so a burst of slow tool calls queues behind its own workers
+rather than starving asyncio.to_thread users such as DNS resolution and ID token
+fetches.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from config.config import TOOL_EXECUTOR_WORKERS
+
+from .metrics import REGISTRY
+
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="tool")
+REGISTRY.gauge(
+    "ces_tool_executor_queued",
+    "Blocking tool calls waiting for a tool executor thread.",
+    lambda: TOOL_EXECUTOR._work_queue.qsize(),
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Runs a blocking function on the tool executor and returns its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(TOOL_EXECUTOR, functools.partial(func, *args, **kwargs))
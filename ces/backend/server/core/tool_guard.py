@@ -0,0 +1,250 @@
+"""
+Latency budgets, hedged requests and circuit breakers for tools calling remote services.
+
+A hung endpoint used to leave the voice agent silent until an HTTP timeout of up
+to 30s fired. Decorating a tool with @guarded_tool(...) gives it:
+
+- a latency budget: past budget_s the call is abandoned and the tool returns a
+  structured error at once, so the model can tell the user and move on;
+- hedging (idempotent tools only): once a call has run longer than the tool's
+  recent p95 latency, a second identical call is started and the first successful
+  result wins, trimming tail latency from a slow replica or a lost packet;
+- a circuit breaker per endpoint: after TOOL_BREAKER_FAILURES consecutive
+  failures (timeouts, exceptions or endpoint-failure results) the endpoint is
+  skipped for TOOL_BREAKER_COOLDOWN_S, returning an error immediately, then a
+  single probe call decides whether it closes again.
+
+Error results only count against the endpoint when they report a transport or
+upstream-status failure, tagged "error_type": "upstream" by the tool (or as the
+tool's failure_if predicate decides): an unknown ticker or city says nothing
+about the service's health and must not shut it off for every other caller.
+
+Errors returned by the guard have the shape
+{"status": "error", "error_type": "timeout" | "circuit_open" | "exception", "error": ...}
+plus any tool-specific fields (error_fields) that keep the tool's usual contract.
+Counts are exported as ces_tool_guard_events_total and ces_tool_circuits_opened_total. Apply it beneath @cached_tool,
+so cache hits skip the guard and coalesced callers share one guarded call.
+"""
+
+import asyncio
+import functools
+import inspect
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from config.config import (
+    TOOL_BREAKER_COOLDOWN_S,
+    TOOL_BREAKER_FAILURES,
+    TOOL_GUARD_ENABLED,
+    TOOL_HEDGE_MIN_SAMPLES,
+)
+
+from .logger import logger
+from .metrics import TOOL_CIRCUITS_OPENED, TOOL_GUARD_EVENTS
+from .tool_cache import is_success
+from .tool_executor import run_blocking
+
+LATENCY_WINDOW = 100  # Recent successful call durations kept per tool for the hedge delay
+UPSTREAM_ERROR = "upstream"  # error_type of tool results reporting a failing endpoint
+
+
+def is_endpoint_failure(result: Any) -> bool:
+    """Whether a tool result reports a transport or upstream-status failure."""
+    return isinstance(result, dict) and result.get("error_type") == UPSTREAM_ERROR
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one endpoint.
+
+    Attributes:
+        name (str): Endpoint name, used in logs and errors.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown_s (float): How long the circuit stays open before a probe is allowed.
+        state (str): "closed", "open" or "half_open".
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead; in half-open state only one probe at a time.
+
+        A call allowed while the state is "half_open" is that probe, and must pass
+        probe=True when recording its outcome.
+        """
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_s:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def retry_after_s(self) -> float:
+        return max(0.0, self.cooldown_s - (time.monotonic() - self.opened_at))
+
+    def record(self, success: Optional[bool], probe: bool = False) -> None:
+        """Records a call outcome; None means no verdict, e.g. a call cancelled by its caller."""
+        if probe:
+            self._probing = False
+        if success is None:
+            return
+        if success:
+            if self.state != "closed":
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                TOOL_CIRCUITS_OPENED.inc(1, self.name)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    breaker = BREAKERS.get(endpoint)
+    if breaker is None:
+        breaker = BREAKERS[endpoint] = CircuitBreaker(endpoint, TOOL_BREAKER_FAILURES, TOOL_BREAKER_COOLDOWN_S)
+    return breaker
+
+
+def _p95(samples: Deque[float]) -> Optional[float]:
+    if len(samples) < TOOL_HEDGE_MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+
+async def _first_success(call: Callable[[], Any], hedge_after_s: Optional[float], on_hedge: Callable[[], None]) -> Any:
+    """Runs call(), starting one hedged duplicate if it outlives hedge_after_s."""
+    tasks = [asyncio.create_task(call())]
+    try:
+        if hedge_after_s is None:
+            return await tasks[0]
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after_s)
+        if not done:
+            on_hedge()
+            tasks.append(asyncio.create_task(call()))
+        pending = set(tasks)
+        fallback: Optional[asyncio.Task] = None  # Finished call to settle for if none succeeds
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Every finished call is checked for a good result before settling for a bad one
+            for task in done:
+                if task.exception() is None and is_success(task.result()):
+                    return task.result()
+                if fallback is None or (fallback.exception() is not None and task.exception() is None):
+                    fallback = task  # A returned error result is preferred over a raised exception
+            if not pending:
+                if fallback.exception() is not None:
+                    raise fallback.exception()
+                return fallback.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def guarded_tool(
+    budget_s: float,
+    endpoint: Optional[str] = None,
+    hedge: bool = False,
+    error_fields: Optional[Dict[str, Any]] = None,
+    failure_if: Callable[[Any], bool] = is_endpoint_failure,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorates a tool calling a remote service with a latency budget, optional hedging
+    and a circuit breaker.
+
+    Args:
+        budget_s: Longest the tool may take before a timeout error is returned.
+        endpoint: Circuit breaker name; tools calling the same service share one
+            (default: the tool name).
+        hedge: Whether duplicate calls are safe, enabling the hedged second request.
+        error_fields: Extra fields in guard errors, e.g. {"search_results": []}.
+        failure_if: Whether a returned result counts as an endpoint failure for the
+            circuit breaker (default: is_endpoint_failure). Other error results
+            neither trip nor reset it.
+    """
+
+    def decorate(func: Callable) -> Callable:
+        name = func.__name__
+        service = endpoint or name
+        is_async = inspect.iscoroutinefunction(func)
+        latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+        def error(error_type: str, message: str) -> Dict[str, Any]:
+            return {"status": "error", "error_type": error_type, "error": message, **(error_fields or {})}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async def call():
+                if is_async:
+                    return await func(*args, **kwargs)
+                return await run_blocking(func, *args, **kwargs)
+
+            if not TOOL_GUARD_ENABLED:
+                return await call()
+
+            breaker = breaker_for(service)
+            if not breaker.allow():
+                TOOL_GUARD_EVENTS.inc(1, name, "rejected")
+                return error(
+                    "circuit_open",
+                    f"The {service} service is failing right now; not calling it for another "
+                    f"{breaker.retry_after_s():.0f}s.",
+                )
+            probe = breaker.state == "half_open"
+
+            hedge_after_s = _p95(latencies) if hedge else None
+            if hedge_after_s is not None and hedge_after_s >= budget_s:
+                hedge_after_s = None
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    _first_success(call, hedge_after_s, lambda: TOOL_GUARD_EVENTS.inc(1, name, "hedged")),
+                    budget_s,
+                )
+            except asyncio.TimeoutError:
+                breaker.record(False, probe)
+                TOOL_GUARD_EVENTS.inc(1, name, "timeout")
+                logger.warning(f"Tool {name} exceeded its {budget_s:g}s budget")
+                return error("timeout", f"The {service} service did not respond within {budget_s:g}s.")
+            except asyncio.CancelledError:
+                breaker.record(None, probe)  # The caller went away (e.g. barge-in): no verdict on the endpoint
+                raise
+            except Exception as e:
+                breaker.record(False, probe)
+                TOOL_GUARD_EVENTS.inc(1, name, "exception")
+                logger.exception(f"Tool {name} raised: {e}")
+                return error("exception", f"The {service} service call failed: {e}")
+
+            if failure_if(result):
+                breaker.record(False, probe)
+            elif is_success(result):
+                breaker.record(True, probe)
+                latencies.append(time.monotonic() - started)
+            else:
+                breaker.record(None, probe)  # A caller error (e.g. an unknown ticker): no verdict on the endpoint
+            return result
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,129 @@
+"""
+Instrumentation for every tool handed to an agent.
+
+The agent factories pass their tool lists through TOOL_REGISTRY.instrument(), which
+wraps each plain function (sync or async) so every run records, per tool:
+
+- execution time, as ces_tool_duration_seconds, split by tool cache result so
+  cache hits do not hide upstream latency;
+- outcome, as ces_tool_executions_total: "ok", "error" (an error-shaped result, see
+  tool_cache.is_success) or "exception";
+- the JSON size of its arguments and result, as ces_tool_payload_bytes. A
+  @budgeted_tool result is not encoded again: its size comes from RESULT_SIZE.
+
+Speculative calls made by the prefetcher go through unwrap() and are not recorded
+here (see ces_tool_prefetches_total). Wrappers are made once per function and
+reused by every agent built afterwards.
+functools.wraps keeps the name, docstring, signature and the attributes of inner
+decorators (cached_tool's cache_key) that ADK and the prefetcher rely on. Tools that
+are already BaseTool instances, and streaming (async generator) tools, are passed
+through unchanged.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import TOOL_DURATION, TOOL_EXECUTIONS, TOOL_PAYLOAD_SIZE
+from .result_budget import RESULT_SIZE, json_size
+from .tool_cache import CACHE_OUTCOME, is_success
+
+_UNMEASURED_PARAMS = {"tool_context"}
+
+
+def _json_size(value: Any) -> Optional[int]:
+    try:
+        return json_size(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _record(name: str, started: float, kwargs: Dict[str, Any], result: Any, outcome: str) -> None:
+    cache = CACHE_OUTCOME.get() or "uncached"
+    TOOL_DURATION.observe((time.perf_counter() - started) * 1000, name, cache)
+    TOOL_EXECUTIONS.inc(1, name, outcome, cache)
+    args_size = _json_size({k: v for k, v in kwargs.items() if k not in _UNMEASURED_PARAMS})
+    if args_size is not None:
+        TOOL_PAYLOAD_SIZE.observe(args_size, name, "args")
+    if outcome != "exception":
+        result_size = RESULT_SIZE.get()
+        if result_size is None:
+            result_size = _json_size(result)
+        if result_size is not None:
+            TOOL_PAYLOAD_SIZE.observe(result_size, name, "result")
+
+
+def _outcome(result: Any) -> str:
+    return "ok" if is_success(result) else "error"
+
+
+class ToolRegistry:
+    """
+    Wraps agent tools with instrumentation, once per function.
+
+    Attributes:
+        tools (Dict[str, Callable]): Instrumented tools by name.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, Callable] = {}
+        self._wrapped: Dict[Callable, Callable] = {}
+        self._originals: Dict[Callable, Callable] = {}
+
+    def instrument(self, tools: List[Any]) -> List[Any]:
+        """Returns the tool list with every plain function replaced by its instrumented wrapper."""
+        return [self.wrap(tool) if inspect.isfunction(tool) else tool for tool in tools]
+
+    def unwrap(self, func: Callable) -> Callable:
+        """Returns the function an instrumented wrapper runs, or func itself if it is not one."""
+        return self._originals.get(func, func)
+
+    def wrap(self, func: Callable) -> Callable:
+        wrapper = self._wrapped.get(func)
+        if wrapper is not None:
+            return wrapper
+        if inspect.isasyncgenfunction(func):
+            return func
+
+        name = func.__name__
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                CACHE_OUTCOME.set(None)
+                RESULT_SIZE.set(None)
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    _record(name, started, kwargs, None, "exception")
+                    raise
+                _record(name, started, kwargs, result, _outcome(result))
+                return result
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                CACHE_OUTCOME.set(None)
+                RESULT_SIZE.set(None)
+                started = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception:
+                    _record(name, started, kwargs, None, "exception")
+                    raise
+                _record(name, started, kwargs, result, _outcome(result))
+                return result
+
+        self._wrapped[func] = wrapper
+        self._originals[wrapper] = func
+        self.tools[name] = wrapper
+        return wrapper
+
+
+TOOL_REGISTRY = ToolRegistry()
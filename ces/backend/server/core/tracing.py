@@ -0,0 +1,318 @@
+"""
+Per-turn conversational latency tracing.
+
+A TurnTracer records monotonic timestamps for the milestones of each model turn
+(end of the user's speech, first model event, tool calls and results, first audio
+chunk in, first audio frame out, turn_complete). When the turn ends, the latencies
+relative to the end of speech are added to per-session and per-process histograms,
+and the turn is exported as an OpenTelemetry-compatible span (OTLP/JSON layout).
+
+Clients stream microphone PCM continuously, silence included, so the end of speech
+is the arrival of the last inbound chunk whose peak reaches TRACE_SPEECH_THRESHOLD,
+the same energy test the fake backend uses to detect end of turn. The peak is taken
+over every SPEECH_SCAN_STRIDE-th sample: speech stays loud for many consecutive
+samples, and scanning all of them cost more than parsing the rest of the message.
+"""
+
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from config.config import TRACE_EXPORT, TRACE_EXPORT_FILE, TRACE_SPEECH_THRESHOLD
+
+from .logger import logger
+from .metrics import TURN_LATENCY, Histogram
+
+# One sample in 16 (1 ms at 16 kHz) is enough to catch speech-level peaks
+SPEECH_SCAN_STRIDE = 16
+
+# Latencies (ms from the end of the user's speech) recorded for every turn.
+TURN_LATENCIES = (
+    "first_model_event",
+    "first_audio_in",
+    "first_audio_out",
+    "turn_complete",
+)
+
+# Process-wide histograms, aggregated across all sessions (exported on /metrics).
+PROCESS_HISTOGRAMS: Dict[str, Histogram] = {
+    name: TURN_LATENCY.labels(name) for name in TURN_LATENCIES
+}
+
+_SERVICE_NAME = "ces-live-agent-server"
+_SCOPE_NAME = "core.tracing"
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Encodes one attribute as an OTLP/JSON KeyValue."""
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+# --- Exporters ---
+
+
+class SpanExporter:
+    """Receives finished spans. The default implementation drops them."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class LoggingSpanExporter(SpanExporter):
+    """Logs each span as one JSON line at DEBUG level."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        if logger.isEnabledFor(10):  # logging.DEBUG
+            for span in spans:
+                logger.debug("TRACE %s", json.dumps(span))
+
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Appends OTLP/JSON `ExportTraceServiceRequest` documents, one per line, from a
+    background thread so file I/O never runs on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.SimpleQueue[Optional[List[Dict[str, Any]]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self._queue.put(spans)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        resource = {"attributes": [_attribute("service.name", _SERVICE_NAME)]}
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                spans = self._queue.get()
+                if spans is None:
+                    return
+                document = {
+                    "resourceSpans": [
+                        {
+                            "resource": resource,
+                            "scopeSpans": [
+                                {"scope": {"name": _SCOPE_NAME}, "spans": spans}
+                            ],
+                        }
+                    ]
+                }
+                f.write(json.dumps(document) + "\n")
+                f.flush()
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def get_exporter() -> SpanExporter:
+    """Returns the process-wide exporter selected by TRACE_EXPORT."""
+    global _exporter
+    if _exporter is None:
+        if TRACE_EXPORT == "jsonl":
+            path = TRACE_EXPORT_FILE.replace("{pid}", str(os.getpid()))
+            _exporter = JsonlSpanExporter(path)
+            logger.info(f"Exporting turn spans to {path}")
+        elif TRACE_EXPORT == "log":
+            _exporter = LoggingSpanExporter()
+        else:
+            _exporter = SpanExporter()
+    return _exporter
+
+
+# --- Tracer ---
+
+
+class TurnTracer:
+    """
+    Records the milestones of each turn of one session.
+
+    Calls are cheap enough for the audio hot path: inbound_audio() is one C-level
+    peak scan of the chunk, and mark() is a dict lookup plus a store the first time
+    per turn. A turn is opened by begin_turn() at the first model event; marks
+    outside a turn (e.g. a buffer flushed after turn_complete) are ignored.
+
+    Attributes:
+        session_id (str): The session being traced.
+        trace_id (str): OTLP trace id shared by all turns of the session.
+        histograms (Dict[str, Histogram]): Per-session latency histograms (ms).
+        turns (int): Number of turns finished so far.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.trace_id = secrets.token_hex(16)
+        self.histograms: Dict[str, Histogram] = {
+            name: Histogram() for name in TURN_LATENCIES + ("tool",)
+        }
+        self.turns = 0
+        # Offset converting monotonic ns to Unix epoch ns for exported spans.
+        self._epoch_offset_ns = time.time_ns() - time.monotonic_ns()
+        self._last_speech_ns: Optional[int] = None
+        self._marks: Dict[str, int] = {}
+        self._tools: List[Dict[str, Any]] = []
+        self._open_tools: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def in_turn(self) -> bool:
+        return bool(self._marks)
+
+    def inbound_audio(self, pcm: bytes) -> None:
+        """Records the arrival of a client audio chunk, as speech if its strided peak is loud enough."""
+        samples = array("h")
+        samples.frombytes(pcm[: len(pcm) - len(pcm) % 2])
+        samples = samples[::SPEECH_SCAN_STRIDE]
+        if samples and max(max(samples), -min(samples)) >= TRACE_SPEECH_THRESHOLD:
+            self._last_speech_ns = time.monotonic_ns()
+
+    def begin_turn(self) -> None:
+        """Opens a turn at the first model event, unless one is already open."""
+        if not self._marks:
+            self._start_turn()
+            self._marks["first_model_event"] = time.monotonic_ns()
+
+    def mark(self, milestone: str) -> None:
+        """Records the first occurrence of a milestone in the current turn; a no-op between turns."""
+        if self._marks and milestone not in self._marks:
+            self._marks[milestone] = time.monotonic_ns()
+
+    def tool_call(self, name: str, call_id: Optional[str] = None) -> None:
+        """Opens a tool span, keyed by the function call id so concurrent calls of one tool stay apart."""
+        self.mark("tool_call")
+        self._open_tools[call_id or name] = {"name": name, "start": time.monotonic_ns()}
+
+    def tool_result(self, name: str, call_id: Optional[str] = None) -> Optional[float]:
+        """Closes the call's tool span and returns its duration in ms, if it was open."""
+        self.mark("tool_result")
+        tool = self._open_tools.pop(call_id or name, None)
+        if tool:
+            tool["end"] = time.monotonic_ns()
+            self._tools.append(tool)
+            duration_ms = (tool["end"] - tool["start"]) / 1e6
+            self.histograms["tool"].observe(duration_ms)
+            return duration_ms
+        return None
+
+    def end_turn(self, status: str = "ok") -> Optional[Dict[str, float]]:
+        """
+        Closes the current turn, records its latencies and exports its spans.
+
+        Returns:
+            The turn's latencies in ms from the end of speech, or None if no turn
+            was in progress.
+        """
+        if not self._marks:
+            return None
+        self._marks.setdefault("turn_complete", time.monotonic_ns())
+        anchor = self._marks["turn_start"]
+
+        latencies = {}
+        for name in TURN_LATENCIES:
+            if name in self._marks:
+                latency_ms = (self._marks[name] - anchor) / 1e6
+                latencies[name] = latency_ms
+                self.histograms[name].observe(latency_ms)
+                PROCESS_HISTOGRAMS[name].observe(latency_ms)
+
+        get_exporter().export(self._build_spans(status))
+        self.turns += 1
+        self._marks = {}
+        self._tools = []
+        self._open_tools = {}
+        return latencies
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-session histogram snapshots."""
+        return {
+            "turns": self.turns,
+            **{name: h.snapshot() for name, h in self.histograms.items()},
+        }
+
+    # --- Internals ---
+
+    def _start_turn(self) -> None:
+        # The turn is anchored at the end of the user's speech; without any since the
+        # last turn (a text message, proactive model output) it starts at its first
+        # model event. Each utterance anchors one turn only.
+        now = time.monotonic_ns()
+        anchor, self._last_speech_ns = self._last_speech_ns, None
+        self._marks["turn_start"] = anchor if anchor is not None else now
+        if anchor is not None:
+            self._marks["end_of_speech"] = anchor
+
+    def _epoch_ns(self, monotonic_ns: int) -> str:
+        return str(monotonic_ns + self._epoch_offset_ns)
+
+    def _build_spans(self, status: str) -> List[Dict[str, Any]]:
+        turn_span_id = secrets.token_hex(8)
+        start = self._marks["turn_start"]
+        end = self._marks["turn_complete"]
+        events = [
+            {"timeUnixNano": self._epoch_ns(ts), "name": name}
+            for name, ts in sorted(self._marks.items(), key=lambda item: item[1])
+            if name != "turn_start"
+        ]
+        spans = [
+            {
+                "traceId": self.trace_id,
+                "spanId": turn_span_id,
+                "name": "conversation.turn",
+                "kind": 2,  # SPAN_KIND_SERVER
+                "startTimeUnixNano": self._epoch_ns(start),
+                "endTimeUnixNano": self._epoch_ns(end),
+                "attributes": [
+                    _attribute("session.id", self.session_id),
+                    _attribute("turn.index", self.turns),
+                    _attribute("turn.status", status),
+                ]
+                + [
+                    _attribute(f"latency.{name}_ms", round((self._marks[name] - start) / 1e6, 1))
+                    for name in TURN_LATENCIES
+                    if name in self._marks
+                ],
+                "events": events,
+                "status": {"code": 1 if status == "ok" else 0},
+            }
+        ]
+        for tool in self._tools:
+            spans.append(
+                {
+                    "traceId": self.trace_id,
+                    "spanId": secrets.token_hex(8),
+                    "parentSpanId": turn_span_id,
+                    "name": f"tool {tool['name']}",
+                    "kind": 3,  # SPAN_KIND_CLIENT
+                    "startTimeUnixNano": self._epoch_ns(tool["start"]),
+                    "endTimeUnixNano": self._epoch_ns(tool["end"]),
+                    "attributes": [_attribute("tool.name", tool["name"])],
+                }
+            )
+        return spans
+
+
+def process_summary() -> Dict[str, Any]:
+    """Process-wide histogram snapshots."""
+    return {name: h.snapshot() for name, h in PROCESS_HISTOGRAMS.items()}
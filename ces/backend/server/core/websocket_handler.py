@@ -7,14 +7,25 @@ Handles communication between the client/frontend and the live Agent.
 import asyncio
 import base64
 import json
-from typing import Any, Dict, Optional
+import logging
+import secrets
+from typing import Any, Dict, Mapping, Optional
 
 from aiohttp import WSCloseCode, WSMsgType, web
 from config.config import (
+    DRAIN_RECONNECT_AFTER_MS,
     MODEL,
     MODEL_LANGUAGE,
     PROMPT_LANGUAGE,
+    RECORD_DIR,
+    RECORD_SESSIONS,
     RUN_CONFIG,
+    SESSION_POOL_ENABLED,
+    SESSION_POOL_MAX_AGE_S,
+    SESSION_POOL_MAX_SIZE,
+    SESSION_POOL_MIN_SIZE,
+    SESSION_POOL_WINDOW_S,
+    SESSION_RESUME_GRACE_S,
     TTS_CLIENT,
     TTS_CONFIG,
     USE_TTS,
@@ -29,7 +40,29 @@ from websockets.exceptions import (
 )
 
 from .logger import logger
+from .metrics import (
+    AUDIO_FLUSH_SIZE,
+    HANDSHAKE_LATENCY,
+    INTERRUPTS,
+    REGISTRY,
+    TOOL_CALLS,
+    TTS_LATENCY,
+    WS_INBOUND_BYTES,
+    WS_INBOUND_MESSAGES,
+    WS_OUTBOUND_BYTES,
+    WS_OUTBOUND_MESSAGES,
+)
+from .recorder import CLIENT_BINARY, SessionRecorder
+from .session_directory import (
+    publish_resume_token,
+    publish_session,
+    withdraw_resume_token,
+    withdraw_session,
+)
+from .session_pool import SessionPool
 from .session_state import SessionState
+from .session_usage import INPUT_BYTES_PER_SECOND, OUTPUT_BYTES_PER_SECOND
+from .tracing import TurnTracer
 
 # --- Server-Side Buffer Configuration ---
 TARGET_SAMPLE_RATE = 24000  # Matches client and API
@@ -43,16 +76,68 @@ SERVER_BUFFER_MAX_SIZE_BYTES = int(
 )
 # --- End Configuration ---
 
+# Log categories for per-chunk records, sampled by LOG_SAMPLE_RATES
+AUDIO_LOG = {"category": "audio"}
+VIDEO_LOG = {"category": "video"}
+
 
 # Global session storage
 ACTIVE_SESSIONS: Dict[str, SessionState] = {}
 
+# Resume token -> session_id, for clients re-attaching after a dropped connection.
+# Also published to the session directory, so a reconnect reaching another worker
+# is forwarded here
+RESUME_TOKENS: Dict[str, str] = {}
+
+# WebSocket subprotocols: clients offer CLIENT_PROTOCOL, which the server selects,
+# plus RESUME_PROTOCOL_PREFIX + <token> when resuming. Carrying the token in the
+# handshake header rather than the URL keeps it out of access logs.
+CLIENT_PROTOCOL = "ces.v1"
+RESUME_PROTOCOL_PREFIX = "resume."
+
+# Set once the process starts draining: no new sessions, resumes still allowed
+DRAINING = False
+
+# Client messages ending the session (handled in handle_client_messages)
+END_MESSAGE_TYPES = frozenset({"end", "end_session"})
+# Client message types handled in handle_client_messages; anything else is counted as "other"
+INBOUND_MESSAGE_TYPES = frozenset({"audio", "image", "text", "state"}) | END_MESSAGE_TYPES
+
+# Key under which the attached SessionState is stored on its websocket, so the send
+# helpers can account for and record traffic without threading the session through
+SESSION_KEY = "session"
+
+
+# --- Session Management ---
+def new_session_id() -> str:
+    """Generates a cryptographically random, collision-free session ID."""
+    return secrets.token_urlsafe(16)
+
+
+def requested_resume_token(request: web.Request) -> Optional[str]:
+    """Returns the resume token a client offered as a subprotocol, if any."""
+    for protocol in request.headers.get("Sec-WebSocket-Protocol", "").split(","):
+        protocol = protocol.strip()
+        if protocol.startswith(RESUME_PROTOCOL_PREFIX):
+            return protocol[len(RESUME_PROTOCOL_PREFIX):] or None
+    return None
+
+
+def issue_resume_token(session: SessionState) -> str:
+    """Issues a fresh resume token for the session, revoking any previous one."""
+    if session.resume_token:
+        RESUME_TOKENS.pop(session.resume_token, None)
+        withdraw_resume_token(session.resume_token)
+    session.resume_token = secrets.token_urlsafe(32)
+    RESUME_TOKENS[session.resume_token] = session.user_id
+    publish_resume_token(session.resume_token)
+    return session.resume_token
+
 
-# --- Session Management (Unchanged) ---
 async def create_session(
-    session_id: str, agent: Agent, app_name: str, context: Dict[str, Any]
+    session_id: str, agent: Agent, app_name: str, context: Mapping[str, Any]
 ) -> SessionState:
-    """Creates and stores a new session."""
+    """Creates a new session and starts its live runner (not yet registered)."""
     logger.info(f"Creating session {session_id} for app {app_name}")
     session = await SessionState.create(
         agent=agent, app_name=app_name, user_id=session_id, context=context
@@ -65,11 +150,58 @@ async def create_session(
         run_config=RUN_CONFIG,
     )
     logger.info(f"Agent live runner started for session {session_id}")
-
-    ACTIVE_SESSIONS[session_id] = session
     return session
 
 
+async def build_session() -> Optional[SessionState]:
+    """
+    Builds a ready-to-attach session: agent config, session service session and runner.
+    Used both by the session pool and inline when the pool is empty.
+    """
+    session_id = new_session_id()
+    agent_config = get_agent_config(session_id)  # Pass session_id for context
+    app_name = agent_config.get("app_name", "default_app")
+    root_agent = agent_config.get("root_agent")
+    context = agent_config.get("context") or {}  # Per-session SessionContext
+
+    if not root_agent:
+        logger.error(
+            f"[Session: {session_id}] Agent configuration failed: No root agent found."
+        )
+        return None
+
+    return await create_session(session_id, root_agent, app_name, context=context)
+
+
+def register_session(session: SessionState) -> None:
+    """Stores a session that now has a client attached."""
+    ACTIVE_SESSIONS[session.user_id] = session
+    publish_session(session.user_id)  # Lets other workers route callbacks here
+
+
+SESSION_POOL = SessionPool(
+    build_session,
+    enabled=SESSION_POOL_ENABLED,
+    min_size=SESSION_POOL_MIN_SIZE,
+    max_size=SESSION_POOL_MAX_SIZE,
+    window_s=SESSION_POOL_WINDOW_S,
+    max_age_s=SESSION_POOL_MAX_AGE_S,
+)
+
+# --- Session gauges (read at scrape time) ---
+REGISTRY.gauge(
+    "ces_active_sessions", "Sessions registered on this process.", lambda: len(ACTIVE_SESSIONS)
+)
+REGISTRY.gauge(
+    "ces_attached_sessions",
+    "Sessions with a connected client.",
+    lambda: sum(1 for s in ACTIVE_SESSIONS.values() if s.websocket is not None),
+)
+REGISTRY.gauge(
+    "ces_pooled_sessions_idle", "Pre-warmed sessions waiting for a client.", lambda: SESSION_POOL.idle_count
+)
+
+
 def get_session(session_id: str) -> Optional[SessionState]:
     """Retrieves an existing session."""
     return ACTIVE_SESSIONS.get(session_id)
@@ -79,11 +211,199 @@ def remove_session(session_id: str) -> None:
     """Removes a session."""
     if session_id in ACTIVE_SESSIONS:
         logger.info(f"Removing session {session_id}")
-        del ACTIVE_SESSIONS[session_id]
+        session = ACTIVE_SESSIONS.pop(session_id)
+        if session.resume_token:
+            RESUME_TOKENS.pop(session.resume_token, None)
+            withdraw_resume_token(session.resume_token)
+        withdraw_session(session_id)
     else:
         logger.warning(f"Attempted to remove non-existent session {session_id}")
 
 
+# --- Session Resumption ---
+
+
+def is_resumable(session: SessionState) -> bool:
+    """A dropped session is kept for resumption unless it ended or its live stream did."""
+    return (
+        SESSION_RESUME_GRACE_S > 0
+        and not DRAINING
+        and not session.client_ended
+        and not session.events_finished
+    )
+
+
+def detach_session(session: SessionState) -> None:
+    """Keeps a session whose client dropped, and expires it after the grace window."""
+    loop = asyncio.get_running_loop()
+    session.websocket = None
+    if session.recorder:
+        session.recorder.mark("detach")
+    session.detached_at = loop.time()
+    session.detached_event.set()
+    session.expiry_handle = loop.call_later(
+        SESSION_RESUME_GRACE_S,
+        lambda: asyncio.create_task(expire_detached_session(session.user_id)),
+    )
+    logger.info(
+        f"[Session: {session.user_id}] Client detached; resumable for {SESSION_RESUME_GRACE_S}s."
+    )
+
+
+async def expire_detached_session(session_id: str) -> None:
+    """Cleans up a detached session nobody resumed within the grace window."""
+    session = ACTIVE_SESSIONS.get(session_id)
+    if session and session.detached_at is not None:
+        logger.info(f"[Session: {session_id}] Resume grace window expired.")
+        await cleanup_session(session, session_id)
+
+
+async def terminate_session(session_id: str) -> bool:
+    """
+    Ends a session on an operator's request, whether or not a client is attached.
+
+    The client is told why and disconnected, and the session is not kept for resumption.
+
+    Returns:
+        bool: False if no such session exists in this process.
+    """
+    session = ACTIVE_SESSIONS.get(session_id)
+    if not session:
+        return False
+    logger.warning(f"[Session: {session_id}] Terminated by an administrator.")
+    session.client_ended = True  # Never resumable from here on
+    websocket = session.websocket
+    if websocket is not None and not websocket.closed:
+        await send_error_message(
+            websocket,
+            {
+                "message": "This session was ended by an administrator.",
+                "action": "Please start a new session.",
+                "error_type": "session_terminated",
+            },
+        )
+        # handle_client's teardown then cleans the session up
+        await websocket.close(
+            code=WSCloseCode.POLICY_VIOLATION, message=b"Session terminated"
+        )
+    else:
+        await cleanup_session(session, session_id)
+    return True
+
+
+async def take_resumable_session(resume_token: str) -> Optional[SessionState]:
+    """
+    Returns the session for a resume token, ready to re-attach, or None.
+
+    If the session still has a client attached (the server has not noticed the old
+    connection dropping yet), that connection is closed and the session taken over.
+    """
+    session_id = RESUME_TOKENS.get(resume_token)
+    session = ACTIVE_SESSIONS.get(session_id) if session_id else None
+    if not session or not is_resumable(session):
+        return None
+
+    if session.detached_at is None and session.websocket is not None:
+        logger.info(f"[Session: {session_id}] Taking over from a stale connection.")
+        session.detached_event.clear()
+        if not session.websocket.closed:
+            await session.websocket.close(
+                code=WSCloseCode.GOING_AWAY, message=b"Session resumed elsewhere"
+            )
+        try:
+            await asyncio.wait_for(session.detached_event.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Session: {session_id}] Stale connection did not detach.")
+            return None
+
+    if session.detached_at is None:
+        return None  # Expired or taken by another reconnect meanwhile
+
+    if session.expiry_handle:
+        session.expiry_handle.cancel()
+        session.expiry_handle = None
+    session.detached_at = None
+    session.detached_event.clear()
+    return session
+
+
+# --- Graceful Drain ---
+
+
+async def send_reconnect_hint(websocket: web.WebSocketResponse) -> None:
+    """
+    Tells the client to reconnect to another instance.
+
+    No resume token is sent: sessions live in this process, which is going away, so
+    the client starts a new session elsewhere.
+    """
+    await send_json_message(
+        websocket,
+        "reconnect",
+        {
+            "reason": "server_draining",
+            "retry_after_ms": DRAIN_RECONNECT_AFTER_MS,
+        },
+    )
+
+
+async def drain_sessions(timeout_s: float) -> Dict[str, Any]:
+    """
+    Drains the process: stops new sessions, flushes outbound audio, hints clients to
+    reconnect, and lets in-flight turns finish until the deadline before closing.
+
+    Returns:
+        A report with the drain time and how many turns completed or were dropped.
+    """
+    global DRAINING
+    DRAINING = True
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await SESSION_POOL.stop()
+
+    attached = [s for s in ACTIVE_SESSIONS.values() if s.websocket is not None]
+    logger.info(
+        f"Draining {len(attached)} attached session(s) (of {len(ACTIVE_SESSIONS)}), deadline {timeout_s}s"
+    )
+    in_flight = [s for s in attached if s.turn_in_progress]
+    turns_before = {s.user_id: s.turns_completed for s in attached}
+
+    for session in attached:
+        if session.flush_outbound_audio:
+            await session.flush_outbound_audio()
+        await send_reconnect_hint(session.websocket)
+
+    if in_flight:
+        waiters = [asyncio.create_task(s.turn_idle.wait()) for s in in_flight]
+        _, pending = await asyncio.wait(waiters, timeout=timeout_s)
+        for waiter in pending:
+            waiter.cancel()
+
+    dropped = 0
+    for session in attached:
+        if session.turn_in_progress:
+            dropped += 1
+        if session.flush_outbound_audio:
+            await session.flush_outbound_audio()
+        websocket = session.websocket
+        if websocket is not None and not websocket.closed:
+            await websocket.close(code=WSCloseCode.GOING_AWAY, message=b"Server draining")
+
+    report = {
+        "drain_s": round(loop.time() - started, 3),
+        "sessions": len(attached),
+        "in_flight_turns": len(in_flight),
+        "completed_turns": sum(
+            1
+            for s in in_flight
+            if s.turns_completed > turns_before[s.user_id] and not s.turn_in_progress
+        ),
+        "dropped_turns": dropped,
+    }
+    logger.info(f"Drain complete: {report}")
+    return report
+
+
 # --- WebSocket Communication Helpers (Adapted for aiohttp) ---
 
 
@@ -97,7 +417,17 @@ async def send_json_message(
     try:
         payload = {"type": message_type, "data": data}
         # logger.debug(f"Sending WebSocket JSON: {payload}") # Can be very verbose
-        await websocket.send_json(payload)
+        # Serialize here rather than via send_json so outbound bytes can be counted
+        message = json.dumps(payload)
+        await websocket.send_str(message)
+        WS_OUTBOUND_MESSAGES.inc(1, message_type)
+        WS_OUTBOUND_BYTES.inc(len(message), message_type)
+        session = websocket.get(SESSION_KEY)
+        if session is not None:
+            session.usage.messages_out += 1
+            session.usage.bytes_out += len(message)
+            if session.recorder is not None:
+                session.recorder.server(message)
     except ConnectionResetError:
         logger.warning(f"Connection reset while sending {message_type} message.")
     except Exception as e:
@@ -116,6 +446,7 @@ async def send_buffered_audio(
     audio_buffer: bytearray,
     last_send_time: float,
     force_send: bool = False,
+    tracer: Optional[TurnTracer] = None,
 ) -> float:
     """
     Sends the content of the audio buffer if conditions are met.
@@ -124,45 +455,58 @@ async def send_buffered_audio(
         audio_buffer: The bytearray buffer holding audio data.
         last_send_time: The timestamp of the last buffer send.
         force_send: If True, sends the buffer regardless of size/timeout (for cleanup).
+        tracer: If given, records the turn's first outbound audio frame.
     Returns:
         The timestamp when the buffer was sent (or the original last_send_time if not sent).
     """
     now = asyncio.get_event_loop().time()
     should_send = False
-    reason = ""
+    flush_reason = ""
 
     if len(audio_buffer) == 0:
         return last_send_time  # Nothing to send
+    session = websocket.get(SESSION_KEY)
+    if session is not None and len(audio_buffer) > session.usage.audio_buffer_peak:
+        session.usage.audio_buffer_peak = len(audio_buffer)
 
     # Check conditions for sending
     if len(audio_buffer) >= SERVER_BUFFER_MAX_SIZE_BYTES:
         should_send = True
-        reason = (
-            f"size threshold ({len(audio_buffer)} >= {SERVER_BUFFER_MAX_SIZE_BYTES})"
-        )
+        flush_reason = "size"
     elif (now - last_send_time) >= SERVER_BUFFER_TIMEOUT_S:
         should_send = True
-        reason = f"timeout ({(now - last_send_time) * 1000:.1f}ms >= {SERVER_BUFFER_TIMEOUT_S * 1000:.1f}ms)"
+        flush_reason = "timeout"
     elif force_send:
         should_send = True
-        reason = "force send"
+        flush_reason = "force"
 
     if should_send:
-        logger.debug(
-            f"Server buffer sending: Reason={reason}, Size={len(audio_buffer)} bytes"
-        )
+        # Runs per audio flush: format lazily and only when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Server buffer sending: Reason=%s, Size=%d bytes, %.1fms since last send",
+                flush_reason,
+                len(audio_buffer),
+                (now - last_send_time) * 1000,
+                extra=AUDIO_LOG,
+            )
         try:
             # Send a copy and clear original buffer immediately
             data_to_send = bytes(audio_buffer)
             audio_buffer.clear()
+            AUDIO_FLUSH_SIZE.observe(len(data_to_send), flush_reason)
+            if session is not None:
+                session.usage.audio_out_s += len(data_to_send) / OUTPUT_BYTES_PER_SECOND
             # Update time *before* await, assuming send attempt will proceed
             last_send_time = now
 
             # --- decode and send the audio
             audio_base64 = base64.b64encode(data_to_send).decode("utf-8")
             await send_json_message(websocket, "audio", audio_base64)
+            if tracer:
+                tracer.mark("first_audio_out")
 
-            logger.debug("Server buffer sent successfully.")
+            logger.debug("Server buffer sent successfully.", extra=AUDIO_LOG)
 
         except Exception as send_err:
             logger.error(
@@ -176,6 +520,13 @@ async def send_buffered_audio(
     return last_send_time  # Return original time if not sent
 
 
+def log_turn_latency(session_id: str, latencies: Optional[Dict[str, float]]) -> None:
+    """Logs one finished turn's latencies (ms from the user's last audio)."""
+    if latencies:
+        summary = ", ".join(f"{name}={ms:.0f}" for name, ms in latencies.items())
+        logger.info(f"[Session: {session_id}] Turn latency (ms): {summary}")
+
+
 # --- Session Cleanup (Adapted for clarity) ---
 
 
@@ -183,12 +534,22 @@ async def cleanup_session(session: Optional[SessionState], session_id: str) -> N
     """Cleans up session resources."""
     logger.info(f"Starting cleanup for session {session_id}")
     if session:
+        if session.expiry_handle:
+            session.expiry_handle.cancel()
+            session.expiry_handle = None
+        session.detached_at = None
+        if session.recorder:
+            session.recorder.close()
+        if session.tracer.turns:
+            logger.info(
+                f"[Session: {session_id}] Turn latency summary (ms): {session.tracer.summary()}"
+            )
         if session.session:
             try:
                 logger.info(
-                    f"Attempting to clean up agent resources for session {session_id} (Placeholder)"
+                    f"Closing live request queue and event stream for session {session_id}"
                 )
-                pass  # Replace with actual cleanup logic
+                await session.close()
             except Exception as e:
                 logger.error(
                     f"Error during agent resource cleanup for session {session_id}: {e}"
@@ -213,6 +574,7 @@ async def handle_agent_responses(
     session_id = session.user_id  # Get session_id for logging
     logger.info(f"[Session: {session_id}] Starting agent response handler task.")
     agent_turn_completed_normally = False
+    tracer = session.tracer
 
     # Buffer setup
     audio_buffer = bytearray()  # Buffer specific to this handler invocation
@@ -235,7 +597,7 @@ async def handle_agent_responses(
             try:
                 # Pass the current buffer and last send time
                 current_last_send = await send_buffered_audio(
-                    websocket, audio_buffer, last_send_time
+                    websocket, audio_buffer, last_send_time, tracer=tracer
                 )
                 last_send_time = current_last_send  # Update last_send_time
             except Exception as check_err:
@@ -244,6 +606,16 @@ async def handle_agent_responses(
 
     # --- End buffer check loop ---
 
+    async def flush_audio():
+        """Sends whatever is buffered now (used when draining the server)."""
+        nonlocal last_send_time
+        if len(audio_buffer) > 0:
+            last_send_time = await send_buffered_audio(
+                websocket, audio_buffer, last_send_time, force_send=True, tracer=tracer
+            )
+
+    session.flush_outbound_audio = flush_audio
+
     try:
         # Start the background task to handle buffer timeouts
         buffer_task = asyncio.create_task(buffer_check_loop())
@@ -252,15 +624,30 @@ async def handle_agent_responses(
         )
 
         full_text = ""
-        async for event in session.events:
+        async for event in session.stream_events():
             if websocket.closed:
                 logger.warning(
                     f"[Session: {session_id}] WebSocket closed during agent response handling. Exiting task."
                 )
                 break
 
+            if logger.isEnabledFor(logging.DEBUG):
+                session.log_event_output(event)
+
+            # --- Turn tracking ---
+            if event.turn_complete:
+                session.mark_turn_finished()
+                tracer.mark("turn_complete")
+                log_turn_latency(session_id, tracer.end_turn())
+            elif event.content and event.author != "user":
+                session.mark_turn_started()
+                tracer.begin_turn()
+
             # --- Interruption ---
             if event.interrupted:
+                session.mark_turn_finished()
+                INTERRUPTS.inc()
+                log_turn_latency(session_id, tracer.end_turn("interrupted"))
                 logger.info(f"[Session: {session_id}] Agent response interrupted.")
                 await send_json_message(
                     websocket,
@@ -278,152 +665,174 @@ async def handle_agent_responses(
 
             # --- Tool Call and Result handling ---
             if event.content and event.content.parts:
-                part = event.content.parts[0]
-                if part.function_call:
-                    # --- Flush buffer before sending non-audio message ---
-                    if len(audio_buffer) > 0:
-                        last_send_time = await send_buffered_audio(
-                            websocket, audio_buffer, last_send_time, force_send=True
+                # A turn's parallel function calls (or text alongside a call) share one event
+                for part in event.content.parts:
+                    if part.function_call:
+                        # --- Flush buffer before sending non-audio message ---
+                        if len(audio_buffer) > 0:
+                            last_send_time = await send_buffered_audio(
+                                websocket, audio_buffer, last_send_time, force_send=True, tracer=tracer
+                            )
+                        # --- End flush ---
+                        tool = part.function_call
+                        logger.info(
+                            f"[Session: {session_id}] Sending tool_call: {tool.name}"
                         )
-                    # --- End flush ---
-                    tool = part.function_call
-                    logger.info(
-                        f"[Session: {session_id}] Sending tool_call: {tool.name}"
-                    )
-                    await send_json_message(
-                        websocket, "tool_call", {"name": tool.name, "args": tool.args}
-                    )
-
-                elif part.function_response:
-                    # --- Flush buffer before sending non-audio message ---
-                    if len(audio_buffer) > 0:
-                        last_send_time = await send_buffered_audio(
-                            websocket, audio_buffer, last_send_time, force_send=True
+                        await send_json_message(
+                            websocket, "tool_call", {"name": tool.name, "args": tool.args}
                         )
-                    # --- End flush ---
-                    tool_result = part.function_response
-                    logger.info(
-                        f"[Session: {session_id}] Sending tool_result for: {tool_result.name}"
-                    )
-                    await send_json_message(
-                        websocket, "tool_result", tool_result.response
-                    )  # Send the actual response content
-
-                elif part.text:
-                    text_chunk = part.text
-                    # --- Text and TTS handling ---
-                    if not event.partial:  # Process complete text chunks
-                        # --- Flush buffer before sending text/starting TTS ---
+                        tracer.tool_call(tool.name, tool.id)
+                        TOOL_CALLS.inc(1, tool.name)
+                        session.usage.tool_calls += 1
+
+                    elif part.function_response:
+                        # --- Flush buffer before sending non-audio message ---
                         if len(audio_buffer) > 0:
                             last_send_time = await send_buffered_audio(
-                                websocket, audio_buffer, last_send_time, force_send=True
+                                websocket, audio_buffer, last_send_time, force_send=True, tracer=tracer
                             )
                         # --- End flush ---
-                        if USE_TTS and TTS_CLIENT:
-                            if text_chunk.strip():
-                                logger.info(
-                                    f"[Session: {session_id}] Synthesizing TTS for chunk: '{text_chunk[:50]}...'"
+                        tool_result = part.function_response
+                        tool_ms = tracer.tool_result(tool_result.name, tool_result.id)
+                        if tool_ms is not None:
+                            session.usage.tool_time_s += tool_ms / 1000
+                        logger.info(
+                            f"[Session: {session_id}] Sending tool_result for: {tool_result.name}"
+                        )
+                        await send_json_message(
+                            websocket, "tool_result", tool_result.response
+                        )  # Send the actual response content
+
+                    elif part.text:
+                        text_chunk = part.text
+                        # --- Text and TTS handling ---
+                        if not event.partial:  # Process complete text chunks
+                            # --- Flush buffer before sending text/starting TTS ---
+                            if len(audio_buffer) > 0:
+                                last_send_time = await send_buffered_audio(
+                                    websocket, audio_buffer, last_send_time, force_send=True, tracer=tracer
                                 )
-                                if not TTS_CONFIG:
-                                    logger.error(
-                                        f"[Session: {session_id}] Cannot synthesize TTS, config unavailable."
-                                    )
-                                    await send_json_message(
-                                        websocket, "text", text_chunk
-                                    )  # Fallback to text
-                                    continue
-
-                                config_request = (
-                                    texttospeech.StreamingSynthesizeRequest(
-                                        streaming_config=TTS_CONFIG
+                            # --- End flush ---
+                            if USE_TTS and TTS_CLIENT:
+                                if text_chunk.strip():
+                                    logger.info(
+                                        f"[Session: {session_id}] Synthesizing TTS for chunk: '{text_chunk[:50]}...'"
                                     )
-                                )
-
-                                def request_generator():
-                                    yield config_request
-                                    # Send text in manageable chunks if necessary, though here we send the whole chunk
-                                    yield texttospeech.StreamingSynthesizeRequest(
-                                        input=texttospeech.StreamingSynthesisInput(
-                                            text=text_chunk
+                                    if not TTS_CONFIG:
+                                        logger.error(
+                                            f"[Session: {session_id}] Cannot synthesize TTS, config unavailable."
                                         )
-                                    )
-
-                                try:
-                                    streaming_responses = (
-                                        TTS_CLIENT.streaming_synthesize(
-                                            request_generator()
+                                        await send_json_message(
+                                            websocket, "text", text_chunk
+                                        )  # Fallback to text
+                                        continue
+
+                                    config_request = (
+                                        texttospeech.StreamingSynthesizeRequest(
+                                            streaming_config=TTS_CONFIG
                                         )
                                     )
-                                    for response in streaming_responses:
-                                        if response.audio_content:
-                                            # --- Append to buffer instead of sending directly ---
-                                            audio_chunk_bytes = response.audio_content
-                                            logger.debug(
-                                                f"Session {session_id}: Received TTS audio chunk: {len(audio_chunk_bytes)} bytes"
-                                            )
-                                            audio_buffer.extend(audio_chunk_bytes)
-                                            # Check immediately if buffer is full enough to send
-                                            last_send_time = await send_buffered_audio(
-                                                websocket, audio_buffer, last_send_time
+
+                                    def request_generator():
+                                        yield config_request
+                                        # Send text in manageable chunks if necessary, though here we send the whole chunk
+                                        yield texttospeech.StreamingSynthesizeRequest(
+                                            input=texttospeech.StreamingSynthesisInput(
+                                                text=text_chunk
                                             )
-                                            # --- End buffer modification ---
+                                        )
 
-                                            # audio_base64 = base64.b64encode(response.audio_content).decode('utf-8')
-                                            # await send_json_message(websocket, "audio", audio_base64)
+                                    try:
+                                        session.usage.tts_chars += len(text_chunk)
+                                        tts_started = asyncio.get_event_loop().time()
+                                        tts_first_audio = True
+                                        streaming_responses = (
+                                            TTS_CLIENT.streaming_synthesize(
+                                                request_generator()
+                                            )
+                                        )
+                                        for response in streaming_responses:
+                                            if response.audio_content:
+                                                if tts_first_audio:
+                                                    tts_first_audio = False
+                                                    TTS_LATENCY.observe(
+                                                        (asyncio.get_event_loop().time() - tts_started) * 1000
+                                                    )
+                                                # --- Append to buffer instead of sending directly ---
+                                                audio_chunk_bytes = response.audio_content
+                                                logger.debug(
+                                                    "Session %s: Received TTS audio chunk: %d bytes",
+                                                    session_id,
+                                                    len(audio_chunk_bytes),
+                                                    extra=AUDIO_LOG,
+                                                )
+                                                audio_buffer.extend(audio_chunk_bytes)
+                                                # Check immediately if buffer is full enough to send
+                                                last_send_time = await send_buffered_audio(
+                                                    websocket, audio_buffer, last_send_time, tracer=tracer
+                                                )
+                                                # --- End buffer modification ---
+
+                                                # audio_base64 = base64.b64encode(response.audio_content).decode('utf-8')
+                                                # await send_json_message(websocket, "audio", audio_base64)
+
+                                    except Exception as tts_error:
+                                        logger.exception(
+                                            f"[Session: {session_id}] Error during TTS streaming: {tts_error}"
+                                        )
+                                        await send_json_message(
+                                            websocket, "text", text_chunk
+                                        )  # Fallback to text on TTS error
+                            else:
+                                # Send complete text if not using TTS or TTS failed
+                                logger.info(
+                                    f"[Session: {session_id}] Sending complete text chunk: '{text_chunk[:50]}...'"
+                                )
+                                await send_json_message(websocket, "text", text_chunk)
 
-                                except Exception as tts_error:
-                                    logger.exception(
-                                        f"[Session: {session_id}] Error during TTS streaming: {tts_error}"
-                                    )
-                                    await send_json_message(
-                                        websocket, "text", text_chunk
-                                    )  # Fallback to text on TTS error
-                        else:
-                            # Send complete text if not using TTS or TTS failed
-                            logger.info(
-                                f"[Session: {session_id}] Sending complete text chunk: '{text_chunk[:50]}...'"
+                    # --- Image handling ---
+                    elif part.inline_data and part.inline_data.mime_type.startswith(
+                        "image"
+                    ):
+                        # --- Flush buffer before sending non-audio message ---
+                        if len(audio_buffer) > 0:
+                            last_send_time = await send_buffered_audio(
+                                websocket, audio_buffer, last_send_time, force_send=True, tracer=tracer
                             )
-                            await send_json_message(websocket, "text", text_chunk)
-
-                # --- Image handling ---
-                elif part.inline_data and part.inline_data.mime_type.startswith(
-                    "image"
-                ):
-                    # --- Flush buffer before sending non-audio message ---
-                    if len(audio_buffer) > 0:
-                        last_send_time = await send_buffered_audio(
-                            websocket, audio_buffer, last_send_time, force_send=True
+                        # --- End flush ---
+                        logger.info(
+                            f"[Session: {session_id}] Sending image data ({part.inline_data.mime_type})"
+                        )
+                        image_base64 = base64.b64encode(part.inline_data.data).decode(
+                            "utf-8"
+                        )
+                        await send_json_message(
+                            websocket,
+                            "image",
+                            f"data:{part.inline_data.mime_type};base64,{image_base64}",
                         )
-                    # --- End flush ---
-                    logger.info(
-                        f"[Session: {session_id}] Sending image data ({part.inline_data.mime_type})"
-                    )
-                    image_base64 = base64.b64encode(part.inline_data.data).decode(
-                        "utf-8"
-                    )
-                    await send_json_message(
-                        websocket,
-                        "image",
-                        f"data:{part.inline_data.mime_type};base64,{image_base64}",
-                    )
 
-                # --- Audio handling with buffering ---
-                # TODO: Replace this once b/403379753 is resolved (if agent sends audio directly)
-                elif part.inline_data and part.inline_data.mime_type.startswith(
-                    "audio/pcm"
-                ):
-                    logger.debug(
-                        f"[Session: {session_id}] Received direct audio data (PCM): {len(part.inline_data.data)} bytes"
-                    )
-                    # --- Append direct audio to buffer ---
-                    audio_chunk_bytes = part.inline_data.data
-                    audio_buffer.extend(audio_chunk_bytes)
-                    # Check immediately if buffer is full enough to send
-                    last_send_time = await send_buffered_audio(
-                        websocket, audio_buffer, last_send_time
-                    )
-                    # --- End buffer modification ---
-                    continue  # Handled direct audio
+                    # --- Audio handling with buffering ---
+                    # TODO: Replace this once b/403379753 is resolved (if agent sends audio directly)
+                    elif part.inline_data and part.inline_data.mime_type.startswith(
+                        "audio/pcm"
+                    ):
+                        logger.debug(
+                            "[Session: %s] Received direct audio data (PCM): %d bytes",
+                            session_id,
+                            len(part.inline_data.data),
+                            extra=AUDIO_LOG,
+                        )
+                        tracer.mark("first_audio_in")
+                        # --- Append direct audio to buffer ---
+                        audio_chunk_bytes = part.inline_data.data
+                        audio_buffer.extend(audio_chunk_bytes)
+                        # Check immediately if buffer is full enough to send
+                        last_send_time = await send_buffered_audio(
+                            websocket, audio_buffer, last_send_time, tracer=tracer
+                        )
+                        # --- End buffer modification ---
+                        continue  # Handled direct audio
 
             # Yield control briefly to allow other tasks to run
             await asyncio.sleep(0)
@@ -467,6 +876,8 @@ async def handle_agent_responses(
         # Do NOT re-raise. Let this task end gracefully.
     finally:
         logger.info(f"[Session: {session_id}] Agent response handler task finished.")
+        if session.flush_outbound_audio is flush_audio:
+            session.flush_outbound_audio = None
         # --- Cleanup Buffer Task and Flush Buffer ---
         if buffer_task and not buffer_task.done():
             logger.debug(f"Session {session_id}: Cancelling buffer check loop task.")
@@ -492,7 +903,7 @@ async def handle_agent_responses(
                 last_send_time if last_send_time else asyncio.get_event_loop().time()
             )
             await send_buffered_audio(
-                websocket, audio_buffer, final_flush_time, force_send=True
+                websocket, audio_buffer, final_flush_time, force_send=True, tracer=tracer
             )
         # --- End Cleanup ---
 
@@ -515,14 +926,26 @@ async def handle_client_messages(
 ) -> None:
     """Handles incoming messages from the client."""
     session_id = session.user_id
+    recorder = session.recorder
+    usage = session.usage
     logger.info(f"[Session: {session_id}] Starting client message handler task.")
     try:
         async for msg in websocket:
             if msg.type == WSMsgType.TEXT:
+                if recorder is not None:
+                    recorder.client(msg.data)
                 try:
                     data = json.loads(msg.data)
                     msg_type = data.get("type")
                     msg_data = data.get("data")  # Renamed to avoid conflict
+                    # Client-chosen, so bounded before it becomes a metric label
+                    type_label = msg_type if isinstance(msg_type, str) and msg_type in INBOUND_MESSAGE_TYPES else "other"
+                    WS_INBOUND_MESSAGES.inc(1, type_label)
+                    # Payload bytes, not characters; isascii() is O(1), so base64 audio skips the encode
+                    size = len(msg.data) if msg.data.isascii() else len(msg.data.encode())
+                    WS_INBOUND_BYTES.inc(size, type_label)
+                    usage.messages_in += 1
+                    usage.bytes_in += size
 
                     if not msg_type:
                         logger.warning(
@@ -533,11 +956,11 @@ async def handle_client_messages(
                     if msg_type == "audio":
                         if msg_data:
                             # logger.debug(f"[Session: {session_id}] Client -> Agent: Sending audio data...")
+                            pcm = base64.b64decode(msg_data)
+                            session.tracer.inbound_audio(pcm)
+                            usage.audio_in_s += len(pcm) / INPUT_BYTES_PER_SECOND
                             session.live_request_queue.send_realtime(
-                                google_types.Blob(
-                                    data=base64.b64decode(msg_data),
-                                    mime_type="audio/pcm",
-                                )
+                                google_types.Blob(data=pcm, mime_type="audio/pcm")
                             )
                         else:
                             logger.warning(
@@ -546,10 +969,13 @@ async def handle_client_messages(
                     elif msg_type == "image":
                         if msg_data:
                             logger.debug(
-                                f"[Session: {session_id}] Client -> Agent: Sending image data..."
+                                "[Session: %s] Client -> Agent: Sending image data...",
+                                session_id,
+                                extra=VIDEO_LOG,
                             )
                             # Assuming base64 encoded image data after comma
                             img_content = base64.b64decode(msg_data)
+                            usage.image_frames += 1
                             session.live_request_queue.send_realtime(
                                 google_types.Blob(
                                     data=img_content, mime_type="image/jpeg"
@@ -606,10 +1032,12 @@ async def handle_client_messages(
                             logger.warning(
                                 f"[Session: {session_id}] Received state message with invalid data: {msg_data}"
                             )
-                    elif msg_type == "end":
+                    elif msg_type in END_MESSAGE_TYPES:
                         logger.info(
                             f"[Session: {session_id}] Received end signal from client."
                         )
+                        # The session is cleaned up rather than kept for resumption
+                        session.client_ended = True
                         # Optionally trigger agent finalization or specific actions here
                         # session.live_request_queue.send_content(...) # Example: send a final prompt
                     else:
@@ -627,6 +1055,10 @@ async def handle_client_messages(
                     )
 
             elif msg.type == WSMsgType.BINARY:
+                if recorder is not None:
+                    recorder.client(msg.data, CLIENT_BINARY)
+                usage.messages_in += 1
+                usage.bytes_in += len(msg.data)
                 logger.warning(
                     f"[Session: {session_id}] Received unexpected binary message from client."
                 )
@@ -683,6 +1115,9 @@ async def handle_messages(
                 handle_agent_responses(websocket, session),
                 name=f"agent_handler_{session_id}",
             )
+            # Once the client is gone, stop forwarding; the live stream keeps running
+            # in the session's event pump until the session is resumed or cleaned up.
+            client_task.add_done_callback(lambda _: agent_task.cancel())
 
         logger.info(f"[Session: {session_id}] Both message handling tasks completed.")
 
@@ -752,28 +1187,37 @@ async def handle_messages(
 # --- Main Client Connection Handler (Entry Point - Adapted for aiohttp) ---
 
 
-async def handle_client(websocket: web.WebSocketResponse) -> None:
+async def handle_client(
+    websocket: web.WebSocketResponse, resume_token: Optional[str] = None
+) -> None:
     """
     Handles a new client connection established via aiohttp.
     This function is called by the WebSocket route handler in combined-server.py.
+    A valid resume_token re-attaches the client to its previous session.
     """
-    # Generate a unique session ID (using object ID is simple but not persistent across restarts)
-    # Consider using a more robust method if session persistence is needed.
-    session_id = str(id(websocket))
-    logger.info(f"WebSocket connection established. Assigning session ID: {session_id}")
+    handshake_start = asyncio.get_running_loop().time()
+    session_id = "pending"  # Assigned once a session is acquired
+    logger.info("WebSocket connection established. Acquiring session.")
 
     session = None  # Initialize session to None
     try:
-        # 1. Get Agent Configuration
-        agent_config = get_agent_config(session_id)  # Pass session_id for context
-        app_name = agent_config.get("app_name", "default_app")
-        root_agent = agent_config.get("root_agent")
-        context = agent_config.get("context", {})  # Ensure context is a dict
-
-        if not root_agent:
-            logger.error(
-                f"[Session: {session_id}] Agent configuration failed: No root agent found."
+        # 1. Re-attach to a dropped session, or take a pre-built one from the pool
+        if DRAINING:
+            # Nothing here outlives the drain, resumable sessions included
+            await send_reconnect_hint(websocket)
+            await websocket.close(
+                code=WSCloseCode.TRY_AGAIN_LATER, message=b"Server draining"
             )
+            return
+        session = await take_resumable_session(resume_token) if resume_token else None
+        resumed = session is not None
+        pooled = False
+        if not session:
+            if resume_token:
+                logger.info("Resume token unknown or expired; starting a new session.")
+            session, pooled = await SESSION_POOL.acquire()
+
+        if not session:
             await send_error_message(
                 websocket, {"message": "Server configuration error: Agent not found."}
             )
@@ -782,10 +1226,16 @@ async def handle_client(websocket: web.WebSocketResponse) -> None:
             )
             return
 
-        # 2. Create Session State
-        session = await create_session(
-            session_id, root_agent, app_name, context=context
-        )
+        # 2. Attach the session to this client
+        session_id = session.user_id
+        session.websocket = websocket
+        if RECORD_SESSIONS and session.recorder is None:
+            session.recorder = SessionRecorder(session_id, RECORD_DIR)
+        if session.recorder:
+            session.recorder.mark("attach", resumed=resumed)
+        websocket[SESSION_KEY] = session
+        register_session(session)
+        session.start_event_pump()
 
         config_data = {
             "model": MODEL,
@@ -793,14 +1243,28 @@ async def handle_client(websocket: web.WebSocketResponse) -> None:
             "model_language": MODEL_LANGUAGE,
             "prompt_language": PROMPT_LANGUAGE,
             "use_tts": USE_TTS,
+            "resume_token": issue_resume_token(session),
+            "resume_grace_s": SESSION_RESUME_GRACE_S,
+            "resumed": resumed,
         }
 
         await send_json_message(websocket, "config", config_data)
 
         # 3. Send "ready" message to client
         await send_json_message(websocket, "ready", True)
+        handshake_s = asyncio.get_running_loop().time() - handshake_start
+        if resumed:
+            logger.info(
+                f">>>>>>>>>>>>>>> RESUMED SESSION: {session_id} ({session.app_name}) <<<<<<<<<<<<<<<"
+            )
+        else:
+            HANDSHAKE_LATENCY.observe(handshake_s * 1000, "pooled" if pooled else "cold")
+            logger.info(
+                f">>>>>>>>>>>>>>> NEW SESSION: {session_id} ({session.app_name}) <<<<<<<<<<<<<<<"
+            )
         logger.info(
-            f">>>>>>>>>>>>>>> NEW SESSION: {session_id} ({app_name}) <<<<<<<<<<<<<<<"
+            f"[Session: {session_id}] Handshake-to-ready {handshake_s * 1000:.1f}ms "
+            f"({'resumed' if resumed else 'pooled' if pooled else 'cold'})"
         )
 
         # 4. Start bidirectional message handling
@@ -824,9 +1288,15 @@ async def handle_client(websocket: web.WebSocketResponse) -> None:
             },
         )
     finally:
-        logger.info(f"Cleaning up resources for session {session_id}")
-        # Ensure cleanup happens even if session creation failed partially
-        await cleanup_session(session, session_id)
+        if session and session.websocket is websocket and is_resumable(session):
+            # Keep the session (ADK history and Live API stream) for a reconnect
+            detach_session(session)
+        elif session and session.websocket is not websocket:
+            logger.info(f"[Session: {session_id}] Session was taken over by a reconnect.")
+        else:
+            logger.info(f"Cleaning up resources for session {session_id}")
+            # Ensure cleanup happens even if session creation failed partially
+            await cleanup_session(session, session_id)
         # Ensure websocket is closed
         if not websocket.closed:
             logger.info(
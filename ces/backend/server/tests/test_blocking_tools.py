@@ -0,0 +1,31 @@
+"""
+The async web tools must not stall the event loop while their service is slow.
+
+Runs bench/blocking_tools.py's async mode: simulated audio streams share the loop
+with sessions calling custom_web_search and web_content_summarizer against a stub
+that answers after a delay, and the worst send delay must stay within bounds.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from bench import blocking_tools
+from core.agents.optus_modem import tools as optus_tools
+
+
+def test_slow_web_tools_do_not_stall_the_loop(monkeypatch):
+    # run() points the tools at its stub; restore them afterwards
+    for name in ("CUSTOM_SEARCH_CLOUD_RUN_URL", "WEB_SUMMARIZER_CLOUD_RUN_URL", "get_id_token"):
+        monkeypatch.setattr(optus_tools, name, getattr(optus_tools, name))
+    monkeypatch.setattr(logging.getLogger(), "level", logging.WARNING)
+
+    args = argparse.Namespace(
+        modes=["async"], streams=20, frame_ms=40, tool_sessions=2, calls=4, server_delay_ms=200
+    )
+    result = asyncio.run(blocking_tools.run(args))["results"]["async"]
+
+    assert result["tool_calls"] == 8
+    assert result["tool_errors"] == 0
+    # Every call waited on the stub; had any blocked the loop, a frame would be that late
+    assert result["max_stall_ms"] <= blocking_tools.CHECK_MAX_STALL_MS
@@ -0,0 +1,22 @@
+"""
+Fake Live API latency jitter must repeat from run to run for a given seed.
+"""
+
+import itertools
+
+from core import fake_live
+
+
+def jitter_sequences(monkeypatch, seed: int, sessions: int = 3, turns: int = 5):
+    """Turn jitter drawn by each session of a fresh process, as FakeLiveModel draws it."""
+    monkeypatch.setattr(fake_live, "_model_numbers", itertools.count())
+    models = [fake_live.FakeLiveModel(None, {"turns": []}, jitter_ms=200, seed=seed) for _ in range(sessions)]
+    return [[model._random.uniform(-model.jitter_ms, model.jitter_ms) for _ in range(turns)] for model in models]
+
+
+def test_same_seed_gives_same_jitter(monkeypatch):
+    first = jitter_sequences(monkeypatch, seed=7)
+    assert jitter_sequences(monkeypatch, seed=7) == first
+    # Sessions of one run still differ from each other, and other seeds differ
+    assert first[0] != first[1]
+    assert jitter_sequences(monkeypatch, seed=8) != first
@@ -0,0 +1,35 @@
+"""
+Concurrent lookups of a ticker must share one in-flight yfinance fetch.
+"""
+
+import asyncio
+import threading
+import time
+
+from core.agents.generic import quotes
+
+
+def test_lookups_share_in_flight_fetch(monkeypatch):
+    fetched = []
+    lock = threading.Lock()
+
+    def slow_fetch(symbol):
+        with lock:
+            fetched.append(symbol)
+        time.sleep(0.05)
+        return {"symbol": symbol}
+
+    monkeypatch.setattr(quotes, "_fetch_info", slow_fetch)
+
+    async def run():
+        cache = quotes.QuoteCache(ttl_s=0)
+        first = asyncio.create_task(cache.info("goog"))
+        await asyncio.sleep(0.02)  # The first fetch is under way
+        results = await asyncio.gather(first, cache.info("GOOG"), cache.info("AAPL"))
+        # Resolved and uncached (ttl 0), so the next lookup fetches again
+        await cache.info("GOOG")
+        return results
+
+    results = asyncio.run(run())
+    assert [r["symbol"] for r in results] == ["GOOG", "GOOG", "AAPL"]
+    assert sorted(fetched) == ["AAPL", "GOOG", "GOOG"]
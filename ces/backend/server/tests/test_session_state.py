@@ -0,0 +1,38 @@
+"""
+A detached session must not queue model audio for a client that may never resume.
+"""
+
+import asyncio
+
+from google.adk.events import Event
+from google.genai import types
+
+from core.session_state import SessionState
+
+
+def _audio_event() -> Event:
+    blob = types.Blob(mime_type="audio/pcm;rate=24000", data=b"\0" * 480)
+    return Event(author="agent", content=types.Content(role="model", parts=[types.Part(inline_data=blob)]))
+
+
+def test_detached_session_drops_audio_only_events():
+    text = Event(author="agent", content=types.Content(role="model", parts=[types.Part(text="hi")]))
+    done = Event(author="agent", turn_complete=True)
+
+    async def run():
+        session = SessionState(None, user_id="detached")
+
+        async def events():
+            for event in (_audio_event(), text, _audio_event(), done):
+                yield event
+
+        session.events = events()
+        session.detached_at = 1.0
+        session.start_event_pump()
+        await session.pump_task
+        return session, [event async for event in session.stream_events()]
+
+    session, delivered = asyncio.run(run())
+    assert delivered == [text, done]
+    assert session.usage.audio_events_dropped == 2
+    assert session.event_queue_bytes == 0  # Everything queued was consumed
@@ -0,0 +1,39 @@
+"""
+Hedged calls and circuit breaker probes in the tool guard.
+"""
+
+import asyncio
+
+from core import tool_guard
+from core.tool_guard import CircuitBreaker, _first_success
+
+
+def test_success_wins_when_calls_finish_together():
+    async def run():
+        calls = iter(["fails", "succeeds"])
+
+        async def call():
+            outcome = next(calls)
+            await asyncio.sleep(0.05 if outcome == "fails" else 0.04)
+            if outcome == "fails":
+                raise ConnectionError("reset")
+            return {"status": "success"}
+
+        # Both calls are done by the time the loop next checks them
+        return await _first_success(call, 0.01, lambda: None)
+
+    assert asyncio.run(run()) == {"status": "success"}
+
+
+def test_only_the_probe_releases_half_open(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(tool_guard.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("svc", failure_threshold=1, cooldown_s=10)
+    breaker.record(False)
+    now[0] = 11.0
+
+    assert breaker.allow() and breaker.state == "half_open"  # The probe
+    breaker.record(None)  # A call started before the circuit opened was cancelled
+    assert not breaker.allow()  # The probe is still running
+    breaker.record(True, probe=True)
+    assert breaker.state == "closed" and breaker.allow()